@@ -1,76 +1,228 @@
 import serial
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timezone
 import time 
 
-def parse_nmea_sentence(sentence):
+# --------------------------------------------------------------------
+# NMEA parsing
+#
+# Each supported sentence type has a small parser that merges its fields into a shared fix
+# record, so a GGA + RMC + GSA + VTG burst from the receiver builds up one complete fix:
+#   latitude, longitude, time (UTC, HH:MM:SS), date (UTC, YYYY-MM-DD), quality, satellites,
+#   hdop, pdop, vdop, altitude, speed_kmh and heading.
+# Sentences are dispatched on their type (the talker ID - GP, GL, GA, GN - is ignored) and are
+# only parsed when their checksum is valid.
+# --------------------------------------------------------------------
+
+KNOTS_TO_KMH = 1.852
+
+def nmea_checksum_valid(sentence):
     """
-    Parse a GNGGA NMEA sentence to extract latitude, longitude, and formatted time.
+    Check the checksum of an NMEA sentence.
+
+    Args:
+        sentence (str): The NMEA sentence, e.g. "$GNRMC,...*6A".
+
+    Returns:
+        bool: True if the sentence has a "*hh" checksum matching the XOR of its body.
+    """
+    star = sentence.rfind('*')
+    if not sentence.startswith('$') or star < 0 or len(sentence) < star + 3:
+        return False
+
+    checksum = 0
+    for byte in sentence[1:star].encode('ascii', errors='ignore'):
+        checksum ^= byte
+
+    try:
+        return checksum == int(sentence[star + 1:star + 3], 16)
+    except ValueError:
+        return False
+
+
+def parse_coordinate(value, hemisphere):
+    """
+    Convert an NMEA ddmm.mmmm / dddmm.mmmm coordinate to signed decimal degrees.
+
+    Returns:
+        float: The coordinate in decimal degrees, or None if the field is empty.
+    """
+    if not value:
+        return None
+
+    raw = float(value)
+    degrees = int(raw / 100)
+    coordinate = degrees + (raw - degrees * 100) / 60
+    return -coordinate if hemisphere in ('S', 'W') else coordinate
+
+
+def parse_time(value):
+    """
+    Convert an NMEA hhmmss.ss time to "HH:MM:SS" (UTC).
+    """
+    if len(value) < 6:
+        return None
+    return f"{value[0:2]}:{value[2:4]}:{value[4:6]}"
+
+
+def parse_date(value):
+    """
+    Convert an NMEA ddmmyy date to "YYYY-MM-DD" (UTC).
+    """
+    if len(value) != 6:
+        return None
+    return f"20{value[4:6]}-{value[2:4]}-{value[0:2]}"
+
+
+def parse_float(value):
+    """
+    Convert a numeric NMEA field to a float, or None if the field is empty.
+    """
+    return float(value) if value else None
+
+
+def parse_gga(fields, fix):
+    """
+    GGA - fix data: time, position, fix quality, satellites in use, HDOP and altitude.
+    """
+    if len(fields) < 10:
+        return False
+
+    fix['quality'] = int(fields[6] or 0)
+    fix['satellites'] = int(fields[7] or 0)
+    fix['hdop'] = parse_float(fields[8])
+    fix['altitude'] = parse_float(fields[9])
+
+    if fix['quality'] == 0:
+        return False
+
+    fix['time'] = parse_time(fields[1])
+    fix['latitude'] = parse_coordinate(fields[2], fields[3])
+    fix['longitude'] = parse_coordinate(fields[4], fields[5])
+    return True
+
+
+def parse_rmc(fields, fix):
+    """
+    RMC - recommended minimum: time, status, position, speed, course and the UTC date.
+    """
+    if len(fields) < 10 or fields[2] != 'A':
+        return False
+
+    fix['time'] = parse_time(fields[1])
+    fix['latitude'] = parse_coordinate(fields[3], fields[4])
+    fix['longitude'] = parse_coordinate(fields[5], fields[6])
+    if fields[7]:
+        fix['speed_kmh'] = float(fields[7]) * KNOTS_TO_KMH
+    if fields[8]:
+        fix['heading'] = float(fields[8])
+    fix['date'] = parse_date(fields[9])
+    fix['date_time'] = fix['time']  # The epoch the date belongs to; GGA alone moves `time` on without it
+    return True
+
+
+def parse_gsa(fields, fix):
+    """
+    GSA - DOP and active satellites: fix mode (1 = none, 2 = 2D, 3 = 3D), PDOP, HDOP and VDOP.
+    """
+    if len(fields) < 18:
+        return False
+
+    fix['mode'] = int(fields[2] or 1)
+    fix['pdop'] = parse_float(fields[15])
+    fix['hdop'] = parse_float(fields[16])
+    fix['vdop'] = parse_float(fields[17])
+    return False  # GSA carries no position
+
+
+def parse_vtg(fields, fix):
+    """
+    VTG - course over ground and ground speed.
+    """
+    if len(fields) < 8:
+        return False
+
+    if fields[1]:
+        fix['heading'] = float(fields[1])
+    if fields[7]:
+        fix['speed_kmh'] = float(fields[7])
+    return False  # VTG carries no position
+
+
+# Sentence type -> parser; each parser returns True when it updated the position
+NMEA_PARSERS = {
+    'GGA': parse_gga,
+    'RMC': parse_rmc,
+    'GSA': parse_gsa,
+    'VTG': parse_vtg,
+}
+
+
+def parse_nmea(sentence, fix):
+    """
+    Validate an NMEA sentence and merge its fields into a fix record.
 
     Args:
         sentence (str): The NMEA sentence to parse.
+        fix (dict): The fix record to update in place.
 
     Returns:
-        tuple: A tuple containing the parsed latitude, longitude, formatted time, and date.
-               If the sentence is invalid, returns (None, None, None, None).
+        bool: True if the sentence was valid and updated the position in `fix`.
     """
-    parts = sentence.split(',')
+    parser = NMEA_PARSERS.get(sentence[3:6])
+    if parser is None or not nmea_checksum_valid(sentence):
+        return False
 
-    # Check if the sentence is a GNGGA sentence
-    if parts[0] in ['$GNGGA']:
-        # Check if the data is valid based on the NMEA sentence
-        if parts[0] == '$GNGGA' and parts[6] != '0':
-            valid = True
-        elif parts[0] == '$GNRMC' and parts[2] == 'A':
-            valid = True
-        else:
-            valid = False
+    # Drop the "*hh" checksum before splitting into fields
+    fields = sentence[:sentence.rfind('*')].split(',')
+    try:
+        return parser(fields, fix)
+    except ValueError:
+        return False
 
-        if valid:
-            time_value = parts[1]
 
-            # Convert the time from the NMEA sentence to a datetime object
-            nmea_time_str = time_value
-            time_object = datetime.strptime(nmea_time_str, "%H%M%S.%f")
+def fix_is_complete(fix):
+    """
+    Return True if a fix record has a position and a UTC time and date from the same epoch.
 
-            # Adjust the time by subtracting 5 hours (assuming the time zone difference)
-            new_time_object = time_object - timedelta(hours=5)
+    Only RMC carries the date, while GGA also updates the time. If RMC drops out, the date left
+    in the record belongs to an older epoch (after UTC midnight, to the previous day), so the
+    fix only counts as complete once an RMC for the current time has been merged in.
+    """
+    return (fix.get('latitude') is not None and fix.get('longitude') is not None
+            and fix.get('time') is not None and fix.get('date') is not None
+            and fix.get('date_time') == fix['time'])
 
-            # Format the adjusted time as a string
-            formatted_time = new_time_object.strftime("%H:%M:%S")
 
-            # Parse latitude information
-            lat_value = float(parts[2])
-            lat_hemisphere = parts[3]
-            lat_degrees = int(lat_value / 100)
-            lat_minutes = lat_value - (lat_degrees * 100)
-            latitude = lat_degrees + (lat_minutes / 60)
-            if lat_hemisphere == 'S':
-                latitude *= -1  # Adjust for southern hemisphere
+def parse_nmea_sentence(sentence):
+    """
+    Parse a single GGA or RMC NMEA sentence to extract latitude, longitude, time, and date.
 
-            # Parse longitude information
-            lon_value = float(parts[4])
-            lon_hemisphere = parts[5]
-            lon_degrees = int(lon_value / 100)
-            lon_minutes = lon_value - (lon_degrees * 100)
-            longitude = lon_degrees + (lon_minutes / 60)
-            if lon_hemisphere == 'W':
-                longitude *= -1  # Adjust for western hemisphere
+    RMC sentences carry the UTC date; for a GGA sentence on its own the date is taken from the
+    system clock in UTC. Prefer `parse_nmea` with a shared fix record when reading a stream.
 
-            # Get the current date
-            now = datetime.now()
-            formatted_date = now.strftime("%Y-%m-%d")
+    Args:
+        sentence (str): The NMEA sentence to parse.
 
-            # Return the parsed latitude, longitude, time, and date
-            return latitude, longitude, formatted_time, formatted_date
+    Returns:
+        tuple: A tuple containing the parsed latitude, longitude, formatted time, and date (UTC).
+               If the sentence is invalid, returns (None, None, None, None).
+    """
+    fix = {}
+    if not parse_nmea(sentence, fix):
+        return None, None, None, None
 
-    # Return None if the sentence is not valid or not a GNGGA sentence
-    return None, None, None, None
+    date = fix.get('date') or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return fix['latitude'], fix['longitude'], fix['time'], date
 
 
 def read_gps_data(gps_lock):
     """
     Read GPS data from a serial port and parse it to obtain latitude, longitude, time, and date.
 
+    If the background GPS reader has been started, the latest cached fix is returned immediately
+    instead of opening the serial port.
+
     Args:
         gps_lock (threading.Lock): A lock to synchronize access to the GPS data.
 
@@ -78,25 +230,31 @@ def read_gps_data(gps_lock):
         tuple: A tuple containing the latitude, longitude, formatted time, and date.
                Returns ("None", "None", "None", "None") if no valid data is received.
     """
+    if gps_reader is not None:
+        fix, stale = gps_reader.get_fix()
+        if fix is not None and not stale:
+            return fix['latitude'], fix['longitude'], fix['time'], fix['date']
+        return "None", "None", "None", "None"
+
     with gps_lock:
         # Open the serial port to read GPS data
         ser = serial.Serial('/dev/ttyS0', 9600, timeout=1)
         try: 
             start_time = time.time()
+            fix = {}
             while True:
                 # Read a line from the serial port
                 sentence = ser.readline().decode('utf-8', errors='ignore').strip()
 
-                if sentence:
-                    # Parse the NMEA sentence
-                    latitude, longitude, formatted_time, formatted_date = parse_nmea_sentence(sentence)
-                    
-                    # If valid data is obtained, return it
-                    if latitude is not None and longitude is not None and formatted_time is not None:
-                        return latitude, longitude, formatted_time, formatted_date
+                # Merge the sentence into the fix; return once position, time and date are known
+                if sentence and parse_nmea(sentence, fix) and fix_is_complete(fix):
+                    return fix['latitude'], fix['longitude'], fix['time'], fix['date']
                 
                 # Check if the timeout has been reached
                 if time.time() - start_time > ser.timeout:
+                    if fix.get('latitude') is not None and fix.get('time') is not None:
+                        # A position without an RMC date: fall back to the system's UTC date
+                        return fix['latitude'], fix['longitude'], fix['time'], datetime.now(timezone.utc).strftime("%Y-%m-%d")
                     print("Timeout reached. No GPS data received.")
                     break
         except KeyboardInterrupt:
@@ -107,3 +265,118 @@ def read_gps_data(gps_lock):
     
     # Return default values if no valid data is received
     return "None", "None", "None", "None"
+
+
+class GPSReader:
+    """
+    Background reader that keeps the GPS serial port open and caches the latest fix.
+
+    A single thread reads NMEA sentences as they stream in and publishes each valid fix,
+    stamped with `time.monotonic()`, by replacing one dictionary. Readers never touch the
+    serial port, so fetching the fix at capture time costs microseconds.
+
+    Args:
+        port (str): The serial device the GPS module is attached to.
+        baudrate (int): The serial baud rate.
+        stale_after (float): Seconds after which the cached fix is reported as stale.
+        serial_port: Optional object with a `readline()` method to read from instead of opening
+                     `port`, e.g. a recorded NMEA log opened in binary mode or a pty.
+    """
+
+    def __init__(self, port='/dev/ttyS0', baudrate=9600, stale_after=5.0, serial_port=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.stale_after = stale_after
+        self.serial_port = serial_port
+        self.record = {}  # Working record that every parsed sentence is merged into
+        self.fix = None  # Latest fix; replaced as a whole so readers need no lock
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """
+        Start the reader thread.
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the reader thread and close the serial port.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def get_fix(self):
+        """
+        Return the latest fix and whether it is stale.
+
+        Returns:
+            tuple: The fix dictionary (latitude, longitude, UTC time and date, satellites, HDOP,
+                   speed, heading and the monotonic timestamp it was received at), or None if
+                   no fix has been received yet, and a boolean that is True when the fix is
+                   older than `stale_after`.
+        """
+        fix = self.fix
+        if fix is None:
+            return None, True
+        return fix, time.monotonic() - fix['timestamp'] > self.stale_after
+
+    def _run(self):
+        """
+        Reader loop: keep the port open, parse every sentence and publish valid fixes.
+        """
+        while self.running:
+            try:
+                if self.serial_port is None:
+                    self.serial_port = serial.Serial(self.port, self.baudrate, timeout=1)
+
+                line = self.serial_port.readline()
+                if not line:
+                    time.sleep(0.01)  # Serial timeout or end of a replayed log
+                    continue
+
+                if isinstance(line, bytes):
+                    line = line.decode('utf-8', errors='ignore')
+
+                # Merge every sentence into the working record; publish once the fix is complete
+                if parse_nmea(line.strip(), self.record) and fix_is_complete(self.record):
+                    fix = dict(self.record)
+                    fix['timestamp'] = time.monotonic()
+                    self.fix = fix
+
+            except (serial.SerialException, OSError) as e:
+                # Drop the port and try to reopen it after a short pause
+                print(f"GPS reader error: {e}")
+                self.serial_port = None
+                time.sleep(1)
+
+            except Exception as e:
+                # Anything else (a malformed sentence the parser did not expect) must not kill the
+                # reader, or the cached fix would go stale for good; skip the line and keep reading
+                print(f"GPS reader unexpected error: {e}")
+                time.sleep(0.01)
+
+        if self.serial_port is not None:
+            self.serial_port.close()
+            self.serial_port = None
+
+
+gps_reader = None
+
+def start_gps_reader(**kwargs):
+    """
+    Start the shared background GPS reader, if it is not already running.
+
+    Once started, `read_gps_data` returns the reader's cached fix instead of opening the port.
+
+    Returns:
+        GPSReader: The shared reader.
+    """
+    global gps_reader
+    if gps_reader is None:
+        gps_reader = GPSReader(**kwargs)
+        gps_reader.start()
+    return gps_reader
@@ -0,0 +1,306 @@
+import threading
+import time
+import numpy as np
+
+# OpenCV makes the sharpness measure faster; numpy alone is enough for tests and benchmarks
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+def sharpness(frame, scale=4):
+    """
+    Measure how sharp a frame is as the variance of its Laplacian (higher is sharper).
+
+    The frame is downscaled by `scale` first; motion blur and missed focus still show up clearly
+    and the measure costs a fraction of a full-resolution pass.
+
+    Args:
+        frame (numpy.ndarray): A BGR frame.
+        scale (int): The downscale factor.
+
+    Returns:
+        float: The Laplacian variance.
+    """
+    if cv2 is not None:
+        small = cv2.resize(frame, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+    gray = frame[::scale, ::scale].mean(axis=2)
+    laplacian = (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:] - 4 * gray[1:-1, 1:-1])
+    return float(laplacian.var())
+
+# --------------------------------------------------------------------
+
+class CameraStream:
+    """
+    Reads a camera continuously on its own thread into a fixed ring of preallocated frames.
+
+    The GUI and still capture never call the camera themselves: they take the newest frame from
+    the ring without blocking, so a slow V4L2 read cannot drop UI frames, and a still no longer
+    has to flush the driver's stale buffers by reading dozens of frames first. The ring also
+    serves as the zero-shutter-lag window: `select_frame` picks a still from frames captured
+    around the press.
+
+    Frames are published lock-free. The reader thread writes each frame into the next ring slot
+    (cv2.VideoCapture.read(dst) decodes straight into it) and then publishes the slot with a
+    single assignment. Each slot carries a sequence number that is cleared while the slot is
+    being rewritten, so `capture_frame` can detect (and retry) the rare copy that raced the writer.
+
+    Args:
+        capture: An opened cv2.VideoCapture (or anything with the same read/isOpened interface).
+        ring_size (int): The number of preallocated frames; the writer reuses a slot only after
+                         ring_size - 1 newer frames, so readers have that long to use a frame.
+        name (str): A name for log messages and the thread.
+    """
+
+    def __init__(self, capture, ring_size=4, name='camera'):
+        self.capture = capture
+        self.ring_size = ring_size
+        self.name = name
+
+        self.ring = [None] * ring_size
+        self.slot_sequence = [0] * ring_size  # Sequence of the frame in each slot, 0 while it is written
+        self.slot_time = [0.0] * ring_size    # Monotonic time each slot's frame was captured
+        self.latest = (0, None, 0.0)          # (sequence, slot, monotonic time) of the newest frame
+        self.frame_ready = threading.Condition()
+        self.frame_listeners = []  # Called on the capture thread for every new frame
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """
+        Start the capture thread.
+
+        Returns:
+            CameraStream: self, so a stream can be created and started in one line.
+        """
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name=f"{self.name}-capture", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the capture thread; the caller still owns (and releases) the capture device.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def add_frame_listener(self, listener):
+        """
+        Register a callback for every new frame, e.g. a video recorder.
+
+        Args:
+            listener: Called as listener(sequence, slot) on the capture thread right after a frame
+                      is published. It must return quickly; the frame itself is self.ring[slot].
+        """
+        self.frame_listeners = self.frame_listeners + [listener]  # Replace the list so the capture thread never sees it change
+
+    def remove_frame_listener(self, listener):
+        """
+        Unregister a callback added with `add_frame_listener`.
+        """
+        self.frame_listeners = [existing for existing in self.frame_listeners if existing != listener]
+
+    def newest(self):
+        """
+        Return the newest frame without blocking or copying.
+
+        The frame is a view into the ring, so use it straight away (e.g. upload it to a texture)
+        or copy it; it is overwritten after ring_size - 1 more frames.
+
+        Returns:
+            tuple: (sequence, frame), or (0, None) before the first frame arrives.
+        """
+        sequence, slot, _ = self.latest
+        if slot is None:
+            return 0, None
+        return sequence, self.ring[slot]
+
+    def read(self):
+        """
+        cv2.VideoCapture-style read of the newest frame (no copy, never blocks).
+
+        Returns:
+            tuple: (True, frame), or (False, None) before the first frame arrives.
+        """
+        sequence, frame = self.newest()
+        return frame is not None, frame
+
+    def wait_for_frame(self, after=0.0, timeout=1.0):
+        """
+        Wait until a frame captured after `after` (a time.monotonic() timestamp) has been published.
+
+        Returns:
+            bool: True if there is such a frame, False if none arrived within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+
+        with self.frame_ready:
+            while self.latest[1] is None or self.latest[2] < after:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    return False
+                self.frame_ready.wait(remaining)
+        return True
+
+    def capture_frame(self, after=None, timeout=1.0):
+        """
+        Return a private copy of the first frame captured after `after`, waiting at most one frame period.
+
+        Args:
+            after (float): A time.monotonic() timestamp, e.g. when the shutter was pressed; defaults to now.
+            timeout (float): Seconds to wait for a new frame before giving up.
+
+        Returns:
+            numpy.ndarray: The copied frame, or None if no frame arrived in time.
+        """
+        after = time.monotonic() if after is None else after
+        if not self.wait_for_frame(after, timeout):
+            return None
+
+        while True:
+            sequence, slot, _ = self.latest
+            frame = self.ring[slot].copy()
+            if self.slot_sequence[slot] == sequence:
+                return frame  # The slot was not rewritten while it was being copied
+            # Extremely unlikely: the writer lapped the ring during the copy, so take the newer frame
+
+    def select_frame(self, at=None, mode='closest', window=None):
+        """
+        Zero-shutter-lag still: pick a frame that was already captured and return a private copy of it.
+
+        Because the capture thread keeps the last few frames in the ring, a still does not have to
+        wait for the camera at all: the frame nearest the shutter press, or the sharpest of the
+        most recent ones, is already in memory.
+
+        Args:
+            at (float): The time.monotonic() timestamp of the shutter press; defaults to now.
+            mode (str): 'closest' for the frame captured nearest `at`, or 'sharpest' for the frame
+                        with the highest Laplacian variance.
+            window (int): How many of the newest frames to choose from; defaults to the whole ring
+                          except the slot being written.
+
+        Returns:
+            tuple: (frame copy, capture timestamp), or (None, None) if no frame has arrived yet.
+        """
+        at = time.monotonic() if at is None else at
+        window = min(window or self.ring_size - 1, self.ring_size - 1)
+
+        while True:
+            # Published slots, newest first; a slot being rewritten has sequence 0 and is skipped
+            candidates = sorted(
+                ((self.slot_sequence[slot], slot, self.slot_time[slot]) for slot in range(self.ring_size)
+                 if self.slot_sequence[slot] > 0),
+                reverse=True
+            )[:window]
+
+            if not candidates:
+                return None, None
+
+            if mode == 'sharpest':
+                sequence, slot, captured = max(candidates, key=lambda candidate: sharpness(self.ring[candidate[1]]))
+            else:
+                sequence, slot, captured = min(candidates, key=lambda candidate: abs(candidate[2] - at))
+
+            frame = self.ring[slot].copy()
+            if self.slot_sequence[slot] == sequence:
+                return frame, captured
+            # The writer reached this slot while it was being copied; choose again from the newer frames
+
+    def _run(self):
+        """
+        Capture loop: read each frame into the next ring slot and publish it.
+        """
+        sequence = 0
+        slot = 0
+
+        while self.running:
+            self.slot_sequence[slot] = 0  # Mark the slot as being written
+            ret, frame = self.capture.read(self.ring[slot]) if self.ring[slot] is not None else self.capture.read()
+
+            if not ret or frame is None:
+                time.sleep(0.01)  # Device hiccup; do not spin
+                continue
+
+            # The first frame (or a resolution change) allocates the slot; later reads fill it in place
+            self.ring[slot] = frame
+
+            sequence += 1
+            self.slot_time[slot] = time.monotonic()
+            self.slot_sequence[slot] = sequence
+            self.latest = (sequence, slot, time.monotonic())
+
+            with self.frame_ready:
+                self.frame_ready.notify_all()
+
+            for listener in self.frame_listeners:
+                listener(sequence, slot)
+
+            slot = (slot + 1) % self.ring_size
+
+        with self.frame_ready:
+            self.frame_ready.notify_all()  # Wake anyone waiting so they see the stream stopped
+
+# --------------------------------------------------------------------
+
+class SyntheticCapture:
+    """
+    Stand-in for cv2.VideoCapture that produces numbered frames at a fixed rate.
+
+    Each frame is filled with its frame number (mod 256) so tests can tell frames apart, and
+    read() sleeps until the next frame is due, like a real camera. When `buffered_frames` is
+    set, that many stale frames are returned immediately first, like a V4L2 driver queue.
+
+    Args:
+        width (int): Frame width in pixels.
+        height (int): Frame height in pixels.
+        fps (float): Frames per second.
+        buffered_frames (int): Stale frames waiting in the "driver" when reading starts.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, buffered_frames=0):
+        self.shape = (height, width, 3)
+        self.period = 1.0 / fps
+        self.buffered_frames = buffered_frames
+        self.frame_number = 0
+        self.next_frame_time = time.monotonic()
+        self.opened = True
+
+    def read(self, image=None):
+        if not self.opened:
+            return False, None
+
+        if self.buffered_frames:
+            self.buffered_frames -= 1  # Stale frame already sitting in the queue
+        else:
+            delay = self.next_frame_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.next_frame_time = max(self.next_frame_time, time.monotonic()) + self.period
+
+        if image is None or image.shape != self.shape:
+            image = np.empty(self.shape, dtype=np.uint8)
+        self.frame_number += 1
+        image.fill(self.frame_number % 256)
+        return True, image
+
+    def isOpened(self):
+        return self.opened
+
+    def release(self):
+        self.opened = False
+
+    def set(self, prop_id, value):
+        return True
+
+    def get(self, prop_id):
+        return 0.0
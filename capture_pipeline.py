@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+
+class CapturePipeline:
+    """
+    Bounded multi-stage worker pool for processing captures.
+
+    Each stage has its own bounded queue and a fixed number of worker threads. A job (a dict
+    describing one capture) enters the first stage's queue and is handed from stage to stage
+    until a stage function returns False or the last stage finishes. When a stage falls behind
+    its queue fills up and the stage before it blocks, so backpressure propagates to `submit`
+    instead of memory growing without bound.
+
+    Args:
+        stages (list): (name, function, workers) tuples in processing order. Each function takes
+                       the job dict, updates it in place and returns True to pass it on.
+        queue_size (int): The maximum number of jobs waiting in front of each stage.
+    """
+
+    def __init__(self, stages, queue_size=4):
+        self.stages = []
+
+        for name, function, workers in stages:
+            self.stages.append({
+                'name': name,
+                'function': function,
+                'queue': queue.Queue(maxsize=queue_size),
+                'lock': threading.Lock(),
+                'processed': 0,
+                'failed': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+            })
+
+        # Start the workers once every stage (and so every next-stage queue) exists
+        for index, stage in enumerate(self.stages):
+            for _ in range(stages[index][2]):
+                threading.Thread(target=self._worker, args=(index,), daemon=True).start()
+
+    def submit(self, job, block=True, timeout=None):
+        """
+        Queue a capture job at the first stage.
+
+        Args:
+            job (dict): The job describing the capture.
+            block (bool): Wait for space in the first stage's queue if it is full.
+            timeout (float): Seconds to wait when blocking, or None to wait indefinitely.
+
+        Returns:
+            bool: True if the job was queued, False if the queue stayed full.
+        """
+        job['submitted'] = time.monotonic()
+        try:
+            self.stages[0]['queue'].put(job, block, timeout)
+            return True
+        except queue.Full:
+            print("Capture pipeline is full; capture not queued.")
+            return False
+
+    def stats(self):
+        """
+        Report queue depth and latency for every stage.
+
+        Returns:
+            dict: Stage name -> queued, processed, failed, mean_ms and max_ms.
+        """
+        report = {}
+        for stage in self.stages:
+            with stage['lock']:
+                processed = stage['processed'] + stage['failed']
+                report[stage['name']] = {
+                    'queued': stage['queue'].qsize(),
+                    'processed': stage['processed'],
+                    'failed': stage['failed'],
+                    'mean_ms': 1000 * stage['total_seconds'] / processed if processed else 0.0,
+                    'max_ms': 1000 * stage['max_seconds'],
+                }
+        return report
+
+    def print_stats(self):
+        """
+        Print the per-stage queue depths and latencies.
+        """
+        for name, stage_stats in self.stats().items():
+            print(f"{name:<10} queued {stage_stats['queued']:>2}  done {stage_stats['processed']:>5}  "
+                  f"failed {stage_stats['failed']:>3}  mean {stage_stats['mean_ms']:8.1f} ms  "
+                  f"max {stage_stats['max_ms']:8.1f} ms")
+
+    def _worker(self, index):
+        """
+        Worker loop for one stage: run the stage function and pass the job to the next stage.
+        """
+        stage = self.stages[index]
+        next_queue = self.stages[index + 1]['queue'] if index + 1 < len(self.stages) else None
+
+        while True:
+            job = stage['queue'].get()
+            start = time.monotonic()
+
+            try:
+                passed = stage['function'](job)
+            except Exception as e:
+                print(f"Error in {stage['name']} stage: {str(e)}")
+                passed = False
+
+            elapsed = time.monotonic() - start
+            with stage['lock']:
+                stage['processed' if passed else 'failed'] += 1
+                stage['total_seconds'] += elapsed
+                stage['max_seconds'] = max(stage['max_seconds'], elapsed)
+
+            # Blocks while the next stage is full, which is what gives the pipeline backpressure
+            if passed and next_queue is not None:
+                next_queue.put(job)
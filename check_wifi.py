@@ -1,34 +1,25 @@
-import requests
+from connectivity_monitor import get_connectivity_monitor
 
 def is_internet_available():
     """
-    Check if the internet is available by sending an HTTP GET request to a reliable server.
+    Check if the internet (specifically the S3 upload endpoint) is available.
+
+    The answer comes from the shared connectivity monitor, which probes the network in the
+    background, so this never blocks on a network request.
 
     Returns:
-        bool: True if the internet is available (status code 200), False otherwise.
+        bool: True if the monitor currently reports the camera online, False otherwise.
     """
-    try:
-        # Send a simple HTTP GET request to Google
-        response = requests.get("https://www.google.com", timeout=5)
-        # Return True if the request is successful (HTTP 200)
-        return response.status_code == 200
-    except requests.ConnectionError:
-        # Return False if there is a connection error (e.g., no internet)
-        return False
+    return get_connectivity_monitor().is_online()
 
 
 def is_internet_availableTwo():
     """
-    Check if the internet is available by sending an HTTP GET request to a reliable server.
+    Check if the internet is available.
+
+    Kept for older callers; this is the same check as `is_internet_available`.
 
     Returns:
-        bool: True if the internet is available (status code 200), False otherwise.
+        bool: True if the monitor currently reports the camera online, False otherwise.
     """
-    try:
-        # Send a simple HTTP GET request to Google
-        response = requests.get("https://www.google.com", timeout=5)
-        # Return True if the request is successful (HTTP 200)
-        return response.status_code == 200
-    except requests.ConnectionError:
-        # Return False if there is a connection error (e.g., no internet)
-        return False
+    return is_internet_available()
@@ -0,0 +1,254 @@
+import os
+import select
+import socket
+import threading
+import time
+
+S3_ENDPOINT = ('unverifiedimages.s3.amazonaws.com', 443)  # The endpoint uploads actually go to
+
+# rtnetlink multicast groups for link and address changes (linux/rtnetlink.h)
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+
+class SystemNetworkBackend:
+    """
+    Reads the real network state of the camera.
+
+    The link state comes from /sys/class/net, a netlink socket wakes the monitor as soon as
+    an interface or address changes, and reachability is a plain TCP connect to the S3
+    endpoint (no TLS handshake or HTTP request).
+
+    Args:
+        endpoint (tuple): The (host, port) that must be reachable for uploads to work.
+    """
+
+    def __init__(self, endpoint=S3_ENDPOINT):
+        self.endpoint = endpoint
+
+        try:
+            self.netlink = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            self.netlink.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR))
+        except (AttributeError, OSError):
+            self.netlink = None  # Not on Linux; fall back to checking on a timer
+
+    def link_up(self):
+        """
+        Return True if any interface other than loopback is up.
+        """
+        try:
+            interfaces = os.listdir('/sys/class/net')
+        except OSError:
+            return True  # No sysfs; let the probe decide
+
+        for interface in interfaces:
+            if interface == 'lo':
+                continue
+            try:
+                with open(f'/sys/class/net/{interface}/operstate', 'r') as file:
+                    if file.read().strip() in ('up', 'unknown'):
+                        return True
+            except OSError:
+                continue
+        return False
+
+    def probe(self, timeout):
+        """
+        Return True if a TCP connection to the endpoint can be opened within `timeout` seconds.
+        """
+        try:
+            with socket.create_connection(self.endpoint, timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    def wait_for_change(self, timeout):
+        """
+        Wait until the kernel reports a link or address change, or until `timeout` passes.
+
+        Returns:
+            bool: True if there was a change.
+        """
+        if self.netlink is None:
+            time.sleep(timeout)
+            return False
+
+        readable, _, _ = select.select([self.netlink], [], [], timeout)
+        if readable:
+            self.netlink.recv(65536)  # The message itself is not needed, only the wake-up
+            return True
+        return False
+
+
+class FakeNetworkBackend:
+    """
+    Simulated network for exercising the monitor without touching real interfaces.
+
+    Tests flip the link and reachability with `set_link` / `set_reachable` (or `flap`) and the
+    monitor is woken the same way a netlink event would wake it.
+
+    Args:
+        link (bool): Whether the link starts up.
+        reachable (bool): Whether the endpoint starts reachable.
+    """
+
+    def __init__(self, link=True, reachable=True):
+        self.link = link
+        self.reachable = reachable
+        self.probes = 0
+        self.changed = threading.Event()
+
+    def set_link(self, link):
+        self.link = link
+        self.changed.set()
+
+    def set_reachable(self, reachable):
+        self.reachable = reachable  # Reachability changes are only noticed by the next probe
+
+    def flap(self, down_seconds=0.0):
+        """
+        Take the link down and bring it back up after `down_seconds`.
+        """
+        self.set_link(False)
+        time.sleep(down_seconds)
+        self.set_link(True)
+
+    def link_up(self):
+        return self.link
+
+    def probe(self, timeout):
+        self.probes += 1
+        return self.link and self.reachable
+
+    def wait_for_change(self, timeout):
+        changed = self.changed.wait(timeout)
+        self.changed.clear()
+        return changed
+
+# --------------------------------------------------------------------
+
+class ConnectivityMonitor:
+    """
+    Single source of truth for whether the camera can reach S3.
+
+    A background thread combines the interface state with a cheap probe of the S3 endpoint and
+    publishes the result, so callers only ever read a cached boolean and never block on the
+    network. The state has hysteresis: it only changes after `up_threshold` successful or
+    `down_threshold` failed probes in a row, so a single lost packet does not flip it. A link
+    going down is definitive and takes the state offline at once.
+
+    Args:
+        backend: The network backend; defaults to SystemNetworkBackend.
+        interval (float): Seconds between probes when nothing changes.
+        probe_timeout (float): Seconds to wait for a probe to connect.
+        up_threshold (int): Consecutive successful probes needed to go online.
+        down_threshold (int): Consecutive failed probes needed to go offline.
+    """
+
+    def __init__(self, backend=None, interval=10.0, probe_timeout=2.0, up_threshold=2, down_threshold=2):
+        self.backend = backend or SystemNetworkBackend()
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.up_threshold = up_threshold
+        self.down_threshold = down_threshold
+
+        self.online = None  # Unknown until the first check
+        self.streak = 0     # Consecutive probe results that disagree with the current state
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """
+        Start monitoring in a background thread.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def is_online(self):
+        """
+        Return the last published state without blocking (False until the first check completes).
+        """
+        return bool(self.online)
+
+    def subscribe(self, callback):
+        """
+        Register a callback for state changes.
+
+        Args:
+            callback: Called as callback(online) on every transition, from the monitor thread.
+                      It is also called once straight away if the state is already known.
+        """
+        with self.lock:
+            self.subscribers.append(callback)
+            online = self.online
+
+        if online is not None:
+            callback(online)
+
+    def check(self):
+        """
+        Run one check and update the published state.
+        """
+        if not self.backend.link_up():
+            self.streak = 0
+            self._publish(False)  # No link means no connectivity; no need to wait for probes
+            return
+
+        reachable = self.backend.probe(self.probe_timeout)
+
+        if self.online is None:
+            self._publish(reachable)  # First result sets the initial state directly
+        elif reachable == self.online:
+            self.streak = 0
+        else:
+            self.streak += 1
+            if self.streak >= (self.up_threshold if reachable else self.down_threshold):
+                self.streak = 0
+                self._publish(reachable)
+
+    def _publish(self, online):
+        """
+        Store the new state and notify subscribers if it changed.
+        """
+        with self.lock:
+            if online == self.online:
+                return
+            self.online = online
+            subscribers = list(self.subscribers)
+
+        print(f"Connectivity: {'online' if online else 'offline'}")
+        for callback in subscribers:
+            try:
+                callback(online)
+            except Exception as e:
+                print(f"Error in connectivity subscriber: {e}")
+
+    def _run(self):
+        """
+        Monitor loop: check, then sleep until the interval passes or the kernel reports a change.
+        """
+        while True:
+            self.check()
+
+            # While a transition is pending, re-probe quickly to confirm it
+            timeout = self.probe_timeout if self.streak else self.interval
+            self.backend.wait_for_change(timeout)
+
+
+connectivity_monitor = None
+connectivity_monitor_lock = threading.Lock()
+
+def get_connectivity_monitor():
+    """
+    Return the shared ConnectivityMonitor, starting it on first use.
+
+    Returns:
+        ConnectivityMonitor: The running monitor.
+    """
+    global connectivity_monitor
+    with connectivity_monitor_lock:
+        if connectivity_monitor is None:
+            connectivity_monitor = ConnectivityMonitor()
+            connectivity_monitor.start()
+        return connectivity_monitor
@@ -16,9 +16,105 @@ def create_digest(combined_data: bytes) -> bytes:
 
     # Create a new SHA-256 hash object
     sha256_hash = hashlib.sha256()
-    
+
     # Update the hash object with the combined data
     sha256_hash.update(combined_data)
 
     # Return the digest (hashed value)
     return sha256_hash.digest()
+
+
+class CombinedDigest:
+    """
+    Incremental SHA-256 over the same byte layout that `create_combined` produces.
+
+    The combined layout is fingerprint + camera number + media + date + time + location.
+    The fingerprint and camera number are fed when the object is created, the media is fed
+    chunk by chunk with `update` / `update_from_file`, and the date, time and location are
+    fed by `finalize`. The result is identical to `create_digest(create_combined(...))`,
+    but the media is never copied into a second full-size buffer.
+    """
+
+    def __init__(self, fingerprint: str, camera_number: str):
+        # Create the hash object and feed the prefix of the combined layout
+        self.sha256_hash = hashlib.sha256()
+        self.sha256_hash.update(fingerprint.encode('utf-8'))
+        self.sha256_hash.update(camera_number.encode('utf-8'))
+
+    def update(self, media_chunk) -> None:
+        """
+        Feed a chunk of media bytes into the digest.
+
+        Args:
+            media_chunk: Any bytes-like object (bytes, bytearray, memoryview or a contiguous
+                         numpy buffer such as the array returned by cv2.imencode).
+        """
+        # memoryview lets hashlib read numpy buffers in place without a tobytes() copy
+        self.sha256_hash.update(memoryview(media_chunk).cast('B'))
+
+    def update_from_file(self, media_filepath: str, chunk_size: int = 1024 * 1024) -> None:
+        """
+        Feed the contents of a media file into the digest, reading it in fixed-size chunks.
+
+        Args:
+            media_filepath (str): The path of the media file to hash.
+            chunk_size (int): The number of bytes read from the file per chunk.
+        """
+        # Reuse one buffer for every read so memory use stays at chunk_size
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+
+        with open(media_filepath, 'rb') as media_file:
+            while True:
+                bytes_read = media_file.readinto(buffer)
+                if not bytes_read:
+                    break
+                self.sha256_hash.update(view[:bytes_read])
+
+    def finalize(self, date: str, time: str, location: str) -> bytes:
+        """
+        Feed the suffix of the combined layout and return the digest.
+
+        Args:
+            date (str): The date information.
+            time (str): The time information.
+            location (str): The location information.
+
+        Returns:
+            bytes: The SHA-256 digest of the full combined layout.
+        """
+        self.sha256_hash.update(date.encode('utf-8'))
+        self.sha256_hash.update(time.encode('utf-8'))
+        self.sha256_hash.update(location.encode('utf-8'))
+
+        return self.sha256_hash.digest()
+
+
+def create_digest_stream(fingerprint: str, camera_number: str, media, date: str, time: str, location: str) -> bytes:
+    """
+    Creates the SHA-256 digest of the combined data without building the combined byte object.
+
+    This produces exactly the same digest as `create_digest(create_combined(...))`, so existing
+    signatures still verify, but the media is streamed into the hash instead of being
+    concatenated with the other fields first.
+
+    Args:
+        fingerprint (str): The fingerprint identifier or username associated with the media.
+        camera_number (str): The camera number.
+        media: Either a bytes-like object (e.g. the encoded PNG buffer) or the file path of the media as a string.
+        date (str): The date information.
+        time (str): The time information.
+        location (str): The location information.
+
+    Returns:
+        bytes: The resulting SHA-256 digest of the combined data.
+    """
+    digest = CombinedDigest(fingerprint, camera_number)
+
+    # A string is treated as a file path and read in chunks; anything else is an in-memory buffer
+    if isinstance(media, str):
+        digest.update_from_file(media)
+    else:
+        digest.update(media)
+
+    return digest.finalize(date, time, location)
@@ -1,9 +1,17 @@
-def create_metadata(fingerprint: str, camera_number: str, date_data: str, time_data: str, location_data: str, signature_string: bytes) -> dict:
+import json
+
+def create_metadata(fingerprint: str, camera_number: str, date_data: str, time_data: str, location_data: str, signature_string: bytes, merkle_proof: str = None, segment_manifest: str = None, image_format: str = None) -> dict:
     """
     Creates a dictionary containing all metadata, including fingerprint, camera number, date, time, location, and signature.
 
     This function takes in several pieces of information, such as fingerprint, camera number, date, time, location,
     and a signature string (in bytes), and compiles them into a dictionary for easy access and storage.
+    When the capture was signed as part of a batch, the Merkle inclusion proof linking its digest to
+    the signed root is stored as well. For videos signed in segments, the layout name and the segment
+    manifest are stored; the manifest is uploaded as its own object, since it can outgrow S3's metadata limit.
+    For images, the format they were encoded in is stored so the cloud knows how to read them. The
+    format is deliberately not part of the signed digest: the signature covers the encoded bytes,
+    which already determine the format, and the verifier checks 'Format' against their magic bytes.
 
     Args:
         fingerprint (str): The unique identifier or fingerprint.
@@ -12,6 +20,9 @@ def create_metadata(fingerprint: str, camera_number: str, date_data: str, time_d
         time_data (str): The time information.
         location_data (str): The location information.
         signature_string (bytes): The signature, represented as a base64-encoded byte string.
+        merkle_proof (str): The encoded Merkle inclusion proof, or None if the digest was signed on its own.
+        segment_manifest (str): The JSON segment manifest of a segmented video, or None.
+        image_format (str): The encoding of an image, e.g. 'png' or 'webp', or None for videos.
 
     Returns:
         dict: A dictionary containing all the provided metadata.
@@ -27,6 +38,13 @@ def create_metadata(fingerprint: str, camera_number: str, date_data: str, time_d
     metadata['Time'] = time_data
     metadata['Location'] = location_data
     metadata['Signature'] = signature_string
+    if merkle_proof:
+        metadata['MerkleProof'] = merkle_proof
+    if segment_manifest:
+        metadata['Layout'] = json.loads(segment_manifest)['layout']
+        metadata['SegmentManifest'] = segment_manifest
+    if image_format:
+        metadata['Format'] = image_format
 
     # Return the populated metadata dictionary
     return metadata
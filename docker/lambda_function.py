@@ -1,12 +1,303 @@
 import mysql.connector
 import json
-import cv2
 import hashlib
 import os
 import base64
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric import padding, utils
 from cryptography.exceptions import InvalidSignature
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import urllib.request
+import urllib.error
+import tempfile
+import re
+import threading
+import time
+from collections import OrderedDict
+
+SEGMENTED_LAYOUTS = ('segmented-v1', 'segmented-v2')  # Videos signed over a manifest of segment hashes
+
+# Database connection details
+DATABASE_CONFIG = {
+    'host': "publickeycamerastorage.c90gvpt3ri4q.us-east-2.rds.amazonaws.com",
+    'user': "sdp",
+    'password': "sdpsdpsdp",
+    'database': "PublicKeySchema",
+}
+
+class DatabasePool:
+    """
+    Keeps MySQL connections open across warm invocations and caches prepared statements.
+
+    Opening a connection costs a TCP, TLS and authentication handshake, which used to be paid
+    for every query. The pool lives at module scope, so a warm Lambda container reuses its
+    connections, and each connection keeps one prepared cursor per query, so repeated queries
+    skip parsing as well. Connections that were idle for a while are checked before use and
+    reconnected if the server dropped them, and a query that fails because its connection broke
+    is retried once on a fresh connection.
+
+    Args:
+        config (dict): The mysql.connector.connect arguments (host, user, password, database).
+        size (int): The most connections kept open at the same time.
+        ping_after (float): Seconds a connection may sit idle before it is checked again.
+        timeout (float): Seconds `acquire` waits for a connection when the pool is full.
+    """
+
+    def __init__(self, config, size=4, ping_after=30.0, timeout=10.0):
+        self.config = config
+        self.size = size
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self.idle = []  # (connection, prepared cursors by query, last used) ready for reuse
+        self.open = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Take a connection from the pool, opening one if none is idle and the pool is not full.
+
+        Returns:
+            tuple: (connection, prepared cursors by query) to pass back to `release`.
+
+        Raises:
+            mysql.connector.errors.PoolError: If no connection became free within `timeout` seconds.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while not self.idle and self.open >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise mysql.connector.errors.PoolError("Timed out waiting for a database connection")
+                self.condition.wait(remaining)
+
+            if not self.idle:
+                self.open += 1
+                entry = None
+            else:
+                entry = self.idle.pop()
+
+        if entry is None:
+            try:
+                return mysql.connector.connect(**self.config), {}
+            except Exception:
+                self.discard()
+                raise
+
+        connection, statements, last_used = entry
+        if time.monotonic() - last_used > self.ping_after:
+            try:
+                if not connection.is_connected():
+                    connection.reconnect(attempts=2, delay=0)
+                    statements.clear()  # Prepared statements do not survive a reconnect
+            except Exception:
+                self.discard(connection)  # Give its slot back, or the pool would shrink for good
+                raise
+        return connection, statements
+
+    def release(self, connection, statements):
+        """
+        Return a healthy connection to the pool.
+        """
+        with self.condition:
+            self.idle.append((connection, statements, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection=None):
+        """
+        Drop a broken connection (or a failed attempt to open one), making room for a new one.
+        """
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+        with self.condition:
+            self.open -= 1
+            self.condition.notify()
+
+    def query(self, query, params=(), commit=False, cache=True):
+        """
+        Run one query with a cached prepared statement and return its rows.
+
+        Args:
+            query (str): The SQL, with %s placeholders.
+            params (tuple): The query parameters.
+            commit (bool): Whether to commit afterwards (for writes).
+            cache (bool): Whether to keep a prepared statement for the query. Pass False for SQL
+                          that is built per request (e.g. a variable-length IN list): every
+                          distinct string would otherwise hold a server-side statement open on
+                          every pooled connection, until MySQL's max_prepared_stmt_count is hit.
+
+        Returns:
+            list: The result rows (empty for statements without results).
+        """
+        for attempt in range(2):
+            connection, statements = self.acquire()
+            try:
+                if cache:
+                    cursor = statements.get(query)
+                    if cursor is None:
+                        cursor = statements[query] = connection.cursor(prepared=True)
+                else:
+                    cursor = connection.cursor()  # Plain cursor, closed again below
+
+                try:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall() if cursor.with_rows else []
+                finally:
+                    if not cache:
+                        cursor.close()
+                if commit:
+                    connection.commit()
+
+            except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+                self.discard(connection)
+                if attempt:
+                    raise
+                continue  # The connection broke (e.g. the server closed it); retry once on a fresh one
+
+            except Exception:
+                self.discard(connection)
+                raise
+
+            self.release(connection, statements)
+            return rows
+
+
+# Module scope, so warm invocations of this container reuse the open connections
+database_pool = DatabasePool(DATABASE_CONFIG)
+
+class PublicKeyCache:
+    """
+    Keeps cameras' parsed public keys in memory across warm invocations.
+
+    Looking a key up used to mean a database query, a base64 decode, a round trip through a
+    temporary PEM file and a PEM parse on every request. The cache holds the parsed key objects
+    by camera number, so a repeat upload from the same camera costs only the RSA verification.
+    It is an LRU with a time-to-live: the least recently used camera is evicted when it is full,
+    and entries are reloaded after `ttl` seconds so a revoked key is not trusted for long.
+
+    When a camera's key is rotated, its uploads stop verifying against the cached key;
+    `refresh` reloads the key and reports whether it changed, and `invalidate` drops entries
+    explicitly.
+
+    Args:
+        max_size (int): The most cameras kept.
+        ttl (float): Seconds before an entry is reloaded from the database.
+    """
+
+    def __init__(self, max_size=256, ttl=600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # camera number -> (PEM, parsed key, load time), least recently used first
+        self.lock = threading.Lock()
+
+    def get(self, camera_number):
+        """
+        Return a camera's parsed public key, loading it on a miss or once its entry has expired.
+
+        Raises:
+            LookupError: If the camera has no public key.
+        """
+        with self.lock:
+            entry = self.entries.get(camera_number)
+            if entry is not None and time.monotonic() - entry[2] < self.ttl:
+                self.entries.move_to_end(camera_number)
+                return entry[1]
+
+        return self.load(camera_number)[1]
+
+    def refresh(self, camera_number):
+        """
+        Reload a camera's key after a failed verification, in case it was rotated.
+
+        Returns:
+            The new parsed key if the stored key changed, or None if it is the same one.
+        """
+        with self.lock:
+            entry = self.entries.get(camera_number)
+
+        pem, public_key = self.load(camera_number)
+        if entry is not None and entry[0] == pem:
+            return None
+        return public_key
+
+    def invalidate(self, camera_number=None):
+        """
+        Drop a camera's cached key, or every cached key if no camera is given.
+        """
+        with self.lock:
+            if camera_number is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(camera_number, None)
+
+    def load(self, camera_number):
+        """
+        Read a camera's key from the database, parse it and cache it.
+        """
+        public_key_base64 = get_public_key(camera_number)
+        if public_key_base64 == 'Public key not found':
+            raise LookupError(f"No public key for camera {camera_number}")
+
+        pem = base64.b64decode(public_key_base64)
+        public_key = serialization.load_pem_public_key(pem)  # Parsed straight from memory
+
+        with self.lock:
+            self.entries[camera_number] = (pem, public_key, time.monotonic())
+            self.entries.move_to_end(camera_number)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return pem, public_key
+
+
+# Module scope as well, so repeat uploads from a camera skip the key lookup and parse
+public_key_cache = PublicKeyCache()
+
+class VerdictCache:
+    """
+    Remembers recent verdicts by media hash, so repeat lookups of popular media skip the database.
+
+    A verdict depends only on the media's bytes (which the hash identifies) and its stored
+    details, so it can be reused for `ttl` seconds; the same TTL is sent to clients as
+    Cache-Control, so browsers and CDNs can cache verdicts by hash as well.
+
+    Args:
+        max_size (int): The most verdicts kept; the least recently used is evicted first.
+        ttl (float): Seconds a verdict is reused.
+    """
+
+    def __init__(self, max_size=4096, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # media hash -> (verdict, time stored), least recently used first
+        self.lock = threading.Lock()
+
+    def get(self, image_hash):
+        """
+        Return the cached verdict for a media hash, or None.
+        """
+        with self.lock:
+            entry = self.entries.get(image_hash)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                return None
+            self.entries.move_to_end(image_hash)
+            return entry[0]
+
+    def put(self, image_hash, verdict):
+        """
+        Cache a verdict for a media hash.
+        """
+        with self.lock:
+            self.entries[image_hash] = (verdict, time.monotonic())
+            self.entries.move_to_end(image_hash)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+verdict_cache = VerdictCache()
 
 def handler(event, context):
     """
@@ -14,6 +305,8 @@ def handler(event, context):
 
     This function decodes the media from the incoming request, extracts metadata from the database,
     verifies the signature, and returns whether the media is valid or not along with its metadata if valid.
+    A body with an "items" list is a batch request instead and is handled by `verify_batch`, and a
+    body with just a "hash" or a presigned S3 "url" is handled by `verify_reference`.
 
     Args:
         event (dict): The event payload containing media data and metadata.
@@ -28,6 +321,12 @@ def handler(event, context):
         # Parse the JSON string in the body
         body = json.loads(event['body'])
 
+        if 'items' in body:
+            return verify_batch(body['items'])  # Many media items or hashes in one request
+
+        if 'hash' in body or 'url' in body:
+            return verify_reference(body)  # Only the media's hash or an S3 link is sent, not the media
+
         content_type = body['type']
         # Access the 'image' or 'video' key directly
         binary_media  = base64.b64decode(body['image'])
@@ -35,15 +334,9 @@ def handler(event, context):
     except Exception as e:
         errors = "Error decoding media from event: " + str(e)
     
-    if content_type == "image/png":
-        # Process image
-        try:
-            image = binary_image_to_numpy(binary_media)
-            _, encoded_image = cv2.imencode('.png', image)
-            encoded_media = encoded_image.tobytes()
-
-        except Exception as e:
-            errors += f"Error converting binary image to numpy: {str(e)}"
+    if content_type.startswith("image/"):  # image/png, image/webp, image/jpeg or image/jxl
+        # Process image: the encoded bytes are exactly the ones the camera signed, so they are hashed as they are
+        encoded_media = binary_media
 
         try:
             details = get_json_details(binary_media)
@@ -54,26 +347,31 @@ def handler(event, context):
                 time_data = details[3]
                 location_data = details[4]
                 signature_string = details[5]
+                merkle_proof = details[6]
                 signature = base64.b64decode(signature_string)
 
         except Exception as e:
             errors += f"Error getting JSON details: {str(e)}"
 
         try:
-            combined_data = create_combined(fingerprint, camera_number, encoded_media, date_data, time_data, location_data)
+            digest = create_combined_digest(fingerprint, camera_number, encoded_media, date_data, time_data, location_data)
         
         except Exception as e:
             errors += f"Error combining data: {str(e)}"
 
         try:
-            public_key_base64 = get_public_key(int(camera_number))
-            public_key = base64.b64decode(public_key_base64)
+            public_key = public_key_cache.get(int(camera_number))
 
         except Exception as e:
             errors += f"Public key error: {str(e)}"
 
         try: 
-            valid = verify_signature(combined_data, signature, public_key)
+            valid = verify_signature(digest, signature, public_key, merkle_proof)
+            if not valid:
+                # The camera's key may have been rotated since it was cached; check once against the current key
+                rotated_key = public_key_cache.refresh(int(camera_number))
+                if rotated_key is not None:
+                    valid = verify_signature(digest, signature, rotated_key, merkle_proof)
 
         except Exception as e:
             valid = False  # Something went wrong verifying the signature
@@ -122,7 +420,7 @@ def handler(event, context):
                 'body': json.dumps({"error": errors})
             }
 
-    else:  # Content type is video/avi
+    else:  # Content type is a video (video/x-matroska from current cameras, video/avi from older ones)
         # Process video
         try:
             details = get_json_details(binary_media)
@@ -133,26 +431,39 @@ def handler(event, context):
                 time_data = details[3]
                 location_data = details[4]
                 signature_string = details[5]
+                merkle_proof = details[6]
+                segment_manifest = details[7]
                 signature = base64.b64decode(signature_string)
 
         except Exception as e:
             errors += f"Error getting JSON details for video: {str(e)}"
 
         try:
-            combined_data = create_combined(fingerprint, camera_number, binary_media, date_data, time_data, location_data)
+            if segment_manifest:
+                # Signed in segments: the signature covers the manifest, which must match the video
+                bad_segments = verify_segments(binary_media, segment_manifest)
+                if bad_segments:
+                    raise ValueError(f"Segments {bad_segments} do not match their signed hashes")
+                digest = create_segmented_digest(fingerprint, camera_number, segment_manifest, date_data, time_data, location_data)
+            else:
+                digest = create_combined_digest(fingerprint, camera_number, binary_media, date_data, time_data, location_data)
         
         except Exception as e:
             errors += f"Error combining data: {str(e)}"
 
         try:
-            public_key_base64 = get_public_key(int(camera_number))
-            public_key = base64.b64decode(public_key_base64)
+            public_key = public_key_cache.get(int(camera_number))
 
         except Exception as e:
             errors += f"Public key error: {str(e)}"
 
         try: 
-            valid = verify_signature(combined_data, signature, public_key)
+            valid = verify_signature(digest, signature, public_key, merkle_proof)
+            if not valid:
+                # The camera's key may have been rotated since it was cached; check once against the current key
+                rotated_key = public_key_cache.refresh(int(camera_number))
+                if rotated_key is not None:
+                    valid = verify_signature(digest, signature, rotated_key, merkle_proof)
 
         except Exception as e:
             valid = False  # Something went wrong verifying the signature
@@ -201,41 +512,408 @@ def handler(event, context):
                 'body': json.dumps({"error": errors})
             }
 
-def get_hash_for_query(binary_image):
+BATCH_LIMIT = 100   # The most items one batch request may verify
+BATCH_WORKERS = 8   # The number of items verified at the same time
+
+REFERENCE_BATCH_LIMIT = 10                    # The most URL items one batch request may contain
+REFERENCE_MAX_BYTES = 256 * 1024 * 1024       # The largest object a URL item may point to
+REFERENCE_BATCH_MAX_BYTES = 256 * 1024 * 1024 # The most bytes all URL items of one request may fetch together
+REFERENCE_BUCKETS = {'unverifiedimages'}      # Buckets URL items may point to, besides the users' verified buckets
+
+# S3 REST endpoints only: <bucket>.s3[.<region>].amazonaws.com or path-style s3[.<region>].amazonaws.com
+S3_HOSTNAME = re.compile(r'^(?:(?P<bucket>[a-z0-9][a-z0-9.-]{1,61}[a-z0-9])\.)?s3(?:\.[a-z]{2}(?:-[a-z]+)+-\d+)?\.amazonaws\.com$')
+
+def verify_batch(items):
     """
-    Generates a SHA-256 hash for the provided binary image.
+    Verifies many media items in one request, e.g. every image in a timeline.
+
+    Each item is either {"type": ..., "image": <base64 media>} like a single request, or
+    {"hash": <SHA-256 hex of the media>} for media the verifier has already seen, which then
+    does not have to be sent again, or {"url": <presigned S3 URL>} (see `verify_reference`).
+    Verdicts for hashes are served from the verdict cache when possible. The details of every item are fetched with a single
+    `image_hash IN (...)` query, and the items are hashed and verified on a thread pool;
+    public keys come from the shared cache, so each camera's key is loaded at most once.
 
     Args:
-        binary_image (bytes): The binary image data.
+        items (list): The items to verify, at most BATCH_LIMIT, of which at most REFERENCE_BATCH_LIMIT are URLs.
 
     Returns:
-        str: The SHA-256 hash of the image.
+        dict: The HTTP response; its body has a "results" list with one result per item, in order.
+    """
+    if not isinstance(items, list) or not 0 < len(items) <= BATCH_LIMIT:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({"error": f"items must be a list of 1 to {BATCH_LIMIT} media items or hashes"})
+        }
+
+    # Each URL item makes the verifier download an object, so only a few are allowed per batch
+    if sum(1 for item in items if isinstance(item, dict) and 'url' in item) > REFERENCE_BATCH_LIMIT:
+        return {
+            'statusCode': 400,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({"error": f"A batch may contain at most {REFERENCE_BATCH_LIMIT} url items"})
+        }
+
+    results = verify_items(items)
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({"results": results})
+    }
+
+def verify_reference(body):
+    """
+    Verifies media from a reference instead of the media itself.
+
+    The body is {"hash": <SHA-256 hex>} or {"url": <presigned S3 GET URL>}. With a hash, the
+    stored verdict for that media is returned without the media being sent at all. With a URL,
+    the verifier reads the object from S3 itself (so nothing is base64 encoded), hashes it and
+    returns the stored verdict; with "full": true it re-verifies the media from scratch instead.
+    Verdicts are cached by hash here and marked cacheable by hash for clients.
+
+    Args:
+        body (dict): The request body.
+
+    Returns:
+        dict: The HTTP response; its body is a single batch result ("hash", "result" and "metadata").
+    """
+    result = verify_items([body])[0]
+
+    headers = {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*'
+    }
+    if 'error' not in result:
+        headers['Cache-Control'] = f"public, max-age={int(verdict_cache.ttl)}"
+        headers['ETag'] = f'"{result["hash"]}"'
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps(result)
+    }
+
+def verify_items(items):
+    """
+    Verifies a list of media items or references (see `verify_batch`), returning one result per item.
     """
+    budget = ByteBudget(REFERENCE_BATCH_MAX_BYTES)  # Shared by every URL item of this request
+
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+        # Decode and hash every item
+        prepared_items = list(executor.map(lambda item: prepare_batch_item(item, budget), items))
+
+        try:
+            # References that do not ask for full verification can use a cached verdict
+            results = [None] * len(prepared_items)
+            for index, (image_hash, binary_media, error) in enumerate(prepared_items):
+                if binary_media is None and not error:
+                    results[index] = verdict_cache.get(image_hash)
+
+            # Fetch the details of all remaining items in one round trip
+            pending = [index for index, result in enumerate(results) if result is None]
+            image_hashes = {prepared_items[index][0] for index in pending if prepared_items[index][0]}
+
+            try:
+                details_by_hash = get_json_details_batch(sorted(image_hashes))
+            except Exception as e:
+                details_by_hash = {}
+                print(f"Error getting JSON details for batch: {str(e)}")
+
+            verdicts = executor.map(lambda index: verify_batch_item(prepared_items[index], details_by_hash), pending)
+            for index, result in zip(pending, verdicts):
+                results[index] = result
+                if 'error' not in result:
+                    verdict_cache.put(result['hash'], result)  # A verdict depends only on the media hash
+
+        finally:
+            # Media fetched for full verification was spooled to /tmp, which the container reuses
+            for _, binary_media, _ in prepared_items:
+                if isinstance(binary_media, str) and os.path.exists(binary_media):
+                    os.remove(binary_media)
+
+    return results
+
+class ByteBudget:
+    """
+    Caps the total bytes the URL items of one request may fetch, across the worker threads.
+
+    Args:
+        limit (int): The most bytes that may be taken.
+    """
+
+    def __init__(self, limit):
+        self.remaining = limit
+        self.lock = threading.Lock()
+
+    def take(self, count):
+        """
+        Account for `count` more fetched bytes.
+
+        Raises:
+            ValueError: If the request has fetched more than its limit.
+        """
+        with self.lock:
+            self.remaining -= count
+            if self.remaining < 0:
+                raise ValueError("The url items of this request are larger than allowed in total")
+
+class RefuseRedirects(urllib.request.HTTPRedirectHandler):
+    """
+    Fails on any redirect, so a reference URL cannot send the verifier to another host.
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        raise urllib.error.HTTPError(req.full_url, code, "Redirects are not followed for media references", headers, fp)
+
+reference_opener = urllib.request.build_opener(RefuseRedirects)
+
+def check_reference_url(url):
+    """
+    Checks that a media reference is an HTTPS URL of an S3 object in an allowed bucket.
+
+    Only S3 REST endpoints are accepted (not any *.amazonaws.com host, which would include
+    EC2 instances, API Gateway and S3 website endpoints), both virtual-hosted
+    (<bucket>.s3[.<region>].amazonaws.com) and path-style (s3[.<region>].amazonaws.com/<bucket>/...).
+
+    Raises:
+        ValueError: If the URL is not allowed.
+    """
+    parsed_url = urlparse(url)
+    match = S3_HOSTNAME.match(parsed_url.hostname or '')
+    if parsed_url.scheme != 'https' or match is None or parsed_url.port not in (None, 443):
+        raise ValueError("url must be a presigned https S3 URL")
+
+    bucket = match.group('bucket') or parsed_url.path.lstrip('/').split('/')[0]
+    if not bucket or not is_verifier_bucket(bucket):
+        raise ValueError("url must point to one of the verifier's buckets")
+
+def is_verifier_bucket(bucket):
+    """
+    Returns True for the upload bucket (REFERENCE_BUCKETS) and the users' verified buckets.
+
+    Verified buckets are named after their user, so there is no fixed list; the ingest verifier
+    keeps a media counter for every verified bucket it writes to, which serves as the list.
+    """
+    if bucket in REFERENCE_BUCKETS:
+        return True
+
+    query = "SELECT 1 FROM media_counters WHERE bucket_name = %s"
+    return bool(database_pool.query(query, (bucket,)))
+
+def fetch_media_reference(url, keep_media, budget):
+    """
+    Reads media from a presigned S3 URL, hashing it as it arrives.
+
+    The body is read in 1 MB chunks into one reused buffer (like CombinedDigest.update_from_file
+    on the camera). Media kept for full verification is spooled to a file in /tmp rather than
+    held in memory. Redirects are refused, objects larger than REFERENCE_MAX_BYTES are rejected,
+    both from their Content-Length and while reading, and every byte counts against the
+    request's budget.
+
+    Args:
+        url (str): A presigned HTTPS GET URL for an S3 object.
+        keep_media (bool): Whether to keep the media (for full verification) or only hash it.
+        budget (ByteBudget): The request's remaining fetch allowance.
+
+    Returns:
+        tuple: The SHA-256 hex of the media, and the path of the spooled media (None unless
+               `keep_media`); the caller removes the file.
+
+    Raises:
+        ValueError: If the URL is not allowed or the object is too large.
+    """
+    check_reference_url(url)
+
     hash_object = hashlib.sha256()
-    hash_object.update(binary_image)
-    image_hash = hash_object.hexdigest()
+    buffer = bytearray(1024 * 1024)
+    view = memoryview(buffer)
+    length = 0
+    media_file = tempfile.NamedTemporaryFile(dir='/tmp', delete=False) if keep_media else None
 
-    return image_hash
+    try:
+        with reference_opener.open(url, timeout=30) as response:
+            content_length = response.headers.get('Content-Length')
+            if content_length is not None and int(content_length) > REFERENCE_MAX_BYTES:
+                raise ValueError(f"Media is larger than {REFERENCE_MAX_BYTES} bytes")
+
+            while True:
+                bytes_read = response.readinto(buffer)
+                if not bytes_read:
+                    break
+                length += bytes_read
+                if length > REFERENCE_MAX_BYTES:
+                    raise ValueError(f"Media is larger than {REFERENCE_MAX_BYTES} bytes")
+                budget.take(bytes_read)
+
+                hash_object.update(view[:bytes_read])
+                if media_file is not None:
+                    media_file.write(view[:bytes_read])
+
+    except Exception:
+        if media_file is not None:
+            media_file.close()
+            os.remove(media_file.name)
+        raise
+
+    if media_file is None:
+        return hash_object.hexdigest(), None
+
+    media_file.close()
+    return hash_object.hexdigest(), media_file.name
+
+def prepare_batch_item(item, budget):
+    """
+    Decodes one batch item and works out the hash its details are stored under.
+
+    Args:
+        item (dict): {"type": ..., "image": <base64 media>}, {"hash": <SHA-256 hex>}, or
+                     {"url": <presigned S3 URL>} with an optional "full": true.
+        budget (ByteBudget): The request's remaining allowance for fetching URL items.
+
+    Returns:
+        tuple: The media hash, the decoded media (bytes, the path of media spooled from a URL, or
+               None for a hash-only item) and an error message (or None).
+    """
+    try:
+        if 'image' in item:
+            binary_media = base64.b64decode(item['image'])
+            return get_hash_for_query(binary_media), binary_media, None
+
+        if 'url' in item:
+            image_hash, binary_media = fetch_media_reference(item['url'], bool(item.get('full')), budget)
+            return image_hash, binary_media, None
+
+        image_hash = str(item['hash']).lower()
+        bytes.fromhex(image_hash)  # Reject anything that is not hex
+        return image_hash, None, None
 
-def binary_image_to_numpy(binary_image):
+    except Exception as e:
+        return None, None, f"Error decoding item: {str(e)}"
+
+def verify_batch_item(prepared_item, details_by_hash):
     """
-    Converts a binary image to a NumPy array.
+    Verifies one decoded batch item against its stored details.
+
+    Items sent with their media are verified exactly like a single request. A hash-only item is
+    verified with the digest the ingest verifier stored when the media arrived (after checking the
+    media itself), so only the signature check is repeated.
 
     Args:
-        binary_image (bytes): The binary image data.
+        prepared_item (tuple): The result of `prepare_batch_item`.
+        details_by_hash (dict): The stored details of every item, by media hash.
+
+    Returns:
+        dict: {"hash", "result": "True", "metadata"} for valid media, or {"hash", "result": "False"}
+              with an "error" when the item could not be checked.
+    """
+    image_hash, binary_media, error = prepared_item
+    if error:
+        return {"hash": image_hash, "result": "False", "error": error}
+
+    data = details_by_hash.get(image_hash)
+    if data is None:
+        return {"hash": image_hash, "result": "False", "error": "Unknown media"}
+
+    try:
+        fingerprint = data.get("Fingerprint")
+        camera_number = data.get("Camera Number")
+        date_data = data.get("Date")
+        time_data = data.get("Time")
+        location_data = data.get("Location")
+        signature_string = data.get("Signature_Base64")
+        merkle_proof = data.get("Merkle_Proof")
+        segment_manifest = data.get("Segment_Manifest")
+        signature = base64.b64decode(signature_string)
+
+        if binary_media is None:
+            if not data.get("Digest"):
+                return {"hash": image_hash, "result": "False", "error": "No stored digest; send the media (or \"full\": true) to verify it"}
+            digest = bytes.fromhex(data["Digest"])
+        elif segment_manifest:
+            if verify_segments(binary_media, segment_manifest):
+                return {"hash": image_hash, "result": "False"}
+            digest = create_segmented_digest(fingerprint, camera_number, segment_manifest, date_data, time_data, location_data)
+        else:
+            digest = create_combined_digest(fingerprint, camera_number, binary_media, date_data, time_data, location_data)
+
+        public_key = public_key_cache.get(int(camera_number))
+        valid = verify_signature(digest, signature, public_key, merkle_proof)
+        if not valid:
+            # The camera's key may have been rotated since it was cached; check once against the current key
+            rotated_key = public_key_cache.refresh(int(camera_number))
+            if rotated_key is not None:
+                valid = verify_signature(digest, signature, rotated_key, merkle_proof)
+
+    except Exception as e:
+        return {"hash": image_hash, "result": "False", "error": f"Error verifying item: {str(e)}"}
+
+    if not valid:
+        return {"hash": image_hash, "result": "False"}
+
+    return {
+        "hash": image_hash,
+        "result": "True",
+        "metadata": {
+            "fingerprint": fingerprint,
+            "camera_number": camera_number,
+            "date_data": date_data,
+            "time_data": time_data,
+            "location_data": location_data,
+            "signature": signature_string
+        }
+    }
+
+def get_json_details_batch(image_hashes):
+    """
+    Retrieves the stored details of many media items with a single query.
+
+    Args:
+        image_hashes (list): The SHA-256 hex hashes of the media.
 
     Returns:
-        numpy.ndarray: The image as a NumPy array.
+        dict: The details (as stored by the ingest verifier) by media hash; unknown hashes are left out.
     """
-    temp_file_path = "/tmp/my_temp_file.png"
+    if not image_hashes:
+        return {}
 
-    with open(temp_file_path, 'wb') as file:
-        file.write(binary_image)
+    placeholders = ', '.join(['%s'] * len(image_hashes))
+    query = f"SELECT image_hash, data FROM image_data WHERE image_hash IN ({placeholders})"
+    rows = database_pool.query(query, tuple(image_hashes), cache=False)  # The arity varies, so the statement is not kept
 
-    image = cv2.imread(temp_file_path)
-    os.remove(temp_file_path)
+    details_by_hash = {}
+    for image_hash, data in rows:
+        if isinstance(image_hash, bytes):
+            image_hash = image_hash.decode('utf-8')
+        details_by_hash[image_hash] = json.loads(data)
+    return details_by_hash
 
-    return image
+def get_hash_for_query(binary_image):
+    """
+    Generates a SHA-256 hash for the provided binary image.
+
+    Args:
+        binary_image (bytes): The binary image data.
+
+    Returns:
+        str: The SHA-256 hash of the image.
+    """
+    hash_object = hashlib.sha256()
+    hash_object.update(binary_image)
+    image_hash = hash_object.hexdigest()
+
+    return image_hash
 
 def get_json_details(binary_image):
     """
@@ -245,33 +923,17 @@ def get_json_details(binary_image):
         binary_image (bytes): The binary image data.
 
     Returns:
-        list: A list containing the fingerprint, camera number, date, time, location, and signature.
+        list: A list containing the fingerprint, camera number, date, time, location, signature, Merkle proof
+              and segment manifest.
         bool: False if no matching hash is found in the database.
     """
     # Hash the image data to use as an index
     image_hash = get_hash_for_query(binary_image)
 
-    # Database connection details
-    host = "publickeycamerastorage.c90gvpt3ri4q.us-east-2.rds.amazonaws.com"
-    user = "sdp"
-    password = "sdpsdpsdp"
-    database = "PublicKeySchema"
-
-    # Connect to the database
-    connection = mysql.connector.connect(
-        host=host, user=user, password=password, database=database
-    )
-    cursor = connection.cursor()
-
-    # SQL query to retrieve the data for the given image_hash
+    # SQL query to retrieve the data for the given image_hash, on a pooled connection
     query = "SELECT data FROM image_data WHERE image_hash = %s"
-
-    cursor.execute(query, (str(image_hash),))
-
-    # Fetch the result
-    result = cursor.fetchone()
-    cursor.close()
-    connection.close()
+    rows = database_pool.query(query, (str(image_hash),))
+    result = rows[0] if rows else None
 
     if result:  # If the image_hash is found in the database
         data = json.loads(result[0])
@@ -281,6 +943,8 @@ def get_json_details(binary_image):
         time_data = data.get("Time")
         location_data = data.get("Location")
         signature = data.get("Signature_Base64")
+        merkle_proof = data.get("Merkle_Proof")  # Only present for batch-signed captures
+        segment_manifest = data.get("Segment_Manifest")  # Only present for videos signed in segments
 
         print("Fingerprint: ", fingerprint)
         print("Camera Number: ", camera_number)
@@ -289,34 +953,178 @@ def get_json_details(binary_image):
         print("Location: ", location_data)
         print("Signature: ", signature)
 
-        return [fingerprint, camera_number, date_data, time_data, location_data, signature]
+        return [fingerprint, camera_number, date_data, time_data, location_data, signature, merkle_proof, segment_manifest]
     
     return False  # If the image_hash is not found in the database
 
-def create_combined(fingerprint, camera_number, media, date, time, location):
+def create_combined_digest(fingerprint, camera_number, media, date, time, location):
     """
-    Combines provided data into a single byte object.
+    Computes the SHA-256 digest of the combined data without building the combined byte object.
+
+    The bytes are fed into the hash in the same order the camera combines them
+    (fingerprint + camera number + media + date + time + location), so the digest is
+    identical to hashing the concatenation, but the media is never copied.
 
     Args:
         fingerprint (str): The fingerprint data.
         camera_number (str): The camera number.
-        media (bytes): The media file data.
+        media (bytes or str): The media file data, or the path of a file holding it.
         date (str): The date of the media capture.
         time (str): The time of the media capture.
         location (str): The location of the media capture.
 
     Returns:
-        bytes: The combined byte object containing all provided data.
+        bytes: The SHA-256 digest of the combined data.
+    """
+    hash_object = hashlib.sha256()
+    hash_object.update(fingerprint.encode('utf-8'))
+    hash_object.update(camera_number.encode('utf-8'))
+
+    if isinstance(media, str):
+        # Stream the media from disk in 1 MB chunks
+        buffer = bytearray(1024 * 1024)
+        view = memoryview(buffer)
+        with open(media, 'rb') as media_file:
+            while True:
+                bytes_read = media_file.readinto(buffer)
+                if not bytes_read:
+                    break
+                hash_object.update(view[:bytes_read])
+    else:
+        hash_object.update(memoryview(media).cast('B'))
+
+    hash_object.update(date.encode('utf-8'))
+    hash_object.update(time.encode('utf-8'))
+    hash_object.update(location.encode('utf-8'))
+
+    return hash_object.digest()
+
+def manifest_root(manifest):
+    """
+    Computes the manifest root that a segmented video's signature covers.
+
+    The segment hashes are chained in order: chain_0 = SHA-256(seed) and
+    chain_i = SHA-256(chain_(i-1) + hash_i). In the segmented-v2 layout the root also covers the
+    segment size and video length (root = SHA-256(chain + segment_size + length), as 8-byte
+    big-endian integers), so they cannot be edited in the manifest. The segmented-v1 root is the
+    chain alone; those videos rely on `verify_segments` checking the segment count and length.
+
+    Args:
+        manifest (dict): The parsed segment manifest.
+
+    Returns:
+        bytes: The manifest root.
+
+    Raises:
+        ValueError: If the manifest's layout is unknown.
     """
-    encoded_fingerprint = fingerprint.encode('utf-8')
-    encoded_number = camera_number.encode('utf-8')
-    encoded_date = date.encode('utf-8')
-    encoded_time = time.encode('utf-8')
-    encoded_location = location.encode('utf-8')
+    layout = manifest.get('layout')
+    if layout not in SEGMENTED_LAYOUTS:
+        raise ValueError(f"Unknown segment manifest layout {layout}")
+
+    root = hashlib.sha256(b'photolock-segments-v1' if layout == 'segmented-v1' else b'photolock-segments-v2').digest()
+    for segment_hash in manifest['segments']:
+        root = hashlib.sha256(root + bytes.fromhex(segment_hash)).digest()
 
-    combined_data = encoded_fingerprint + encoded_number + media + encoded_date + encoded_time + encoded_location
+    if layout == 'segmented-v1':
+        return root
+    return hashlib.sha256(root + manifest['segment_size'].to_bytes(8, 'big') + manifest['length'].to_bytes(8, 'big')).digest()
 
-    return combined_data
+def check_manifest(manifest, media_length):
+    """
+    Checks that a segment manifest describes a video of `media_length` bytes.
+
+    The video must be exactly `length` bytes and split into exactly ceil(length / segment_size)
+    segments, so no bytes can be appended beyond the ones the segment hashes cover.
+
+    Raises:
+        ValueError: If the length or segment count does not match.
+    """
+    segment_size = manifest['segment_size']
+    if not isinstance(segment_size, int) or segment_size <= 0:
+        raise ValueError(f"Invalid segment size {segment_size}")
+    if media_length != manifest['length']:
+        raise ValueError(f"Video is {media_length} bytes, manifest expects {manifest['length']}")
+    if len(manifest['segments']) != -(-media_length // segment_size):
+        raise ValueError(f"Manifest has {len(manifest['segments'])} segments for {media_length} bytes")
+
+def create_segmented_digest(fingerprint, camera_number, segment_manifest, date, time, location):
+    """
+    Computes the signed digest of a video recorded in segments (the segmented-v1/v2 layouts).
+
+    The media is replaced by the manifest root chaining the segment hashes:
+    fingerprint + camera number + manifest root + date + time + location.
+
+    Args:
+        fingerprint (str): The fingerprint data.
+        camera_number (str): The camera number.
+        segment_manifest (str): The JSON segment manifest stored with the video's details.
+        date (str): The date of the media capture.
+        time (str): The time of the media capture.
+        location (str): The location of the media capture.
+
+    Returns:
+        bytes: The SHA-256 digest that was signed.
+    """
+    manifest = json.loads(segment_manifest)
+
+    hash_object = hashlib.sha256()
+    hash_object.update(fingerprint.encode('utf-8'))
+    hash_object.update(camera_number.encode('utf-8'))
+    hash_object.update(manifest_root(manifest))
+    hash_object.update(date.encode('utf-8'))
+    hash_object.update(time.encode('utf-8'))
+    hash_object.update(location.encode('utf-8'))
+
+    return hash_object.digest()
+
+def hash_segment(media_path, offset, length):
+    """
+    Computes the SHA-256 hash of one segment of a file, reading it in 1 MB chunks.
+    """
+    hash_object = hashlib.sha256()
+    with open(media_path, 'rb') as media_file:
+        media_file.seek(offset)
+        while length > 0:
+            chunk = media_file.read(min(length, 1024 * 1024))
+            if not chunk:
+                break
+            hash_object.update(chunk)
+            length -= len(chunk)
+    return hash_object.digest()
+
+def verify_segments(media, segment_manifest, workers=4):
+    """
+    Checks every segment of a video against its manifest, hashing several segments in parallel.
+
+    Args:
+        media (bytes or str): The video data, or the path of a file holding it.
+        segment_manifest (str): The JSON segment manifest stored with the video's details.
+        workers (int): The number of segments hashed at the same time.
+
+    Returns:
+        list: The indexes of the segments that do not match; empty if the video is intact.
+    """
+    manifest = json.loads(segment_manifest)
+    segment_size = manifest['segment_size']
+
+    if isinstance(media, str):
+        check_manifest(manifest, os.path.getsize(media))
+
+        def check(index):
+            return hash_segment(media, index * segment_size, segment_size).hex() == manifest['segments'][index]
+    else:
+        view = memoryview(media).cast('B')
+        check_manifest(manifest, len(view))
+
+        def check(index):
+            segment = view[index * segment_size:(index + 1) * segment_size]
+            return hashlib.sha256(segment).hexdigest() == manifest['segments'][index]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(check, range(len(manifest['segments']))))
+
+    return [index for index, matches in enumerate(results) if not matches]
 
 def get_public_key(camera_number):
     """
@@ -328,27 +1136,10 @@ def get_public_key(camera_number):
     Returns:
         str: The public key in PEM format, or an error message if not found.
     """
-    # Database connection details
-    host = "publickeycamerastorage.c90gvpt3ri4q.us-east-2.rds.amazonaws.com"
-    user = "sdp"
-    password = "sdpsdpsdp"
-    database = "PublicKeySchema"
-
-    # Connect to the database
-    connection = mysql.connector.connect(
-        host=host, user=user, password=password, database=database
-    )
-    cursor = connection.cursor()
-
-    # SQL query to retrieve the public key
+    # SQL query to retrieve the public key, on a pooled connection
     query = "SELECT PublicKey FROM Cameras WHERE CameraNumber = %s"
-
-    cursor.execute(query, (int(camera_number),))
-
-    # Fetch the result
-    result = cursor.fetchone()
-    cursor.close()
-    connection.close()
+    rows = database_pool.query(query, (int(camera_number),))
+    result = rows[0] if rows else None
 
     if result:
         public_key = result[0]
@@ -356,39 +1147,62 @@ def get_public_key(camera_number):
     
     return 'Public key not found'
 
-def verify_signature(combined_data, signature, public_key):
+def merkle_root_from_proof(digest, merkle_proof):
+    """
+    Recomputes the Merkle root a batch-signed capture's digest leads to.
+
+    The camera can sign a burst of captures with one signature over the Merkle root of their
+    digests. Leaves are SHA-256(0x00 + digest) and nodes are SHA-256(0x01 + left + right).
+
+    Args:
+        digest (bytes): The SHA-256 digest of the capture's combined data.
+        merkle_proof (str): The encoded inclusion proof, e.g. "L:<hex>,R:<hex>".
+
+    Returns:
+        bytes: The Merkle root that was signed.
+    """
+    node = hashlib.sha256(b'\x00' + digest).digest()
+
+    for entry in merkle_proof.split(','):
+        side, sibling = entry[0], bytes.fromhex(entry[2:])
+        if side == 'L':
+            node = hashlib.sha256(b'\x01' + sibling + node).digest()
+        else:
+            node = hashlib.sha256(b'\x01' + node + sibling).digest()
+
+    return node
+
+def verify_signature(digest, signature, public_key, merkle_proof=None):
     """
     Verifies the digital signature of the combined data using the provided public key.
 
+    The TPM signs the SHA-256 digest directly, so the digest is verified as prehashed data.
+    For captures signed in a batch, the signature covers the Merkle root, which is recomputed
+    from the digest and its inclusion proof first.
+
     Args:
-        combined_data (bytes): The combined data that was signed.
+        digest (bytes): The SHA-256 digest of the combined data that was signed.
         signature (bytes): The signature to verify.
-        public_key (bytes): The public key to use for verification.
+        public_key: The parsed public key (e.g. from the public key cache), or a PEM-encoded key as bytes.
+        merkle_proof (str): The encoded Merkle inclusion proof, or None for an individually signed capture.
 
     Returns:
         bool: True if the signature is valid, False otherwise.
     """
-    temp_public_key_path = '/tmp/recreated_public_key.pem'
-
-    with open(temp_public_key_path, "wb") as file:
-        file.write(public_key)
-
-    with open(temp_public_key_path, "rb") as key_file:
-        public_key_data = key_file.read()
+    if merkle_proof:
+        digest = merkle_root_from_proof(digest, merkle_proof)
 
-    # Deserialize the public key from PEM format
-    public_key = serialization.load_pem_public_key(public_key_data)
+    if isinstance(public_key, bytes):
+        public_key = serialization.load_pem_public_key(public_key)  # A PEM key that was not cached
 
     try:
         public_key.verify(
             signature,
-            combined_data,
+            digest,
             padding.PKCS1v15(),
-            hashes.SHA256()
+            utils.Prehashed(hashes.SHA256())
         )
-        os.remove(temp_public_key_path)
         return True
     
     except InvalidSignature:
-        os.remove(temp_public_key_path)
         return False
@@ -3,15 +3,264 @@ import json
 import base64
 import mysql.connector
 import os
-import cv2
-import numpy as np
 from twilio.rest import Client
 from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric import padding, utils
 from cryptography.hazmat.primitives import serialization
 from cryptography.exceptions import InvalidSignature
 import hashlib
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote_plus
+import threading
+import time
+from collections import OrderedDict
+
+SEGMENTED_LAYOUTS = ('segmented-v1', 'segmented-v2')  # Videos signed over a manifest of segment hashes
+
+media_counters_ready = False  # Whether this container has made sure the media_counters table exists
+
+# Still image formats the camera can encode: metadata 'format' value -> file extension
+IMAGE_FORMATS = {'png': '.png', 'webp': '.webp', 'jpeg': '.jpg', 'jxl': '.jxl'}
+
+# Database connection details
+DATABASE_CONFIG = {
+    'host': "",
+    'user': "",
+    'password': "",
+    'database': "",
+}
+
+class DatabasePool:
+    """
+    Keeps MySQL connections open across warm invocations and caches prepared statements.
+
+    Opening a connection costs a TCP, TLS and authentication handshake, which used to be paid
+    for every query. The pool lives at module scope, so a warm Lambda container reuses its
+    connections, and each connection keeps one prepared cursor per query, so repeated queries
+    skip parsing as well. Connections that were idle for a while are checked before use and
+    reconnected if the server dropped them, and a query that fails because its connection broke
+    is retried once on a fresh connection.
+
+    Args:
+        config (dict): The mysql.connector.connect arguments (host, user, password, database).
+        size (int): The most connections kept open at the same time.
+        ping_after (float): Seconds a connection may sit idle before it is checked again.
+        timeout (float): Seconds `acquire` waits for a connection when the pool is full.
+    """
+
+    def __init__(self, config, size=4, ping_after=30.0, timeout=10.0):
+        self.config = config
+        self.size = size
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self.idle = []  # (connection, prepared cursors by query, last used) ready for reuse
+        self.open = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Take a connection from the pool, opening one if none is idle and the pool is not full.
+
+        Returns:
+            tuple: (connection, prepared cursors by query) to pass back to `release`.
+
+        Raises:
+            mysql.connector.errors.PoolError: If no connection became free within `timeout` seconds.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while not self.idle and self.open >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise mysql.connector.errors.PoolError("Timed out waiting for a database connection")
+                self.condition.wait(remaining)
+
+            if not self.idle:
+                self.open += 1
+                entry = None
+            else:
+                entry = self.idle.pop()
+
+        if entry is None:
+            try:
+                return mysql.connector.connect(**self.config), {}
+            except Exception:
+                self.discard()
+                raise
+
+        connection, statements, last_used = entry
+        if time.monotonic() - last_used > self.ping_after:
+            try:
+                if not connection.is_connected():
+                    connection.reconnect(attempts=2, delay=0)
+                    statements.clear()  # Prepared statements do not survive a reconnect
+            except Exception:
+                self.discard(connection)  # Give its slot back, or the pool would shrink for good
+                raise
+        return connection, statements
+
+    def release(self, connection, statements):
+        """
+        Return a healthy connection to the pool.
+        """
+        with self.condition:
+            self.idle.append((connection, statements, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection=None):
+        """
+        Drop a broken connection (or a failed attempt to open one), making room for a new one.
+        """
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+        with self.condition:
+            self.open -= 1
+            self.condition.notify()
+
+    def query(self, query, params=(), commit=False, cache=True):
+        """
+        Run one query with a cached prepared statement and return its rows.
+
+        Args:
+            query (str): The SQL, with %s placeholders.
+            params (tuple): The query parameters.
+            commit (bool): Whether to commit afterwards (for writes).
+            cache (bool): Whether to keep a prepared statement for the query. Pass False for SQL
+                          that is built per request (e.g. a variable-length IN list): every
+                          distinct string would otherwise hold a server-side statement open on
+                          every pooled connection, until MySQL's max_prepared_stmt_count is hit.
+
+        Returns:
+            list: The result rows (empty for statements without results).
+        """
+        for attempt in range(2):
+            connection, statements = self.acquire()
+            try:
+                if cache:
+                    cursor = statements.get(query)
+                    if cursor is None:
+                        cursor = statements[query] = connection.cursor(prepared=True)
+                else:
+                    cursor = connection.cursor()  # Plain cursor, closed again below
+
+                try:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall() if cursor.with_rows else []
+                finally:
+                    if not cache:
+                        cursor.close()
+                if commit:
+                    connection.commit()
+
+            except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+                self.discard(connection)
+                if attempt:
+                    raise
+                continue  # The connection broke (e.g. the server closed it); retry once on a fresh one
+
+            except Exception:
+                self.discard(connection)
+                raise
+
+            self.release(connection, statements)
+            return rows
+
+
+# Module scope, so warm invocations of this container reuse the open connections
+database_pool = DatabasePool(DATABASE_CONFIG)
+
+class PublicKeyCache:
+    """
+    Keeps cameras' parsed public keys in memory across warm invocations.
+
+    Looking a key up used to mean a database query, a base64 decode, a round trip through a
+    temporary PEM file and a PEM parse on every request. The cache holds the parsed key objects
+    by camera number, so a repeat upload from the same camera costs only the RSA verification.
+    It is an LRU with a time-to-live: the least recently used camera is evicted when it is full,
+    and entries are reloaded after `ttl` seconds so a revoked key is not trusted for long.
+
+    When a camera's key is rotated, its uploads stop verifying against the cached key;
+    `refresh` reloads the key and reports whether it changed, and `invalidate` drops entries
+    explicitly.
+
+    Args:
+        max_size (int): The most cameras kept.
+        ttl (float): Seconds before an entry is reloaded from the database.
+    """
+
+    def __init__(self, max_size=256, ttl=600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # camera number -> (PEM, parsed key, load time), least recently used first
+        self.lock = threading.Lock()
+
+    def get(self, camera_number):
+        """
+        Return a camera's parsed public key, loading it on a miss or once its entry has expired.
+
+        Raises:
+            LookupError: If the camera has no public key.
+        """
+        with self.lock:
+            entry = self.entries.get(camera_number)
+            if entry is not None and time.monotonic() - entry[2] < self.ttl:
+                self.entries.move_to_end(camera_number)
+                return entry[1]
+
+        return self.load(camera_number)[1]
+
+    def refresh(self, camera_number):
+        """
+        Reload a camera's key after a failed verification, in case it was rotated.
+
+        Returns:
+            The new parsed key if the stored key changed, or None if it is the same one.
+        """
+        with self.lock:
+            entry = self.entries.get(camera_number)
+
+        pem, public_key = self.load(camera_number)
+        if entry is not None and entry[0] == pem:
+            return None
+        return public_key
+
+    def invalidate(self, camera_number=None):
+        """
+        Drop a camera's cached key, or every cached key if no camera is given.
+        """
+        with self.lock:
+            if camera_number is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(camera_number, None)
+
+    def load(self, camera_number):
+        """
+        Read a camera's key from the database, parse it and cache it.
+        """
+        public_key_base64 = get_public_key(camera_number)
+        if public_key_base64 == 'Public key not found':
+            raise LookupError(f"No public key for camera {camera_number}")
+
+        pem = base64.b64decode(public_key_base64)
+        public_key = serialization.load_pem_public_key(pem)  # Parsed straight from memory
+
+        with self.lock:
+            self.entries[camera_number] = (pem, public_key, time.monotonic())
+            self.entries.move_to_end(camera_number)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return pem, public_key
+
+
+# Module scope as well, so repeat uploads from a camera skip the key lookup and parse
+public_key_cache = PublicKeyCache()
 
 def handler(event, context):
     """
@@ -23,6 +272,9 @@ def handler(event, context):
     S3 bucket, and a notification is sent via SMS. If verification fails, an SMS notification
     is sent indicating the failure.
 
+    Every capture is uploaded under its own key, so each record in the event is processed
+    independently and captures from many cameras can be uploaded in parallel.
+
     Args:
         event (dict): The event payload containing S3 object details.
         context (object): AWS Lambda context object (not used in this function).
@@ -33,15 +285,48 @@ def handler(event, context):
     # Create an S3 client
     s3_client = boto3.client('s3')
 
-    # Extract bucket name and object key from the event
-    object_key = str(event['Records'][0]['s3']['object']['key'])
-    print("Object key: should be NewImage.png or NewVideo.avi", object_key)
-    bucket_name = 'unverifiedimages'
+    errors = ""
+
+    for record in event['Records']:
+        # Keys in S3 event notifications are URL-encoded
+        bucket_name = record['s3']['bucket']['name']
+        object_key = unquote_plus(record['s3']['object']['key'])
+        errors += process_media_object(s3_client, bucket_name, object_key)
+
+    print("Errors: ", errors)
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps('Function executed successfully!'),
+        'errors': errors,
+    }
+
+def process_media_object(s3_client, bucket_name, object_key):
+    """
+    Verifies and processes one uploaded capture.
+
+    Args:
+        s3_client: The Boto3 S3 client.
+        bucket_name (str): The bucket the capture was uploaded to.
+        object_key (str): The capture's key, e.g. "1/<capture hash>.png".
+
+    Returns:
+        str: Any errors that occurred, or an empty string.
+    """
+    print("Object key:", object_key)
+
+    if object_key.endswith(".manifest"):
+        return ""  # Segment manifests are read along with their video, not verified on their own
 
     # Determine if the file is an image or video based on the file extension
-    image = object_key.endswith(".png")
+    image = os.path.splitext(object_key)[1].lower() in IMAGE_FORMATS.values()
     print(f"Is this an image: {image}")
 
+    # Temporary files are named after the key so captures never share a path
+    temp_name = object_key.replace('/', '_')
+    temp_media_path = f'/tmp/{temp_name}'
+    temp_mp4_path = f'/tmp/{os.path.splitext(temp_name)[0]}.mp4'
+
     errors = ""
 
     try:
@@ -51,58 +336,86 @@ def handler(event, context):
         except Exception as e:
             errors += f"Error: Get object error : {str(e)}"
 
-        # Process the media based on whether it's an image or video
-        if image:
-            temp_media_path = '/tmp/TempNewImage.png'
-            s3_client.download_file(bucket_name, object_key, temp_media_path)
-            media = cv2.imread(temp_media_path)
-            _, encoded_image = cv2.imencode('.png', media)
-            encoded_media = encoded_image.tobytes()
-        else:
-            temp_media_path = '/tmp/TempNewVideo.avi'
-            s3_client.download_file(bucket_name, object_key, temp_media_path)
-            print("Downloading video Done")
-            temp_mp4_path = '/tmp/TempNewMp4.mp4'
-            with open(temp_media_path, 'rb') as video:
-                encoded_media = video.read()
-                print(encoded_media[-10:])
+        # Images and videos are uploaded exactly as they were signed, so both are hashed straight
+        # from the downloaded file (an image is not decoded and re-encoded first)
+        s3_client.download_file(bucket_name, object_key, temp_media_path)
+        print("Downloading media Done")
+        encoded_media = temp_media_path
                 
         # Access the object's metadata
         metadata = response['Metadata']
 
+        # Videos signed in segments have their segment manifest stored next to them
+        segment_manifest = None
+        if metadata.get('layout') in SEGMENTED_LAYOUTS:
+            try:
+                manifest_response = s3_client.get_object(Bucket=bucket_name, Key=object_key + '.manifest')
+                segment_manifest = manifest_response['Body'].read().decode('utf-8')
+            except Exception as e:
+                errors += f"Error: Cannot read segment manifest {str(e)}"
+
         try:
-            fingerprint, camera_number, date_data, time_data, location_data, signature, signature_string = recreate_data(metadata)
+            fingerprint, camera_number, date_data, time_data, location_data, signature, signature_string, merkle_proof = recreate_data(metadata)
         except Exception as e:
             errors += f"Error: Cannot recreate time and metadata {str(e)}"
 
         try:
-            print("Storing JSON details")
-            store_json_details(temp_media_path, fingerprint, camera_number, date_data, time_data, location_data, signature_string)
-            print("Stored JSON details")
-        except Exception as e:
-            errors += f"Error: Cannot store JSON details {str(e)}"
-        
-        try:
-            public_key_base64 = get_public_key(int(camera_number))
-            public_key = base64.b64decode(public_key_base64)
+            public_key = public_key_cache.get(int(camera_number))
         except Exception as e:
             errors += f"Error: Public key error: {str(e)}"
 
         try:
-            combined_data = create_combined(fingerprint, camera_number, encoded_media, date_data, time_data, location_data)
+            if segment_manifest:
+                digest = create_segmented_digest(fingerprint, camera_number, segment_manifest, date_data, time_data, location_data)
+            else:
+                digest = create_combined_digest(fingerprint, camera_number, encoded_media, date_data, time_data, location_data)
         except Exception as e:
             errors += f"Error: Couldn't combine data: {str(e)}"
 
         try: 
-            valid = verify_signature(combined_data, signature, public_key)
+            valid = verify_signature(digest, signature, public_key, merkle_proof)
+            if not valid:
+                # The camera's key may have been rotated since it was cached; check once against the current key
+                rotated_key = public_key_cache.refresh(int(camera_number))
+                if rotated_key is not None:
+                    valid = verify_signature(digest, signature, rotated_key, merkle_proof)
         except Exception as e:
             errors += f"Error: Error verifying or denying signature {str(e)}"
 
+        if image and valid:
+            # The signature covers the bytes, so the format only has to match what they actually are
+            image_format = metadata.get('format', 'png')  # Images from before formats were recorded are PNG
+            with open(temp_media_path, 'rb') as media_file:
+                detected_format = detect_image_format(media_file.read(16))
+            if detected_format != image_format:
+                valid = False
+                errors += f"Error: Image is {detected_format} but its metadata says {image_format}"
+
+        if segment_manifest and valid:
+            # The signature covers the manifest; now check the video against it, several segments at a time
+            try:
+                bad_segments = verify_segments(temp_media_path, segment_manifest)
+                if bad_segments:
+                    valid = False
+                    errors += f"Error: Segments {bad_segments} do not match their signed hashes"
+            except Exception as e:
+                valid = False
+                errors += f"Error: Couldn't verify segments: {str(e)}"
+
+        try:
+            # Stored after verification so the digest is only recorded for media that verified
+            print("Storing JSON details")
+            store_json_details(temp_media_path, fingerprint, camera_number, date_data, time_data, location_data, signature_string,
+                               merkle_proof, segment_manifest, digest if valid else None)
+            print("Stored JSON details")
+        except Exception as e:
+            errors += f"Error: Cannot store JSON details {str(e)}"
+
         if valid:
             try:
                 media_save_name, media_number = upload_verified(
                     s3_client, fingerprint, camera_number, date_data, time_data, location_data, 
-                    signature, temp_media_path, image
+                    signature, temp_media_path, image, merkle_proof
                 )
             except Exception as e:
                 errors += f"Issue uploading to verified bucket: {str(e)}"
@@ -118,10 +431,6 @@ def handler(event, context):
             except Exception as e:
                 errors += f"Issue sending text: {str(e)}"
 
-            # Clean up temporary files
-            os.remove(temp_media_path)
-            os.remove(temp_mp4_path)
-            
         else:
             try:
                 send_text(valid, fingerprint)
@@ -131,13 +440,13 @@ def handler(event, context):
     except Exception as e:
         errors += f'There was an exception: {str(e)}'
 
-    print("Errors: ", errors)
+    finally:
+        # Clean up temporary files; every capture has its own, so none may be left behind
+        for temp_path in (temp_media_path, temp_mp4_path):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
 
-    return {
-        'statusCode': 200,
-        'body': json.dumps('Function executed successfully!'),
-        'errors': errors,
-    }
+    return errors
 
 def recreate_data(metadata):
     """
@@ -145,11 +454,11 @@ def recreate_data(metadata):
 
     Args:
         metadata (dict): The metadata dictionary containing fingerprint, camera number, 
-                         date, time, location, and signature.
+                         date, time, location, signature, and (for batch-signed captures) the Merkle proof.
 
     Returns:
         tuple: A tuple containing fingerprint, camera number, date, time, location, 
-               signature, and signature string.
+               signature, signature string, and Merkle proof (None if signed individually).
     """
     fingerprint = metadata.get('fingerprint')
     camera_number = metadata.get('cameranumber')
@@ -157,34 +466,192 @@ def recreate_data(metadata):
     time_data = metadata.get('time')
     location_data = metadata.get('location')
     signature_string = metadata.get('signature')
+    merkle_proof = metadata.get('merkleproof')
     signature = base64.b64decode(signature_string)
 
-    return fingerprint, camera_number, date_data, time_data, location_data, signature, signature_string
+    return fingerprint, camera_number, date_data, time_data, location_data, signature, signature_string, merkle_proof
 
-def create_combined(fingerprint, camera_number, media, date, time, location):
+def create_combined_digest(fingerprint, camera_number, media, date, time, location):
     """
-    Combines the provided data into a single byte object.
+    Computes the SHA-256 digest of the combined data without building the combined byte object.
+
+    The bytes are fed into the hash in the same order the camera combines them
+    (fingerprint + camera number + media + date + time + location), so the digest is
+    identical to hashing the concatenation, but the media is never copied.
 
     Args:
         fingerprint (str): The fingerprint data.
         camera_number (str): The camera number.
-        media (bytes): The media file data.
+        media (bytes or str): The media file data, or the path of a file holding it.
         date (str): The date of the media capture.
         time (str): The time of the media capture.
         location (str): The location of the media capture.
 
     Returns:
-        bytes: The combined byte object containing all provided data.
+        bytes: The SHA-256 digest of the combined data.
+    """
+    hash_object = hashlib.sha256()
+    hash_object.update(fingerprint.encode('utf-8'))
+    hash_object.update(camera_number.encode('utf-8'))
+
+    if isinstance(media, str):
+        # Stream the media from disk in 1 MB chunks
+        buffer = bytearray(1024 * 1024)
+        view = memoryview(buffer)
+        with open(media, 'rb') as media_file:
+            while True:
+                bytes_read = media_file.readinto(buffer)
+                if not bytes_read:
+                    break
+                hash_object.update(view[:bytes_read])
+    else:
+        hash_object.update(memoryview(media).cast('B'))
+
+    hash_object.update(date.encode('utf-8'))
+    hash_object.update(time.encode('utf-8'))
+    hash_object.update(location.encode('utf-8'))
+
+    return hash_object.digest()
+
+def detect_image_format(header):
+    """
+    Identifies a still image's format from its first bytes.
+
+    Args:
+        header (bytes): At least the first 12 bytes of the image.
+
+    Returns:
+        str: 'png', 'webp', 'jpeg' or 'jxl', or None if the format is not recognised.
     """
-    encoded_fingerprint = fingerprint.encode('utf-8')
-    encoded_number = camera_number.encode('utf-8')
-    encoded_date = date.encode('utf-8')
-    encoded_time = time.encode('utf-8')
-    encoded_location = location.encode('utf-8')
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    if header.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if header.startswith(b'\xff\x0a') or header.startswith(b'\x00\x00\x00\x0cJXL \r\n\x87\n'):
+        return 'jxl'
+    return None
+
+def manifest_root(manifest):
+    """
+    Computes the manifest root that a segmented video's signature covers.
+
+    The segment hashes are chained in order: chain_0 = SHA-256(seed) and
+    chain_i = SHA-256(chain_(i-1) + hash_i). In the segmented-v2 layout the root also covers the
+    segment size and video length (root = SHA-256(chain + segment_size + length), as 8-byte
+    big-endian integers), so they cannot be edited in the manifest. The segmented-v1 root is the
+    chain alone; those videos rely on `verify_segments` checking the segment count and length.
+
+    Args:
+        manifest (dict): The parsed segment manifest.
+
+    Returns:
+        bytes: The manifest root.
 
-    combined_data = encoded_fingerprint + encoded_number + media + encoded_date + encoded_time + encoded_location
+    Raises:
+        ValueError: If the manifest's layout is unknown.
+    """
+    layout = manifest.get('layout')
+    if layout not in SEGMENTED_LAYOUTS:
+        raise ValueError(f"Unknown segment manifest layout {layout}")
+
+    root = hashlib.sha256(b'photolock-segments-v1' if layout == 'segmented-v1' else b'photolock-segments-v2').digest()
+    for segment_hash in manifest['segments']:
+        root = hashlib.sha256(root + bytes.fromhex(segment_hash)).digest()
+
+    if layout == 'segmented-v1':
+        return root
+    return hashlib.sha256(root + manifest['segment_size'].to_bytes(8, 'big') + manifest['length'].to_bytes(8, 'big')).digest()
+
+def check_manifest(manifest, media_length):
+    """
+    Checks that a segment manifest describes a video of `media_length` bytes.
 
-    return combined_data
+    The video must be exactly `length` bytes and split into exactly ceil(length / segment_size)
+    segments, so no bytes can be appended beyond the ones the segment hashes cover.
+
+    Raises:
+        ValueError: If the length or segment count does not match.
+    """
+    segment_size = manifest['segment_size']
+    if not isinstance(segment_size, int) or segment_size <= 0:
+        raise ValueError(f"Invalid segment size {segment_size}")
+    if media_length != manifest['length']:
+        raise ValueError(f"Video is {media_length} bytes, manifest expects {manifest['length']}")
+    if len(manifest['segments']) != -(-media_length // segment_size):
+        raise ValueError(f"Manifest has {len(manifest['segments'])} segments for {media_length} bytes")
+
+def create_segmented_digest(fingerprint, camera_number, segment_manifest, date, time, location):
+    """
+    Computes the signed digest of a video recorded in segments (the segmented-v1/v2 layouts).
+
+    The layout is the same as for other captures, except that the media is replaced by the
+    manifest root chaining the segment hashes: fingerprint + camera number + manifest root +
+    date + time + location. The video itself is checked against the manifest by `verify_segments`.
+
+    Args:
+        fingerprint (str): The fingerprint data.
+        camera_number (str): The camera number.
+        segment_manifest (str): The JSON segment manifest uploaded next to the video.
+        date (str): The date of the media capture.
+        time (str): The time of the media capture.
+        location (str): The location of the media capture.
+
+    Returns:
+        bytes: The SHA-256 digest that was signed.
+    """
+    manifest = json.loads(segment_manifest)
+
+    hash_object = hashlib.sha256()
+    hash_object.update(fingerprint.encode('utf-8'))
+    hash_object.update(camera_number.encode('utf-8'))
+    hash_object.update(manifest_root(manifest))
+    hash_object.update(date.encode('utf-8'))
+    hash_object.update(time.encode('utf-8'))
+    hash_object.update(location.encode('utf-8'))
+
+    return hash_object.digest()
+
+def hash_segment(media_path, offset, length):
+    """
+    Computes the SHA-256 hash of one segment of a file, reading it in 1 MB chunks.
+    """
+    hash_object = hashlib.sha256()
+    with open(media_path, 'rb') as media_file:
+        media_file.seek(offset)
+        while length > 0:
+            chunk = media_file.read(min(length, 1024 * 1024))
+            if not chunk:
+                break
+            hash_object.update(chunk)
+            length -= len(chunk)
+    return hash_object.digest()
+
+def verify_segments(media_path, segment_manifest, workers=4):
+    """
+    Checks every segment of a video against its manifest, hashing several segments in parallel.
+
+    Args:
+        media_path (str): The path of the downloaded video.
+        segment_manifest (str): The JSON segment manifest uploaded next to the video.
+        workers (int): The number of segments hashed at the same time.
+
+    Returns:
+        list: The indexes of the segments that do not match; empty if the video is intact.
+    """
+    manifest = json.loads(segment_manifest)
+    segment_size = manifest['segment_size']
+
+    check_manifest(manifest, os.path.getsize(media_path))
+
+    def check(index):
+        return hash_segment(media_path, index * segment_size, segment_size).hex() == manifest['segments'][index]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(check, range(len(manifest['segments']))))
+
+    return [index for index, matches in enumerate(results) if not matches]
 
 def get_public_key(camera_number):
     """
@@ -196,26 +663,10 @@ def get_public_key(camera_number):
     Returns:
         str: The base64-encoded public key.
     """
-    # Database connection details
-    host = ""
-    user = ""
-    password = ""
-    database = ""
-
-    # Connect to the database
-    connection = mysql.connector.connect(
-        host=host, user=user, password=password, database=database
-    )
-    cursor = connection.cursor()
-
-    # SQL query to retrieve the public key
+    # SQL query to retrieve the public key, on a pooled connection
     query = "SELECT PublicKey FROM Cameras WHERE CameraNumber = %s"
-    cursor.execute(query, (int(camera_number),))
-
-    # Fetch the result
-    result = cursor.fetchone()
-    cursor.close()
-    connection.close()
+    rows = database_pool.query(query, (int(camera_number),))
+    result = rows[0] if rows else None
 
     if result:
         public_key = result[0]
@@ -223,7 +674,7 @@ def get_public_key(camera_number):
     
     return 'Public key not found'
 
-def upload_verified(s3_client, fingerprint, camera_number, date_data, time_data, location_data, signature, temp_media_path, image):
+def upload_verified(s3_client, fingerprint, camera_number, date_data, time_data, location_data, signature, temp_media_path, image, merkle_proof=None):
     """
     Uploads verified media and metadata to an S3 bucket.
 
@@ -237,6 +688,7 @@ def upload_verified(s3_client, fingerprint, camera_number, date_data, time_data,
         signature (bytes): The signature for verification.
         temp_media_path (str): The path to the temporary media file.
         image (bool): Whether the media is an image (True) or video (False).
+        merkle_proof (str): The Merkle inclusion proof for batch-signed captures, or None.
 
     Returns:
         tuple: A tuple containing the saved media file name and media number.
@@ -249,7 +701,9 @@ def upload_verified(s3_client, fingerprint, camera_number, date_data, time_data,
     except Exception as e:
         pass
     
-    media_file_name = f"{media_number}.png" if image else f"{media_number}.avi"
+    # Keep the uploaded container's extension (e.g. .mkv for recordings streamed from the camera)
+    media_extension = os.path.splitext(temp_media_path)[1] or ('.png' if image else '.avi')
+    media_file_name = f"{media_number}{media_extension}"
 
     # Create JSON data
     json_data = {
@@ -260,6 +714,8 @@ def upload_verified(s3_client, fingerprint, camera_number, date_data, time_data,
         "Location": location_data,
         "Signature_Base64": base64.b64encode(signature).decode('utf-8')
     }
+    if merkle_proof:
+        json_data["Merkle_Proof"] = merkle_proof
 
     # Save JSON data to a file with the same name as the media file
     json_file_name = f"{media_number}.json"
@@ -307,7 +763,11 @@ def upload_verified_mp4(s3_client, fingerprint, temp_mp4_path, media_number):
 
 def get_next_number_for_new_file(bucket_name):
     """
-    Retrieves the next available number for a new file in the S3 bucket.
+    Allocates the next number for a new file in the user's verified bucket.
+
+    Numbers come from an atomic per-bucket counter row in the database, so each allocation is
+    a constant number of queries however many files the bucket holds, and concurrent
+    invocations always get different numbers.
 
     Args:
         bucket_name (str): The name of the S3 bucket.
@@ -315,6 +775,80 @@ def get_next_number_for_new_file(bucket_name):
     Returns:
         int: The next available number for the new file.
     """
+    # The allocation is a transaction of several statements, so it holds a pooled connection throughout
+    connection, statements = database_pool.acquire()
+    try:
+        number = allocate_media_number(connection, bucket_name)
+    except Exception:
+        database_pool.discard(connection)
+        raise
+
+    database_pool.release(connection, statements)
+    return number
+
+def allocate_media_number(connection, bucket_name):
+    """
+    Atomically takes the next number from a bucket's counter row.
+
+    The row holds the last number handed out. A single INSERT ... ON DUPLICATE KEY UPDATE
+    either creates it or increments it, and LAST_INSERT_ID(expr) returns the new value on the
+    same connection. InnoDB locks the row until the commit, so concurrent allocations for a
+    bucket are serialized and never see the same value. A bucket's first allocation is
+    seeded from the numbers already in it, so buckets numbered by the old listing scan carry on
+    where they left off.
+
+    Args:
+        connection: An open MySQL connection.
+        bucket_name (str): The name of the S3 bucket.
+
+    Returns:
+        int: The allocated number.
+    """
+    global media_counters_ready
+    cursor = connection.cursor()
+
+    # The table is created on first use; afterwards a warm container skips the check
+    if not media_counters_ready:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS media_counters (
+            bucket_name VARCHAR(255) PRIMARY KEY,
+            last_number BIGINT NOT NULL
+        )
+        """)
+        media_counters_ready = True
+
+    # Only a bucket without a counter needs the (one-off) scan for its highest existing number
+    cursor.execute("SELECT last_number FROM media_counters WHERE bucket_name = %s", (bucket_name,))
+    seed = find_highest_number(bucket_name) + 1 if cursor.fetchone() is None else 1
+
+    # If another invocation creates the row first, this becomes an increment of its value
+    query = """
+    INSERT INTO media_counters (bucket_name, last_number)
+    VALUES (%s, LAST_INSERT_ID(%s))
+    ON DUPLICATE KEY UPDATE last_number = LAST_INSERT_ID(last_number + 1)
+    """
+    cursor.execute(query, (bucket_name, seed))
+    cursor.execute("SELECT LAST_INSERT_ID()")
+    number = cursor.fetchone()[0]
+
+    # Commit the allocation, releasing the row for the next invocation
+    connection.commit()
+    cursor.close()
+
+    return number
+
+def find_highest_number(bucket_name):
+    """
+    Finds the highest numbered file in an S3 bucket by listing it.
+
+    This lists the whole bucket, so it is only used to seed a bucket's counter the first time.
+
+    Args:
+        bucket_name (str): The name of the S3 bucket.
+
+    Returns:
+        int: The highest file number, or 0 if the bucket holds no numbered files.
+    """
     s3 = boto3.client('s3')
     paginator = s3.get_paginator('list_objects_v2')
     highest_number = 0
@@ -329,42 +863,66 @@ def get_next_number_for_new_file(bucket_name):
             except ValueError:
                 continue
     
-    return highest_number + 1
+    return highest_number
 
-def verify_signature(combined_data, signature, public_key):
+def merkle_root_from_proof(digest, merkle_proof):
+    """
+    Recomputes the Merkle root a batch-signed capture's digest leads to.
+
+    The camera can sign a burst of captures with one signature over the Merkle root of their
+    digests. Leaves are SHA-256(0x00 + digest) and nodes are SHA-256(0x01 + left + right).
+
+    Args:
+        digest (bytes): The SHA-256 digest of the capture's combined data.
+        merkle_proof (str): The encoded inclusion proof, e.g. "L:<hex>,R:<hex>".
+
+    Returns:
+        bytes: The Merkle root that was signed.
+    """
+    node = hashlib.sha256(b'\x00' + digest).digest()
+
+    for entry in merkle_proof.split(','):
+        side, sibling = entry[0], bytes.fromhex(entry[2:])
+        if side == 'L':
+            node = hashlib.sha256(b'\x01' + sibling + node).digest()
+        else:
+            node = hashlib.sha256(b'\x01' + node + sibling).digest()
+
+    return node
+
+def verify_signature(digest, signature, public_key, merkle_proof=None):
     """
     Verifies the digital signature of the combined data.
 
+    The TPM signs the SHA-256 digest directly, so the digest is verified as prehashed data.
+    For captures signed in a batch, the signature covers the Merkle root, which is recomputed
+    from the digest and its inclusion proof first.
+
     Args:
-        combined_data (bytes): The combined data that was signed.
+        digest (bytes): The SHA-256 digest of the combined data that was signed.
         signature (bytes): The signature to verify.
-        public_key (bytes): The public key to use for verification.
+        public_key: The parsed public key (e.g. from the public key cache), or a PEM-encoded key as bytes.
+        merkle_proof (str): The encoded Merkle inclusion proof, or None for an individually signed capture.
 
     Returns:
         bool: True if the signature is valid, False otherwise.
     """
-    temp_public_key_path = '/tmp/recreated_public_key.pem'
+    if merkle_proof:
+        digest = merkle_root_from_proof(digest, merkle_proof)
 
-    with open(temp_public_key_path, "wb") as file:
-        file.write(public_key)
-
-    with open(temp_public_key_path, "rb") as key_file:
-        public_key_data = key_file.read()
-
-    public_key = serialization.load_pem_public_key(public_key_data)
+    if isinstance(public_key, bytes):
+        public_key = serialization.load_pem_public_key(public_key)  # A PEM key that was not cached
 
     try:
         public_key.verify(
             signature,
-            combined_data,
+            digest,
             padding.PKCS1v15(),
-            hashes.SHA256()
+            utils.Prehashed(hashes.SHA256())
         )
-        os.remove(temp_public_key_path)
         return True
     
     except InvalidSignature:
-        os.remove(temp_public_key_path)
         return False
 
 def send_text(valid, fingerprint, image_save_name="default"):
@@ -403,7 +961,7 @@ def send_text(valid, fingerprint, image_save_name="default"):
         to=receiving_user
     )
 
-def store_json_details(temp_image_path, fingerprint, camera_number, date_data, time_data, location_data, signature):
+def store_json_details(temp_image_path, fingerprint, camera_number, date_data, time_data, location_data, signature, merkle_proof=None, segment_manifest=None, digest=None):
     """
     Stores the JSON details of the media in the database.
 
@@ -415,56 +973,49 @@ def store_json_details(temp_image_path, fingerprint, camera_number, date_data, t
         time_data (str): The time of the media capture.
         location_data (str): The location of the media capture.
         signature (str): The base64-encoded signature.
+        merkle_proof (str): The Merkle inclusion proof for batch-signed captures, or None.
+        segment_manifest (str): The JSON segment manifest for videos signed in segments, or None.
+        digest (bytes): The signed digest, if the media verified; lets the lookup API verify the media by its
+                        hash alone, without the media being sent again.
 
     Returns:
         None
     """
-    # Hash the image data to use as an index
+    # Hash the image data to use as an index, streaming it from disk in 1 MB chunks
+    hash_object = hashlib.sha256()
     with open(temp_image_path, 'rb') as file:
-        data = file.read()
-        hash_object = hashlib.sha256()
-        hash_object.update(data)
-        image_hash = hash_object.hexdigest()
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            hash_object.update(chunk)
+    image_hash = hash_object.hexdigest()
 
     # Convert details to JSON format
-    details = json.dumps({
+    details = {
         'Fingerprint': fingerprint,
         'Camera Number': camera_number,
         'Date': date_data,
         'Time': time_data,
         'Location': location_data,
         'Signature_Base64': signature
-    })
+    }
+    if merkle_proof:
+        details['Merkle_Proof'] = merkle_proof
+    if segment_manifest:
+        details['Segment_Manifest'] = segment_manifest
+    if digest:
+        details['Digest'] = digest.hex()
+    details = json.dumps(details)
     
     print(f"Image Hash: {image_hash}")
     print(f"Details: {details}")
 
-    # Database connection details
-    host = ""
-    user = ""
-    password = ""
-    database = ""
-
-    # Connect to the database
-    connection = mysql.connector.connect(
-        host=host, user=user, password=password, database=database
-    )
-    cursor = connection.cursor()
-
     query = """
     INSERT INTO image_data (image_hash, data)
     VALUES (%s, %s)
     ON DUPLICATE KEY UPDATE data = %s
     """
 
-    cursor.execute(query, (image_hash, details, details))
-    
-    # Commit the transaction
-    connection.commit()
-
-    # Close the cursor and connection
-    cursor.close()
-    connection.close()
+    # Run and commit the insert on a pooled connection
+    database_pool.query(query, (image_hash, details, details), commit=True)
 
     print(f"Stored the data with image hash {image_hash}, Time: {time_data}, Date: {date_data}, Location: {location_data}")
 
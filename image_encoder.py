@@ -0,0 +1,97 @@
+# OpenCV is only needed to encode; the uploaders use the format tables without it
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# Still image formats: metadata 'Format' value -> (file extension, MIME type)
+IMAGE_FORMATS = {
+    'png': ('.png', 'image/png'),
+    'webp': ('.webp', 'image/webp'),
+    'jpeg': ('.jpg', 'image/jpeg'),
+    'jxl': ('.jxl', 'image/jxl'),
+}
+IMAGE_EXTENSIONS = tuple(extension for extension, _ in IMAGE_FORMATS.values())
+
+# Encoder presets: name -> (format, cv2.imencode parameters as (flag, value) pairs).
+# Flags, and values that are OpenCV constants, are given by name and looked up on cv2 when
+# encoding, so presets the installed OpenCV does not support are simply unavailable.
+ENCODE_PRESETS = {
+    'png': ('png', [('IMWRITE_PNG_COMPRESSION', 3)]),
+    'png-fast': ('png', [('IMWRITE_PNG_COMPRESSION', 1), ('IMWRITE_PNG_STRATEGY', 'IMWRITE_PNG_STRATEGY_RLE')]),
+    'png-small': ('png', [('IMWRITE_PNG_COMPRESSION', 9), ('IMWRITE_PNG_STRATEGY', 'IMWRITE_PNG_STRATEGY_FILTERED')]),
+    'webp-lossless': ('webp', [('IMWRITE_WEBP_QUALITY', 101)]),  # A quality above 100 selects lossless WebP
+    'jpeg': ('jpeg', [('IMWRITE_JPEG_QUALITY', 95)]),            # Lossy; for sites with little bandwidth
+    'jxl-lossless': ('jxl', [('IMWRITE_JPEGXL_DISTANCE', 0), ('IMWRITE_JPEGXL_EFFORT', 3)]),  # OpenCV 4.11+ with libjxl
+}
+DEFAULT_ENCODE_PRESET = 'png-fast'
+
+def encode_parameters(preset):
+    """
+    Resolve a preset's imencode parameters to OpenCV constants.
+
+    Args:
+        preset (str): The preset name, a key of ENCODE_PRESETS.
+
+    Returns:
+        list: The flat [flag, value, flag, value, ...] list cv2.imencode expects.
+
+    Raises:
+        ValueError: If the preset is unknown or the installed OpenCV does not support it.
+    """
+    if preset not in ENCODE_PRESETS:
+        raise ValueError(f"Unknown encode preset '{preset}'; choose from {', '.join(ENCODE_PRESETS)}")
+
+    if cv2 is None:
+        raise ValueError("OpenCV is not installed, so images cannot be encoded")
+
+    parameters = []
+    for flag, value in ENCODE_PRESETS[preset][1]:
+        if not hasattr(cv2, flag) or (isinstance(value, str) and not hasattr(cv2, value)):
+            raise ValueError(f"Encode preset '{preset}' is not supported by OpenCV {cv2.__version__}")
+        parameters += [getattr(cv2, flag), getattr(cv2, value) if isinstance(value, str) else value]
+    return parameters
+
+
+def available_presets():
+    """
+    Return the names of the presets the installed OpenCV supports.
+    """
+    available = []
+    for preset in ENCODE_PRESETS:
+        try:
+            encode_parameters(preset)
+            available.append(preset)
+        except ValueError:
+            continue
+    return available
+
+
+def encode_image(image, preset=DEFAULT_ENCODE_PRESET):
+    """
+    Encode a captured frame with an encoder preset.
+
+    Args:
+        image (numpy.ndarray): The BGR frame.
+        preset (str): The preset name, a key of ENCODE_PRESETS.
+
+    Returns:
+        tuple: The format name (the metadata 'Format' value) and the encoded image buffer.
+
+    Raises:
+        ValueError: If the preset is unknown or unsupported, or the encoder fails.
+    """
+    image_format = ENCODE_PRESETS.get(preset, (None,))[0]
+    parameters = encode_parameters(preset)
+
+    success, encoded_image = cv2.imencode(IMAGE_FORMATS[image_format][0], image, parameters)
+    if not success:
+        raise ValueError(f"Failed to encode image with preset '{preset}'")
+    return image_format, encoded_image
+
+
+def image_extension(metadata):
+    """
+    Return the file extension for an image from its metadata; images without a 'Format' are PNG.
+    """
+    return IMAGE_FORMATS[metadata.get('Format', 'png')][0]
@@ -1,26 +1,25 @@
-from create_image import create_image
 from check_wifi import is_internet_available
 from create_metadata import create_metadata
-from create_combined import create_combined
 from upload_image import upload_image
-from create_digest import create_digest
-from create_signature import create_signature
-from GPS_uart import parse_nmea_sentence, read_gps_data
-import cv2
-import base64
+from create_digest import create_digest_stream
+from signing_service import sign_digest
+from GPS_uart import read_gps_data
+from capture_pipeline import CapturePipeline
+from image_encoder import encode_image, DEFAULT_ENCODE_PRESET
 from save_image import save_image
-from save_metadata import save_metadata
+from media_queue import get_media_queue
 import os
 from upload_video import upload_video
 
-def main(fingerprint: str, media_input, camera_number_string: str, save_media_filepath: str, 
+def main(fingerprint: str, media_input, camera_number_string: str, save_media_filepath: str,
          gps_lock, signature_lock, upload_lock):
     """
     Main function for processing and handling media (images/videos).
 
     This function processes media by capturing images or reading videos, fetching GPS data,
     creating combined data structures, generating digests and signatures, and uploading
-    or saving the media based on internet availability.
+    or saving the media based on internet availability. It runs the same stages as the
+    capture pipeline, one after another on the calling thread.
 
     Args:
         fingerprint (str): The fingerprint identifier or username associated with the media.
@@ -28,182 +27,251 @@ def main(fingerprint: str, media_input, camera_number_string: str, save_media_fi
         camera_number_string (str): The identifier for the camera/device capturing the media.
         save_media_filepath (str): The directory path where media should be saved locally.
         gps_lock (threading.Lock): A lock object to synchronize GPS data access.
-        signature_lock (threading.Lock): A lock object to synchronize signature creation.
-        upload_lock (threading.Lock): A lock object to synchronize upload operations.
+        signature_lock (threading.Lock): Unused; signatures are serialized by the signing service.
+        upload_lock (threading.Lock): Unused; every capture is uploaded to its own key, so uploads can run concurrently.
 
     Returns:
         None
     """
     print("Main called; processing media for upload or local storage.")
 
-    # Check if processing an image or video based on the save path
-    if save_media_filepath.endswith('Images'):
-        # ---------------------- Process Image ----------------------------
-        print("Processing image.")
+    job = create_job(fingerprint, media_input, camera_number_string, save_media_filepath, gps_lock)
 
-        image = media_input  # Received image input as cv2 image array
-
-        # Encode the image to PNG format for transmission or storage
-        success, encoded_image = cv2.imencode('.png', image)
-        if not success:
-            print("Error: Failed to encode image.")
+    for _, stage_function, _ in CAPTURE_STAGES:
+        if not stage_function(job):
             return
 
-        print("Image encoded successfully.")
+# --------------------------------------------------------------------
+
+def create_job(fingerprint: str, media_input, camera_number_string: str, save_media_filepath: str,
+               gps_lock, media_digest=None, encode_preset: str = DEFAULT_ENCODE_PRESET) -> dict:
+    """
+    Create the job dictionary that carries one capture through the processing stages.
 
-        # ---------- Capture GNSS Data (Time and Location) ------------------------
-        lat_value, long_value, time_value, date_value = read_gps_data(gps_lock)
-        location = f"{lat_value}, {long_value}"
-        time_str = f"{time_value}"
-        date_str = f"{date_value}"
+    The GNSS time and location are read here, at the shutter press, rather than in a stage
+    after the capture has waited in the pipeline queues. With the background GPS reader
+    running this returns the cached fix, so it does not delay the capture.
 
-        print(f"Received GPS Data - Date: {date_str}, Time: {time_str}, Location: {location}")
+    Args:
+        fingerprint (str): The fingerprint identifier or username associated with the media.
+        media_input: For images, this is a cv2 image array; for videos, this is the file path as a string.
+        camera_number_string (str): The identifier for the camera/device capturing the media.
+        save_media_filepath (str): The directory path where media should be saved locally.
+        gps_lock (threading.Lock): A lock object to synchronize GPS data access.
+        media_digest (CombinedDigest or SegmentedDigest): For videos hashed while they were recorded, the
+                                       digest with the fingerprint, camera number and media already fed in.
+        encode_preset (str): The still encoder preset (see image_encoder.ENCODE_PRESETS).
 
-        # -------------- Combine Data for Digest Creation -------------------------
-        combined_data = create_combined(
-            fingerprint,
-            camera_number_string,
-            encoded_image.tobytes(),
-            date_str,
-            time_str,
-            location
+    Returns:
+        dict: The job, to which each stage adds its results.
+    """
+    lat_value, long_value, time_value, date_value = read_gps_data(gps_lock)
+    print(f"Received GPS Data - Date: {date_value}, Time: {time_value}, Location: {lat_value}, {long_value}")
+
+    return {
+        'fingerprint': fingerprint,
+        'media_input': media_input,
+        'camera_number_string': camera_number_string,
+        'save_media_filepath': save_media_filepath,
+        # Check if processing an image or video based on the save path
+        'is_image': save_media_filepath.endswith('Images'),
+        'gps_lock': gps_lock,
+        'media_digest': media_digest,
+        'segment_manifest': None,
+        'encode_preset': encode_preset,
+        'image_format': None,
+        'location': f"{lat_value}, {long_value}",
+        'time_str': f"{time_value}",
+        'date_str': f"{date_value}",
+    }
+
+# --------------------------------------------------------------------
+
+def encode_stage(job: dict) -> bool:
+    """
+    Encode an image with the job's encoder preset for transmission or storage. Videos are already encoded.
+
+    The preset chooses between PNG at different compression levels and filter strategies,
+    lossless WebP, JPEG-XL and high-quality JPEG; the format is recorded in the metadata.
+    """
+    if not job['is_image']:
+        return True
+
+    print("Processing image.")
+
+    image = job['media_input']  # Received image input as cv2 image array
+    try:
+        job['image_format'], encoded_image = encode_image(image, job['encode_preset'])
+    except ValueError as e:
+        print(f"Error: Failed to encode image: {e}")
+        return False
+
+    job['encoded_image'] = encoded_image
+    job['media_input'] = None  # Release the raw frame as soon as it is encoded
+    print("Image encoded successfully.")
+    return True
+
+
+def hash_stage(job: dict) -> bool:
+    """
+    Create the digest for signing.
+
+    The encoded image buffer, or the video file on disk, is streamed into the hash instead of
+    building a combined copy of the media. Videos hashed while they were recorded only need
+    the date, time and location added, so the file is not read again. Videos hashed in segments
+    also keep the segment manifest, which goes into the metadata.
+    """
+    if job['media_digest'] is not None:
+        job['digest'] = job['media_digest'].finalize(job['date_str'], job['time_str'], job['location'])
+        if hasattr(job['media_digest'], 'manifest'):
+            job['segment_manifest'] = job['media_digest'].manifest()
+        print("Digest created successfully from the recording.")
+        return True
+
+    media = job['encoded_image'] if job['is_image'] else job['media_input']
+
+    try:
+        job['digest'] = create_digest_stream(
+            job['fingerprint'],
+            job['camera_number_string'],
+            media,
+            job['date_str'],
+            job['time_str'],
+            job['location']
         )
-        print("Combined data created for digest.")
+        print("Digest created successfully.")
+        return True
+    except Exception as e:
+        print(f"Error creating digest: {str(e)}")
+        return False
+
+
+def sign_stage(job: dict) -> bool:
+    """
+    Generate the signature using the TPM and create the metadata dictionary.
+    """
+    try:
+        signature_string, merkle_proof = sign_digest(job['digest'])
+        print("Signature generated successfully.")
+    except Exception as e:
+        print(f"Error generating signature: {str(e)}")
+        return False
 
-        # ---------------- Create Digest for Signing ------------------------------
+    try:
+        job['metadata'] = create_metadata(
+            job['fingerprint'],
+            job['camera_number_string'],
+            job['date_str'],
+            job['time_str'],
+            job['location'],
+            signature_string,
+            merkle_proof,
+            job['segment_manifest'],
+            job['image_format']
+        )
+        print("Metadata created successfully.")
+        return True
+    except Exception as e:
+        print(f"Error creating metadata: {str(e)}")
+        return False
+
+
+def persist_stage(job: dict) -> bool:
+    """
+    Upload the media, or save it locally, based on internet availability.
+    """
+    if job['is_image']:
+        return persist_image(job)
+    return persist_video(job)
+
+
+def persist_image(job: dict) -> bool:
+    """
+    Upload or save an image based on internet availability.
+    """
+    encoded_image = job['encoded_image']
+    metadata = job['metadata']
+    save_media_filepath = job['save_media_filepath']
+
+    # Each capture has its own object key, so uploads from different workers can run at the same time
+    if is_internet_available():
         try:
-            digest = create_digest(combined_data)
-            print("Digest created successfully.")
+            print("Internet available. Attempting to upload image.")
+            upload_image(encoded_image.tobytes(), metadata)
+            print("Image uploaded successfully.")
         except Exception as e:
-            print(f"Error creating digest: {str(e)}")
-            return
+            print(f"Error uploading image: {str(e)}")
+            print("Saving image locally due to upload failure.")
+            save_image(encoded_image.tobytes(), metadata, save_media_filepath)
+    else:
+        print("No internet connection. Saving image locally.")
+        save_image(encoded_image.tobytes(), metadata, save_media_filepath)
+
+    return True
+
+
+def persist_video(job: dict) -> bool:
+    """
+    Save a video's metadata locally, then upload the video if internet is available.
+
+    The video was recorded into a reserved entry of the video upload queue; committing its
+    metadata makes it visible to the background uploader.
+    """
+    video_filepath = job['media_input']  # Video file path provided as input
+    metadata = job['metadata']
+    media_queue = get_media_queue(job['save_media_filepath'])
+    media_id = int(os.path.splitext(os.path.basename(video_filepath))[0])
+
+    # ---------------- Save Metadata Locally ------------------------------
+    try:
+        media_queue.commit_metadata(media_id, metadata)
+        print(f"Metadata saved locally at {media_queue.metadata_path(media_id)}.")
+    except Exception as e:
+        print(f"Error saving metadata: {str(e)}")
+        return False
 
-        # ---------------- Generate Signature Using TPM ---------------------------
+    # ---------------- Upload or Save Video Based on Internet Availability -
+    if media_queue.listeners:
+        # An upload drainer was told about the new entry and uploads it; uploading here too would race it
+        print("Video queued for the background uploader.")
+    elif is_internet_available():
         try:
-            signature_string = create_signature(digest, signature_lock)
-            print("Signature generated successfully.")
+            print("Internet available. Attempting to upload video.")
+            upload_video(video_filepath, metadata)  # Streamed from disk in parts
+            print("Video uploaded successfully.")
+
+            # Remove local files after successful upload
+            media_queue.remove(media_id)
+            print("Local video and metadata files deleted after upload.")
         except Exception as e:
-            print(f"Error generating signature: {str(e)}")
-            return
+            print(f"Error uploading video: {str(e)}")
+            print("Video and metadata files will remain saved locally due to upload failure.")
+    else:
+        print("No internet connection. Video and metadata files saved locally for later upload.")
 
-        # ---------------- Create Metadata Dictionary -----------------------------
-        metadata = create_metadata(
-            fingerprint,
-            camera_number_string,
-            date_str,
-            time_str,
-            location,
-            signature_string
-        )
-        print("Metadata created successfully.")
+    return True
 
-        # ---------------- Upload or Save Image Based on Internet Availability -----
-        with upload_lock:
-            print("Acquired upload lock for image processing.")
-            if is_internet_available():
-                try:
-                    print("Internet available. Attempting to upload image.")
-                    upload_image(encoded_image.tobytes(), metadata)
-                    print("Image uploaded successfully.")
-                except Exception as e:
-                    print(f"Error uploading image: {str(e)}")
-                    print("Saving image locally due to upload failure.")
-                    save_image(encoded_image.tobytes(), metadata, save_media_filepath)
-            else:
-                print("No internet connection. Saving image locally.")
-                save_image(encoded_image.tobytes(), metadata, save_media_filepath)
+# --------------------------------------------------------------------
 
-    else:
-        # ---------------------- Process Video ----------------------------
-        print("Processing video.")
-
-        video_filepath = media_input  # Video file path provided as input
-
-        # ---------- Capture GNSS Data (Time and Location) ------------------------
-        lat_value, long_value, time_value, date_value = read_gps_data(gps_lock)
-        location = f"{lat_value}, {long_value}"
-        time_str = f"{time_value}"
-        date_str = f"{date_value}"
-
-        print(f"Received GPS Data - Date: {date_str}, Time: {time_str}, Location: {location}")
-
-        with upload_lock:
-            print("Acquired upload lock for video processing.")
-
-            # Read video bytes from the specified file path
-            try:
-                with open(video_filepath, 'rb') as video_file:
-                    video_bytes = video_file.read()
-                print("Video file read successfully.")
-            except Exception as e:
-                print(f"Error reading video file: {str(e)}")
-                return
-
-            # -------------- Combine Data for Digest Creation ---------------------
-            combined_data = create_combined(
-                fingerprint,
-                camera_number_string,
-                video_bytes,
-                date_str,
-                time_str,
-                location
-            )
-            print("Combined data created for digest.")
-
-            # ---------------- Create Digest for Signing --------------------------
-            try:
-                digest = create_digest(combined_data)
-                print("Digest created successfully.")
-            except Exception as e:
-                print(f"Error creating digest: {str(e)}")
-                return
-
-            # ---------------- Generate Signature Using TPM -----------------------
-            try:
-                signature_string = create_signature(digest, signature_lock)
-                print("Signature generated successfully.")
-            except Exception as e:
-                print(f"Error generating signature: {str(e)}")
-                return
-
-            # ---------------- Create Metadata Dictionary -------------------------
-            try:
-                metadata = create_metadata(
-                    fingerprint,
-                    camera_number_string,
-                    date_str,
-                    time_str,
-                    location,
-                    signature_string
-                )
-                print("Metadata created successfully.")
-            except Exception as e:
-                print(f"Error creating metadata: {str(e)}")
-                return
-
-            # ---------------- Save Metadata Locally ------------------------------
-            try:
-                base_filename = os.path.splitext(os.path.basename(video_filepath))[0]
-                metadata_filepath = os.path.join(save_media_filepath, f"{base_filename}.json")
-                save_metadata(metadata, metadata_filepath)
-                print(f"Metadata saved locally at {metadata_filepath}.")
-            except Exception as e:
-                print(f"Error saving metadata: {str(e)}")
-                return
-
-            # ---------------- Upload or Save Video Based on Internet Availability -
-            if is_internet_available():
-                try:
-                    print("Internet available. Attempting to upload video.")
-                    upload_video(video_bytes, metadata)
-                    print("Video uploaded successfully.")
-
-                    # Remove local files after successful upload
-                    os.remove(video_filepath)
-                    os.remove(metadata_filepath)
-                    print("Local video and metadata files deleted after upload.")
-                except Exception as e:
-                    print(f"Error uploading video: {str(e)}")
-                    print("Video and metadata files will remain saved locally due to upload failure.")
-            else:
-                print("No internet connection. Video and metadata files saved locally for later upload.")
+# Processing stages in order, with the number of workers each gets in the capture pipeline
+CAPTURE_STAGES = [
+    ('encode', encode_stage, 2),
+    ('hash', hash_stage, 2),
+    ('sign', sign_stage, 2),
+    ('persist', persist_stage, 2),
+]
+
+def create_capture_pipeline(queue_size: int = 4) -> CapturePipeline:
+    """
+    Create the capture pipeline (encode -> hash -> sign -> persist/upload).
+
+    Each stage runs on its own fixed pool of worker threads, so the shutter returns as soon as
+    the capture is queued and a slow upload does not hold up signing of the next capture.
+
+    Args:
+        queue_size (int): The maximum number of captures waiting in front of each stage.
+
+    Returns:
+        CapturePipeline: The running pipeline; submit jobs made with `create_job`.
+    """
+    return CapturePipeline(CAPTURE_STAGES, queue_size)
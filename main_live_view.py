@@ -2,14 +2,22 @@ import threading
 from threading import Lock, Thread, Condition
 import RPi.GPIO as GPIO
 import time
-import subprocess
 import cv2
 import os
-from main import main
-from GPS_uart import read_gps_data
+from main import create_capture_pipeline, create_job
+from GPS_uart import start_gps_reader
 from upload_image import upload_image
 from upload_video import upload_video
 from get_fingerprint import get_fingerprint
+from signing_service import enable_batch_signing
+from media_queue import get_media_queue
+from upload_drainer import UploadDrainer
+from connectivity_monitor import get_connectivity_monitor
+from preview_renderer import PreviewRenderer, PreviewScaler
+from camera_stream import CameraStream
+from video_recorder import RecordingEngine
+from segments import SEGMENT_SIZE
+from image_encoder import IMAGE_EXTENSIONS
 import json
 
 from kivy.config import Config
@@ -22,7 +30,6 @@ from kivy.app import App
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.label import Label
 from kivy.uix.image import Image  # Use AsyncImage for potentially better handling of image loading
-from kivy.graphics.texture import Texture
 from kivy.graphics import Color, Rectangle, Ellipse
 from kivy.uix.boxlayout import BoxLayout
 from kivy.animation import Animation
@@ -33,7 +40,6 @@ Window.show_cursor = False
 
 # -------------Global Variables ------------------------------
 image_mode = True
-ffmpeg_process = None
 record_button = 40
 mode_button = 38
 
@@ -41,13 +47,15 @@ wifi_status = False
 gps_status = False
 
 ignore_button_presses = False  # Flag to indicate whether to ignore button events
+
+# Batch signing: captures within this many seconds share one Merkle-root signature (None disables it)
+batch_signing_window = None
 recording_indicator = False
 
 # Locks and conditions for thread synchronization
 gps_lock = Lock()
 signature_lock = Lock()
 record_lock = Lock()   
-upload_lock = Lock()
 capture_image_lock = Lock()
 fingerprint_condition = Condition()
 mid_video = False
@@ -69,15 +77,62 @@ save_video_filepath = "/home/sdp/SDP-Camera/tmpVideos"
 save_image_filepath = "/home/sdp/SDP-Camera/tmpImages"
 object_count = None
 gui_instance = None
+upload_drainer = None
+upload_parallelism = 4  # Uploads the drainer runs at the same time
+
+# Zero-shutter-lag stills: 'closest' takes the frame nearest the press, 'sharpest' the sharpest of the
+# last `zsl_window` frames, and None waits for the next frame after the press instead
+zsl_mode = 'closest'
+zsl_window = 8
+
+# Still encoder preset (see image_encoder.ENCODE_PRESETS): 'png-fast' keeps encoding off the critical
+# path, 'png-small' or 'webp-lossless' trade CPU for smaller uploads, 'jpeg' suits sites with little bandwidth
+image_encode_preset = 'png-fast'
+
+# Staged worker pool (encode -> hash -> sign -> persist/upload) that processes every capture
+capture_pipeline = create_capture_pipeline()
+
+# --------------------------------------------------------------------
+
+def open_camera():
+    """
+    Open the camera and start its capture thread.
+
+    This single 1080p stream feeds everything: the preview is scaled down from it, stills are
+    taken from it and videos are recorded from it, so the camera is opened once and never has
+    to be renegotiated when switching modes. The ring keeps the last `zsl_window` frames (plus
+    the slot being written and one spare) so stills can be picked from frames captured before
+    the press.
+
+    Returns:
+        CameraStream: The running stream.
+    """
+    capture = cv2.VideoCapture(0)
+    capture.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+    capture.set(cv2.CAP_PROP_FPS, 30.0)
+    capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('m','j','p','g'))
+    capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('M','J','P','G'))
+    capture.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
+    capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
+    return CameraStream(capture, ring_size=zsl_window + 2, name='camera').start()
+
+# --------------------------------------------------------------------
+
+def close_camera(camera_stream):
+    """
+    Stop the camera's capture thread and release the device.
+    """
+    camera_stream.stop()
+    camera_stream.capture.release()
+
+# Initialize the camera settings; a capture thread keeps the newest frames ready for the preview, stills and video
+camera = open_camera()
+preview_size = (800, 450)  # The preview is scaled down from the 1920x1080 stream
 
-# Initialize the camera settings
-camera = cv2.VideoCapture(0)
-camera.set(cv2.CAP_PROP_AUTOFOCUS, 0)
-camera.set(cv2.CAP_PROP_FPS, 30.0)
-camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('m','j','p','g'))
-camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('M','J','P','G'))
-camera.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
+# Records videos from the camera stream, starting the clip exactly at the press
+record_audio = True  # FFmpeg is then started at the press (the clip still needs no trim); only False uses the warm, video-only encoder
+video_segment_size = SEGMENT_SIZE  # Videos are hashed and signed in segments of this size; None signs each clip as one blob
+recording_engine = RecordingEngine(camera, get_media_queue(save_video_filepath), audio=record_audio, segment_size=video_segment_size)
 
 # --------------------------------------------------------------------
 
@@ -119,26 +174,24 @@ def fingerprint_monitor():
 
 def update_gps_data_continuously(gps_lock):
     """
-    Continuously updates GPS data by reading it every 10 seconds and updating the global `gps_status` variable.
+    Continuously updates the global `gps_status` variable from the background GPS reader's cached fix.
     """
     global gps_status
+    reader = start_gps_reader()
     while True:
-        latitude, longitude, formatted_time, formatted_date = read_gps_data(gps_lock)
-        gps_status = latitude != "None"
-        time.sleep(10)  # Adjust the sleep time as needed based on how often you want to update GPS data
+        fix, stale = reader.get_fix()
+        gps_status = fix is not None and not stale
+        time.sleep(1)  # Reading the cached fix is cheap, so the status can refresh every second
 
 # --------------------------------------------------------------------
 
-def update_wifi_status_continuously():
+def update_wifi_status(online):
     """
-    Continuously checks the WiFi status by pinging Google's DNS server and updates the global `wifi_status` variable.
+    Connectivity monitor callback that updates the global `wifi_status` variable on every change.
     """
     global wifi_status
-    while True:
-        response = subprocess.run(['ping', '-c', '1', '8.8.8.8'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        wifi_status = response.returncode == 0
-        print(f"\Twifi status in wifi thread: {wifi_status}")
-        time.sleep(5)
+    wifi_status = online
+    print(f"\Twifi status from connectivity monitor: {wifi_status}")
 
 # --------------------------------------------------------------------
 
@@ -152,14 +205,17 @@ class PhotoLockGUI(FloatLayout):
 
         # Start background threads for GPS data, WiFi status, media upload, and fingerprint monitoring
         Thread(target=update_gps_data_continuously, args=(gps_lock,), daemon=True).start()
-        Thread(target=update_wifi_status_continuously, daemon=True).start() 
-        Thread(target=upload_saved_media_continuously, args=(upload_lock,), daemon=True).start()
+        get_connectivity_monitor().subscribe(update_wifi_status)  # Shared monitor replaces the ping thread
+        start_upload_drainer()
         Thread(target=fingerprint_monitor, daemon=True).start()
 
         Window.bind(on_key_down=self.on_key_down)
 
         self.capture = capture
-        self.last_frame_texture = None  # To hold the texture of the last frame
+        self.preview_scaler = PreviewScaler(*preview_size)  # Cached interpolation map from the camera to the preview size
+        self.preview_renderer = PreviewRenderer()  # Reuses one texture for every preview frame
+        self.last_sequence = 0  # Sequence number of the last preview frame drawn
+        self.status_state = None  # Last values shown by the status labels, so they are only updated on change
 
         # Status images and labels
         self.wifi_status_image = Image(source='images/nowifi.png', size_hint=(None, None), size=(100, 45))
@@ -226,6 +282,7 @@ class PhotoLockGUI(FloatLayout):
         self.check_wifi_status(0)  # Immediately check the WiFi status upon start
         Clock.schedule_interval(self.check_gps_status, 10)
         self.check_gps_status(0)  # Immediately check the GPS status upon start
+        Clock.schedule_interval(lambda dt: capture_pipeline.print_stats(), 60)  # Log queue depths and stage latencies
 
     def _update_bg_and_label_pos(self, *args):
         """
@@ -239,31 +296,38 @@ class PhotoLockGUI(FloatLayout):
         """
         Update the video feed, status labels, and other visual elements on the GUI.
         """
-        ret, frame = self.capture.read()
-
-        if ret:
-            self.last_frame = frame  # Store the last frame
-            buf1 = cv2.flip(frame, 0)
-            buf = buf1.tobytes()
-            texture = Texture.create(size=(frame.shape[1], frame.shape[0]), colorfmt='bgr')
-            texture.blit_buffer(buf, colorfmt='bgr', bufferfmt='ubyte')
-            self.img1.texture = texture
-            self.last_frame_texture = texture  # Update the last frame's texture
-            
-            mode_text = "Image" if image_mode else "Video"
-            self.status_label.text = f"{mode_text}"
+        sequence, frame = self.capture.newest()  # Never blocks; the camera is read on its own thread
+
+        if frame is not None and sequence != self.last_sequence:
+            self.last_sequence = sequence  # Only upload frames the preview has not shown yet
+
+            # Scale the 1080p frame down to the preview size, then upload it into the preview texture;
+            # the widget only needs to be pointed at a new texture
+            if self.preview_renderer.render(self.preview_scaler.scale(frame)):
+                self.img1.texture = self.preview_renderer.texture
+            else:
+                self.img1.canvas.ask_update()
 
-            if user_number > -1:
-                fingerprint_text = ""
-            elif user_number == -1:
-                fingerprint_text = "Scan Fingerprint"
-            else:  # Handle cases where user_number < -1
-                fingerprint_text = "Invalid Scan"
+        # Only touch the labels when something they show has changed
+        status_state = (image_mode, user_number, bool(fingerprint), recording_indicator)
+        if status_state == self.status_state:
+            return
+        self.status_state = status_state
 
-            self.fingerprint_bg_color.rgba = (0, 0, 0, .8) if not fingerprint else (0, 0, 0, 0)
-            self.fingerprint_label.text = f"{fingerprint_text}"
+        mode_text = "Image" if image_mode else "Video"
+        self.status_label.text = f"{mode_text}"
 
-            self.recording_color.a = 1 if recording_indicator else 0
+        if user_number > -1:
+            fingerprint_text = ""
+        elif user_number == -1:
+            fingerprint_text = "Scan Fingerprint"
+        else:  # Handle cases where user_number < -1
+            fingerprint_text = "Invalid Scan"
+
+        self.fingerprint_bg_color.rgba = (0, 0, 0, .8) if not fingerprint else (0, 0, 0, 0)
+        self.fingerprint_label.text = f"{fingerprint_text}"
+
+        self.recording_color.a = 1 if recording_indicator else 0
 
     def check_wifi_status(self, dt):
         """
@@ -359,8 +423,9 @@ class PhotoLockGUI(FloatLayout):
         """
         Animate the last frame captured by the camera and display it on the GUI.
         """
-        if self.last_frame_texture:
-            animated_image = Image(texture=self.last_frame_texture, size_hint=(None, None), size=(800, 480),keep_ratio=False, allow_stretch=True)
+        last_frame_texture = self.preview_renderer.snapshot()  # Own copy, since the preview texture keeps changing
+        if last_frame_texture:
+            animated_image = Image(texture=last_frame_texture, size_hint=(None, None), size=(800, 480),keep_ratio=False, allow_stretch=True)
             self.animation_overlay.add_widget(animated_image)
 
             animation = Animation(pos=(10, 10), size=(150, 90), duration=.3) + Animation(opacity=1, duration=6) + Animation(opacity=0, duration=.3)
@@ -397,21 +462,16 @@ class PhotoLockApp(App):
     def build(self):
         global gui_instance
 
-        self.capture = cv2.VideoCapture(2)
-        self.capture.set(cv2.CAP_PROP_AUTOFOCUS, 0)
-        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('m','j','p','g'))
-        self.capture.set(cv2.CAP_PROP_FPS, 30.0)
-        
-        gui_instance = PhotoLockGUI(self.capture)  # Assign the instance to the global variable
+        # The preview comes from the shared camera stream, which is read on its own thread
+        gui_instance = PhotoLockGUI(camera)  # Assign the instance to the global variable
         return gui_instance
 
     def on_stop(self):
         """
         Release the camera resources when the application stops.
         """
-        self.capture.release()
+        recording_engine.close()
+        close_camera(camera)
 
 # --------------------------------------------------------------------
 
@@ -429,26 +489,11 @@ def toggle_image_mode(channel):
     """
     global image_mode
     global recording_indicator
-    global camera
 
     with record_lock:
+        # Both modes use the same camera stream, so switching is instant
         if not recording_indicator:
             image_mode = not image_mode
-        
-        if image_mode and camera is None and not recording_indicator:
-            # Initialize the camera for image mode
-            camera = cv2.VideoCapture(0)
-            camera.set(cv2.CAP_PROP_AUTOFOCUS, 0)
-            camera.set(cv2.CAP_PROP_FPS, 30.0)
-            camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('m','j','p','g'))
-            camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter.fourcc('M','J','P','G'))
-            camera.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-
-        if not image_mode and camera is not None:
-            # Release the camera for video mode
-            camera.release()
-            camera = None
 
 # --------------------------------------------------------------------
 
@@ -459,7 +504,6 @@ def toggle_recording(channel):
     global mode_button
     global record_button
     global image_mode
-    global ffmpeg_process
     global object_count
     global recording_indicator 
     global record_lock
@@ -479,18 +523,22 @@ def toggle_recording(channel):
     with record_lock:
         print("Acquired lock in toggle_recording()")
         if not image_mode and not mid_video:   # Video mode and not recording 
-            object_count = count_files(save_video_filepath)
             recording_indicator = True
-            ffmpeg_process = start_recording(object_count)
-            mid_video = True
-            print("Released lock after starting video in toggle_recording()")
+            try:
+                object_count = start_recording()  # Monotonic queue ID of the new video
+                mid_video = True
+                print("Released lock after starting video in toggle_recording()")
+            except Exception as e:
+                # Leave the GUI ready for the next press instead of stuck showing a recording
+                print(f"Error starting video recording: {e}")
+                recording_indicator = False
 
         elif mid_video:  # Currently recording a video 
             print("In the elif for mid_video == True")
             # Stop recording the video
             recording_indicator = False
             Clock.schedule_once(lambda dt: gui_instance.animate_last_frame())
-            ffmpeg_process = stop_recording(ffmpeg_process, object_count)
+            stop_recording(object_count)
             media_taken += 1
             mid_video = False
             print("Released lock after stopping video in toggle_recording()")
@@ -516,77 +564,30 @@ def toggle_recording(channel):
 
 # --------------------------------------------------------------------
 
-def start_recording(object_count):
-    """
-    Start recording video using FFmpeg and save it to the specified directory.
-    """
-    save_video_filepath = "/home/sdp/SDP-Camera/tmpVideos"  # Ensure this is defined or passed correctly
-
-    # Ensure the directory exists
-    if not os.path.exists(save_video_filepath):
-        os.makedirs(save_video_filepath)  # Create the directory and any necessary parents
-
-    video_filepath_raw = os.path.join(save_video_filepath, f'{object_count}raw.avi')
-
-    command = [
-        'ffmpeg',
-        '-framerate', '30',
-        '-video_size', '1920x1080',
-        '-i', '/dev/video0',
-        '-f', 'alsa', '-i', 'default',
-        '-c:v', 'h264_v4l2m2m',
-        '-pix_fmt', 'yuv420p',
-        '-b:v', '4M',
-        '-bufsize', '4M',
-        '-c:a', 'aac',
-        '-b:a', '128k',
-        '-threads', '4',
-        video_filepath_raw
-    ]
-    
-    # Start FFmpeg process
-    ffmpeg_process = subprocess.Popen(command, stdin=subprocess.PIPE)
+def start_recording():
+    """
+    Start recording video from the camera stream into the video upload queue.
 
-    # Start countdown animation
-    Clock.schedule_once(lambda dt: gui_instance.start_countdown(duration=3), 0)
-    
-    return ffmpeg_process
+    The recording engine's encoder is already running, so the video starts exactly at the press
+    and needs no countdown or trimming afterwards.
+
+    Returns:
+        int: The queue ID of the new video.
+    """
+    return recording_engine.start(fingerprint, camera_number_string)  # Hashed while it is recorded
 
 # --------------------------------------------------------------------
 
-def stop_recording(ffmpeg_process, object_count):
+def stop_recording(object_count):
     """
     Stop the video recording and save the final video file. This function does not upload the video.
     """
-    ffmpeg_process.stdin.write(b'q\n')
-    ffmpeg_process.stdin.flush()
-    ffmpeg_process.wait()  # Wait for the process to terminate
-
-    print("Stopped raw recording")
-
-    video_filepath = os.path.join(save_video_filepath, f'{object_count}.avi')
-    video_filepath_raw = os.path.join(save_video_filepath, f'{object_count}raw.avi')
-    
-    ffmpeg_cut_command = [
-        'ffmpeg',
-        '-i', video_filepath_raw,  # Input file path
-        '-ss', '3',  # Start trimming 5 seconds into the video
-        '-c:v', 'copy',  # Copy the video stream without re-encoding
-        '-c:a', 'copy',  # Copy the audio stream without re-encoding
-        '-threads', '4',
-        video_filepath  # Output file path
-    ]
-    
-    print("Began cutting recording")
-    ffmpeg_cut_process = subprocess.Popen(ffmpeg_cut_command, stdin=subprocess.PIPE)
-    ffmpeg_cut_process.wait()
-    print("Stopped cutting recording")
-    os.remove(video_filepath_raw)  # Remove the raw video file after processing
-
-    # Start a thread to process and upload the video
-    Thread(target=main, args=(fingerprint, video_filepath, camera_number_string, save_video_filepath, gps_lock, signature_lock, upload_lock,)).start()
+    media_id, video_filepath, media_digest = recording_engine.stop()  # Waits for FFmpeg to finish the file
+    print(f"Stopped recording video {object_count}")
 
-    return None
+    # Queue the video for signing and upload; it was already hashed while it was recorded
+    capture_pipeline.submit(create_job(fingerprint, video_filepath, camera_number_string, save_video_filepath, gps_lock,
+                                       media_digest=media_digest))
 
 # --------------------------------------------------------------------
 
@@ -596,116 +597,79 @@ def capture_image(camera, capture_image_lock):
     """
     print("Capture_image called")
     global gui_instance
+    shutter_time = time.monotonic()  # The still is the first frame captured after this
 
     if not camera.isOpened():
         print("\tError: Camera not found or could not be opened.")
         return None
 
     with capture_image_lock:
-        # Capture a single frame from the camera
         frame = None
-        for i in range(35):
-            ret, frame = camera.read()
-        
+        if zsl_mode:
+            # Zero shutter lag: the frame is already in the camera's rolling window
+            frame, captured = camera.select_frame(at=shutter_time, mode=zsl_mode, window=zsl_window)
+            if frame is not None:
+                print(f"\tZSL frame captured {1000 * (captured - shutter_time):+.0f} ms from the press")
+
+        if frame is None:
+            # Take the first frame the capture thread publishes after the shutter press (at most one frame period)
+            frame = camera.capture_frame(after=shutter_time)
+
         # Animate the captured image frame
         Clock.schedule_once(lambda dt: gui_instance.animate_last_frame())
         
-        if ret:
+        if frame is not None:
             image = frame
-            # Start automatic processing and upload process for images
-            Thread(target=main, args=(fingerprint, image, camera_number_string, save_image_filepath, gps_lock, signature_lock, upload_lock,)).start()
+            # Queue the image for processing and upload; the shutter returns immediately
+            capture_pipeline.submit(create_job(fingerprint, image, camera_number_string, save_image_filepath, gps_lock, encode_preset=image_encode_preset))
 
         else:
             print("\tError: Failed to capture an image.")
 
 # --------------------------------------------------------------------
 
-def count_files(directory_path):
+def start_upload_drainer():
     """
-    Helper function to return the number of AVI files in the specified directory.
-    """
-    if not os.path.exists(directory_path):
-        print(f"Directory not found: {directory_path}")
-        return 0
-
-    count = 0
-    for file_name in os.listdir(directory_path):
-        if file_name.lower().endswith('.avi'):
-            count += 1
-
-    return count
+    Start the event-driven drainer that uploads saved media (images and videos) from the durable upload queues.
 
-# -------------------------------------------------------------------
-
-def upload_saved_media_continuously(upload_lock):
-    """
-    Continuously attempts to upload saved media (images and videos) when WiFi is available.
+    The drainer is woken by new captures being queued and by WiFi status changes, instead of polling.
+    Every capture is uploaded to its own object key, so up to `upload_parallelism` uploads run at once.
     """
-    global gui_instance
-    while True:
-        if wifi_status:  # Assuming wifi_status is a global variable indicating WiFi availability
-            with upload_lock:  # Ensure exclusive access to the file system
-                try:
-                    for save_path in [save_image_filepath, save_video_filepath]:
-                        files = os.listdir(save_path)
-                        paired_files = find_paired_files(files)
-
-                        for base_name in paired_files:
-                            image_path = os.path.join(save_path, base_name + '.png')
-                            video_path = os.path.join(save_path, base_name + '.avi')
-                            metadata_path = os.path.join(save_path, base_name + '.json')
-
-                            try:
-                                if os.path.exists(image_path):
-                                    Clock.schedule_once(lambda dt: gui_instance.animate_upload())
-                                    upload_image_file(image_path, metadata_path)
-                                elif os.path.exists(video_path):
-                                    Clock.schedule_once(lambda dt: gui_instance.animate_upload())
-                                    upload_video_file(video_path, metadata_path)
-                            except Exception as e:
-                                print(f"Error uploading file {base_name}: {e}")
-                except Exception as e:
-                    print(f"Unexpected error: {e}")
-        
-        time.sleep(10)  # Wait before trying again
+    global upload_drainer
+    media_queues = [get_media_queue(save_image_filepath), get_media_queue(save_video_filepath)]
+    upload_drainer = UploadDrainer(media_queues, upload_media_file, parallelism=upload_parallelism)
+    upload_drainer.start()
+    get_connectivity_monitor().subscribe(upload_drainer.set_online)  # Wake the uploader on connectivity changes
 
 # -------------------------------------------------------------------
 
-def find_paired_files(files):
+def upload_media_file(media_path, metadata_path):
     """
-    Extract base filenames that have both an image/video and a metadata file.
+    Upload one queued image or video along with its metadata, showing the upload animation.
     """
-    base_names = set()
-    for file in files:
-        if file.lower().endswith(('.png', '.avi', '.json')):
-            base_names.add(file.rsplit('.', 1)[0])
-    return {base for base in base_names if any(f"{base}.json" in files for f in ['png', 'avi'])}
+    Clock.schedule_once(lambda dt: gui_instance.animate_upload())
+    if media_path.endswith(IMAGE_EXTENSIONS):
+        upload_image_file(media_path, metadata_path)
+    else:
+        upload_video_file(media_path, metadata_path)
 
 # -------------------------------------------------------------------
 
 def upload_image_file(image_path, metadata_path):
     """
-    Upload an image file along with its metadata.
+    Upload an image file along with its metadata, streaming the signed image bytes from disk unchanged.
     """
-    image = cv2.imread(image_path)
-    _, encoded_image = cv2.imencode(".png", image)
     metadata = read_metadata(metadata_path)
-    upload_image(encoded_image.tobytes(), metadata)
-    os.remove(image_path)
-    os.remove(metadata_path)
+    upload_image(image_path, metadata)
 
 # -------------------------------------------------------------------
 
 def upload_video_file(video_path, metadata_path):
     """
-    Upload a video file along with its metadata.
+    Upload a video file along with its metadata, streaming it from disk.
     """
-    with open(video_path, 'rb') as video:
-        video_bytes = video.read()
     metadata = read_metadata(metadata_path)
-    upload_video(video_bytes, metadata)
-    os.remove(video_path)
-    os.remove(metadata_path)
+    upload_video(video_path, metadata)
 
 # -------------------------------------------------------------------
                             
@@ -720,6 +684,10 @@ def read_metadata(file_path_metadata):
 # -------------------------------------------------------------------
 
 if __name__ == '__main__':
+    if batch_signing_window:
+        enable_batch_signing(window=batch_signing_window)
+    start_gps_reader()  # Keep the GPS port open so captures read the cached fix
+    Thread(target=recording_engine.prepare, daemon=True).start()  # Warm up the video encoder
     setup_gpio()
     gui_thread()  # Start the Kivy application
     GPIO.cleanup()  # Clean up GPIO resources
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+def write_atomic(filepath, data, fsync=True):
+    """
+    Write a file so that it is either fully written or not there at all.
+
+    The data goes to a temporary file that is flushed, fsynced and then renamed over the target,
+    so a crash never leaves a half-written file under the final name.
+
+    Args:
+        filepath (str): The final path of the file.
+        data (bytes): The file contents; any bytes-like object (including numpy buffers) works.
+        fsync (bool): Whether to fsync the file contents before the rename.
+    """
+    temp_filepath = filepath + '.tmp'
+    with open(temp_filepath, 'wb') as file:
+        file.write(memoryview(data).cast('B'))
+        file.flush()
+        if fsync:
+            os.fsync(file.fileno())
+    os.replace(temp_filepath, filepath)
+
+
+class MediaQueue:
+    """
+    Durable, crash-safe queue of captures waiting to be uploaded.
+
+    Each capture gets a monotonic ID from an SQLite AUTOINCREMENT column, so numbers are never
+    reused even after earlier entries are uploaded and removed. Media and metadata are written
+    with `write_atomic` as `{id}{extension}` and `{id}.json`, and an entry only becomes visible
+    to the uploaders once both files are in place. File contents are fsynced before each
+    rename, while the directory and database syncs are batched every `fsync_batch` entries.
+    On startup, half-written entries and stray temporary files are cleaned up.
+
+    Args:
+        directory (str): The directory holding the queued media, metadata and queue database.
+        fsync_batch (int): The number of entries committed between directory/database syncs.
+        recover_on_open (bool): Whether to run `recover` when the queue is opened. Only the camera
+                                application should recover, since it owns any in-progress writes.
+    """
+
+    def __init__(self, directory, fsync_batch=4, recover_on_open=True):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync_batch = fsync_batch
+        self.unsynced = 0
+        self.lock = threading.Lock()
+        self.listeners = []  # Called for every entry that becomes pending
+
+        # WAL with synchronous=NORMAL lets commits be made durable in batches by `sync`
+        self.connection = sqlite3.connect(os.path.join(directory, 'queue.db'), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS media (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                extension TEXT NOT NULL,
+                state TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+        if recover_on_open:
+            self.recover()
+
+    def media_path(self, media_id, extension):
+        """
+        Return the path of an entry's media file.
+        """
+        return os.path.join(self.directory, f"{media_id}{extension}")
+
+    def metadata_path(self, media_id):
+        """
+        Return the path of an entry's metadata file.
+        """
+        return os.path.join(self.directory, f"{media_id}.json")
+
+    def reserve(self, extension):
+        """
+        Allocate a new ID for media that is written by something else, such as a video recorder.
+
+        The entry stays hidden from the uploaders until `commit_metadata` is called.
+
+        Args:
+            extension (str): The media file extension, e.g. '.avi'.
+
+        Returns:
+            tuple: The new ID and the path the media file should be written to.
+        """
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO media (extension, state, created) VALUES (?, 'writing', ?)",
+                (extension, time.time())
+            )
+            self.connection.commit()
+            media_id = cursor.lastrowid
+
+        return media_id, self.media_path(media_id, extension)
+
+    def save(self, media_bytes, metadata, extension):
+        """
+        Queue encoded media and its metadata for upload.
+
+        The media bytes are written verbatim, so the file holds exactly the bytes that were signed.
+
+        Args:
+            media_bytes (bytes): The encoded media (any bytes-like object).
+            metadata (dict): The metadata for the media.
+            extension (str): The media file extension, e.g. '.png'.
+
+        Returns:
+            int: The ID of the queued entry.
+        """
+        media_id, media_filepath = self.reserve(extension)
+        write_atomic(media_filepath, media_bytes)
+        self.commit_metadata(media_id, metadata)
+        return media_id
+
+    def commit_metadata(self, media_id, metadata):
+        """
+        Write the metadata for a reserved entry and make the entry visible to the uploaders.
+
+        Args:
+            media_id (int): The ID returned by `reserve` or `save`.
+            metadata (dict): The metadata for the media.
+        """
+        write_atomic(self.metadata_path(media_id), json.dumps(metadata).encode('utf-8'))
+
+        with self.lock:
+            self.connection.execute("UPDATE media SET state = 'pending' WHERE id = ?", (media_id,))
+            self.connection.commit()
+            extension = self.connection.execute("SELECT extension FROM media WHERE id = ?", (media_id,)).fetchone()[0]
+
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_batch:
+                self._sync()
+
+        # Tell the uploaders about the new entry
+        for listener in self.listeners:
+            listener(self, media_id, self.media_path(media_id, extension), self.metadata_path(media_id))
+
+    def add_listener(self, listener):
+        """
+        Register a callback for new entries.
+
+        Args:
+            listener: Called as listener(queue, media_id, media_path, metadata_path) each time an
+                      entry becomes pending.
+        """
+        self.listeners.append(listener)
+
+    def pending(self):
+        """
+        List the entries waiting to be uploaded, oldest first.
+
+        Returns:
+            list: (id, media_path, metadata_path) tuples.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id, extension FROM media WHERE state = 'pending' ORDER BY id"
+            ).fetchall()
+
+        return [(media_id, self.media_path(media_id, extension), self.metadata_path(media_id))
+                for media_id, extension in rows]
+
+    def remove(self, media_id):
+        """
+        Delete an entry and its files, e.g. after it has been uploaded.
+
+        Args:
+            media_id (int): The ID of the entry.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT extension FROM media WHERE id = ?", (media_id,)).fetchone()
+            if row is None:
+                return
+
+            self._delete_files(media_id, row[0])
+            self.connection.execute("DELETE FROM media WHERE id = ?", (media_id,))
+            self.connection.commit()
+
+    def sync(self):
+        """
+        Make every committed entry durable now instead of waiting for the batch to fill.
+        """
+        with self.lock:
+            self._sync()
+
+    def recover(self):
+        """
+        Clean up after a crash.
+
+        Entries that never got their metadata (e.g. a recording interrupted by a power cut) are
+        dropped because they cannot be signed any more, and pending entries missing one of their
+        files are removed; either way the entry's own files (media, metadata and multipart upload
+        state) are deleted with it, as `remove` does. Media + metadata pairs saved before the
+        queue existed are adopted, and temporary files are deleted. Files that belong to no
+        entry are otherwise never deleted, so nothing that might still be needed is lost.
+        """
+        with self.lock:
+            rows = self.connection.execute("SELECT id, extension, state FROM media").fetchall()
+            tracked = {'queue.db', 'queue.db-wal', 'queue.db-shm'}
+
+            for media_id, extension, state in rows:
+                media_filepath = self.media_path(media_id, extension)
+                metadata_filepath = self.metadata_path(media_id)
+
+                if state == 'writing' or not (os.path.exists(media_filepath) and os.path.exists(metadata_filepath)):
+                    print(f"Recovering queue: dropping incomplete entry {media_id}")
+                    self._delete_files(media_id, extension)  # A partial recording can be hundreds of MB
+                    self.connection.execute("DELETE FROM media WHERE id = ?", (media_id,))
+                else:
+                    tracked.add(os.path.basename(media_filepath))
+                    tracked.add(os.path.basename(metadata_filepath))
+                    tracked.add(os.path.basename(media_filepath) + '.upload')  # Multipart upload state, kept for resuming
+
+            self.connection.commit()
+
+            # Complete media + metadata pairs saved before the queue existed are adopted as new
+            # entries. They are first moved aside to `*.legacy` so their old names cannot clash with
+            # new IDs; pairs already moved aside by an interrupted recovery are picked up again here.
+            untracked = {}  # Name without '.legacy' -> current name
+            for file_name in os.listdir(self.directory):
+                if file_name not in tracked and os.path.isfile(os.path.join(self.directory, file_name)):
+                    untracked[file_name[:-len('.legacy')] if file_name.endswith('.legacy') else file_name] = file_name
+
+            legacy_pairs = []
+            for file_name in sorted(untracked):
+                base_name, extension = os.path.splitext(file_name)
+                metadata_name = f"{base_name}.json"
+                if extension in ('.json', '.tmp', '.upload') or metadata_name not in untracked:
+                    continue
+
+                for name in (file_name, metadata_name):
+                    if untracked[name] != name + '.legacy':
+                        os.replace(os.path.join(self.directory, untracked[name]), os.path.join(self.directory, name + '.legacy'))
+                legacy_pairs.append((file_name, extension, metadata_name))
+
+            for file_name, extension, metadata_name in legacy_pairs:
+                cursor = self.connection.execute(
+                    "INSERT INTO media (extension, state, created) VALUES (?, 'pending', ?)",
+                    (extension, time.time())
+                )
+                media_id = cursor.lastrowid
+                os.replace(os.path.join(self.directory, file_name + '.legacy'), self.media_path(media_id, extension))
+                os.replace(os.path.join(self.directory, metadata_name + '.legacy'), self.metadata_path(media_id))
+                tracked.add(os.path.basename(self.media_path(media_id, extension)))
+                tracked.add(os.path.basename(self.metadata_path(media_id)))
+                print(f"Recovering queue: adopted {file_name} as entry {media_id}")
+
+            self.connection.commit()
+
+            # Temporary files from interrupted writes, and multipart upload state for entries that
+            # are gone, are deleted; anything else (including subdirectories) is left alone
+            for file_name in os.listdir(self.directory):
+                if file_name in tracked or not os.path.isfile(os.path.join(self.directory, file_name)):
+                    continue
+                if file_name.endswith('.tmp') or file_name.endswith('.upload'):
+                    print(f"Recovering queue: removing leftover file {file_name}")
+                    os.remove(os.path.join(self.directory, file_name))
+
+            self._sync()
+
+    def _delete_files(self, media_id, extension):
+        """
+        Delete an entry's media, metadata and multipart upload state, whichever exist.
+        """
+        media_filepath = self.media_path(media_id, extension)
+        for filepath in (media_filepath, self.metadata_path(media_id), media_filepath + '.upload'):
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+    def _sync(self):
+        """
+        fsync the queue directory (so renames are durable) and checkpoint the database.
+        """
+        directory_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+        self.connection.execute("PRAGMA wal_checkpoint(FULL)")
+        self.unsynced = 0
+
+
+media_queues = {}
+media_queues_lock = threading.Lock()
+
+def get_media_queue(directory):
+    """
+    Return the shared MediaQueue for a directory, opening (and recovering) it on first use.
+
+    Args:
+        directory (str): The queue directory, e.g. the tmpImages or tmpVideos folder.
+
+    Returns:
+        MediaQueue: The queue for that directory.
+    """
+    directory = os.path.abspath(directory)
+    with media_queues_lock:
+        if directory not in media_queues:
+            media_queues[directory] = MediaQueue(directory)
+        return media_queues[directory]
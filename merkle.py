@@ -0,0 +1,77 @@
+import hashlib
+
+# Domain separation so a leaf can never be mistaken for an interior node
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+def merkle_leaf(digest: bytes) -> bytes:
+    """
+    Hash a capture digest into a Merkle leaf.
+
+    Args:
+        digest (bytes): The SHA-256 digest of a capture's combined data.
+
+    Returns:
+        bytes: The leaf hash.
+    """
+    return hashlib.sha256(LEAF_PREFIX + digest).digest()
+
+
+def merkle_node(left: bytes, right: bytes) -> bytes:
+    """
+    Hash two child hashes into their parent node.
+
+    Args:
+        left (bytes): The left child hash.
+        right (bytes): The right child hash.
+
+    Returns:
+        bytes: The parent hash.
+    """
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_merkle_tree(digests: list) -> tuple:
+    """
+    Build a Merkle tree over a batch of capture digests.
+
+    When a level has an odd number of nodes the last one is carried up unchanged rather than
+    duplicated, so no two different batches can produce the same root.
+
+    Args:
+        digests (list): The SHA-256 digests of the captures in the batch, in order.
+
+    Returns:
+        tuple: The root hash (bytes) and a list with one inclusion proof per digest. Each proof
+               is a list of (side, sibling_hash) pairs from the leaf up, where side is 'L' if
+               the sibling is on the left and 'R' if it is on the right.
+    """
+    level = [merkle_leaf(digest) for digest in digests]
+    positions = list(range(len(digests)))  # Index of each leaf's ancestor in the current level
+    proofs = [[] for _ in digests]
+
+    while len(level) > 1:
+        # Record each leaf's sibling at this level
+        for leaf_index, position in enumerate(positions):
+            if position % 2 == 1:
+                proofs[leaf_index].append(('L', level[position - 1]))
+            elif position + 1 < len(level):
+                proofs[leaf_index].append(('R', level[position + 1]))
+
+        # Hash pairs of nodes into the next level, carrying an unpaired last node up as-is
+        next_level = [merkle_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2 == 1:
+            next_level.append(level[-1])
+
+        level = next_level
+        positions = [position // 2 for position in positions]
+
+    return level[0], proofs
+
+
+def encode_proof(proof: list) -> str:
+    """
+    Encode an inclusion proof as a compact string for the capture metadata (e.g. "L:ab12..,R:cd34..").
+    """
+    return ','.join(f"{side}:{sibling.hex()}" for side, sibling in proof)
+
@@ -0,0 +1,142 @@
+import numpy as np
+
+# Kivy is only needed on the camera; headless benchmarks pass their own texture factory
+try:
+    from kivy.graphics.texture import Texture
+except ImportError:
+    Texture = None
+
+# OpenCV does the remap on the camera; the numpy fallback keeps headless benchmarks working
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+def create_kivy_texture(width, height):
+    """
+    Create a Kivy BGR texture that is drawn upside down, matching OpenCV's top-down row order.
+    """
+    texture = Texture.create(size=(width, height), colorfmt='bgr')
+    texture.flip_vertical()  # Flip through the texture coordinates instead of copying pixels
+    return texture
+
+
+class PreviewRenderer:
+    """
+    Draws camera frames into a single preview texture without per-frame allocations.
+
+    The old preview path flipped every frame with cv2.flip, copied it with tobytes() and created
+    a new texture, which is three full-frame allocations per tick. Here the texture is created
+    once (and again only if the frame size changes), the vertical flip is done with the texture
+    coordinates, and each frame is uploaded straight from the numpy buffer.
+
+    Args:
+        texture_factory: Called as texture_factory(width, height) to create a texture with
+                         `blit_buffer`; defaults to a flipped Kivy texture.
+    """
+
+    def __init__(self, texture_factory=None):
+        self.texture_factory = texture_factory or create_kivy_texture
+        self.texture = None
+        self.size = None
+        self.last_frame = None
+
+    def render(self, frame):
+        """
+        Upload a BGR frame to the preview texture.
+
+        Args:
+            frame (numpy.ndarray): The frame as returned by cv2.VideoCapture.read().
+
+        Returns:
+            bool: True if a new texture was created (the widget must be pointed at it),
+                  False if the existing texture was updated in place.
+        """
+        size = (frame.shape[1], frame.shape[0])
+        created = size != self.size
+        if created:
+            self.texture = self.texture_factory(*size)
+            self.size = size
+
+        # A C-contiguous frame is passed as a view of its own memory; nothing is copied here
+        self.texture.blit_buffer(np.ascontiguousarray(frame).reshape(-1), colorfmt='bgr', bufferfmt='ubyte')
+        self.last_frame = frame
+        return created
+
+    def snapshot(self):
+        """
+        Return a separate texture holding the last rendered frame, e.g. for the capture thumbnail.
+
+        The preview texture keeps changing, so anything that must keep showing one frame gets its
+        own copy. This allocates, but only when called, not on every tick.
+        """
+        if self.last_frame is None:
+            return None
+
+        texture = self.texture_factory(*self.size)
+        texture.blit_buffer(np.ascontiguousarray(self.last_frame).reshape(-1), colorfmt='bgr', bufferfmt='ubyte')
+        return texture
+
+# --------------------------------------------------------------------
+
+class PreviewScaler:
+    """
+    Downscales full-resolution camera frames to the preview size with a cached interpolation map.
+
+    The preview is derived from the same 1080p stream used for stills and video, so every frame
+    has to be scaled. The source -> preview coordinate map is built once per input size
+    (converted to OpenCV's fixed-point format, which remaps fastest) and every frame is then
+    scaled with a single cv2.remap into a preallocated output frame.
+
+    Args:
+        width (int): The preview width in pixels.
+        height (int): The preview height in pixels.
+    """
+
+    def __init__(self, width, height):
+        self.size = (width, height)
+        self.source_size = None
+        self.maps = None
+        self.output = np.empty((height, width, 3), dtype=np.uint8)
+
+    def build_maps(self, source_width, source_height):
+        """
+        Build the interpolation map from preview pixels to source pixels.
+        """
+        width, height = self.size
+        # Sample at the centre of each preview pixel's footprint in the source frame
+        map_x = ((np.arange(width, dtype=np.float32) + 0.5) * source_width / width - 0.5)
+        map_y = ((np.arange(height, dtype=np.float32) + 0.5) * source_height / height - 0.5)
+
+        if cv2 is not None:
+            map_x, map_y = np.meshgrid(map_x, map_y)
+            self.maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+        else:
+            # Nearest-neighbour row and column indices for the numpy fallback
+            rows = np.clip(np.rint(map_y), 0, source_height - 1).astype(np.intp)
+            columns = np.clip(np.rint(map_x), 0, source_width - 1).astype(np.intp)
+            self.maps = (rows[:, None], columns[None, :])
+
+        self.source_size = (source_width, source_height)
+
+    def scale(self, frame):
+        """
+        Scale a frame to the preview size.
+
+        Args:
+            frame (numpy.ndarray): A full-resolution BGR frame.
+
+        Returns:
+            numpy.ndarray: The preview frame; the same buffer is reused for every call.
+        """
+        source_size = (frame.shape[1], frame.shape[0])
+        if source_size == self.size:
+            return frame
+        if source_size != self.source_size:
+            self.build_maps(*source_size)
+
+        if cv2 is not None:
+            cv2.remap(frame, self.maps[0], self.maps[1], cv2.INTER_LINEAR, dst=self.output)
+        else:
+            self.output[...] = frame[self.maps]
+        return self.output
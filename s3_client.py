@@ -0,0 +1,203 @@
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from media_queue import write_atomic
+
+# Connection pool and retry settings shared by every upload. The pool is large enough for
+# several uploads running multipart parts at the same time.
+S3_CONFIG = Config(
+    max_pool_connections=16,
+    retries={'max_attempts': 5, 'mode': 'standard'},
+    connect_timeout=5,
+    read_timeout=60,
+    tcp_keepalive=True,
+)
+
+MULTIPART_THRESHOLD = 16 * 1024 * 1024  # Files at least this large are uploaded in parts
+PART_SIZE = 8 * 1024 * 1024             # S3 requires every part except the last to be >= 5 MB
+MAX_CONCURRENCY = 4                     # Parts of one file uploaded at the same time
+
+s3_client = None
+s3_client_lock = threading.Lock()
+
+def get_s3_client():
+    """
+    Return the shared S3 client, creating it on first use.
+
+    Building a client is slow on the Pi (hundreds of milliseconds), so one client with a pooled
+    connection is kept for the whole process. boto3 clients are thread-safe once created.
+
+    Returns:
+        botocore.client.S3: The shared S3 client.
+    """
+    global s3_client
+    with s3_client_lock:
+        if s3_client is None:
+            s3_client = boto3.client('s3', config=S3_CONFIG)
+        return s3_client
+
+# --------------------------------------------------------------------
+
+def create_object_key(metadata, extension):
+    """
+    Create the unique S3 key a capture is uploaded to.
+
+    Keys are content-addressed: `{camera number}/{SHA-256 of the signature and Merkle proof}{extension}`.
+    Every capture has a different signature (captures signed in one batch share a signature but
+    have different proofs), so uploads never overwrite each other, while retrying an upload
+    reuses the same key.
+
+    Args:
+        metadata (dict): The capture's metadata from `create_metadata`.
+        extension (str): The media file extension, e.g. '.png'.
+
+    Returns:
+        str: The object key.
+    """
+    capture_id = hashlib.sha256()
+    capture_id.update(metadata['Signature'].encode('utf-8'))
+    capture_id.update(metadata.get('MerkleProof', '').encode('utf-8'))
+    return f"{metadata['CameraNumber']}/{capture_id.hexdigest()}{extension}"
+
+
+def upload_state_path(filepath):
+    """
+    Return the path of the sidecar file that records an in-progress multipart upload.
+    """
+    return filepath + '.upload'
+
+
+def upload_file(filepath, bucket, key, metadata, extra_args=None, part_size=PART_SIZE,
+                max_concurrency=MAX_CONCURRENCY, client=None):
+    """
+    Upload a file from disk to S3 without reading it into memory.
+
+    Small files are streamed with a single put_object. Large files are uploaded in parts, several
+    at a time, with each part read from disk only when it is sent. The multipart upload ID is
+    recorded next to the file, so if the upload fails partway (or the camera restarts) the next
+    call only sends the parts S3 does not already have.
+
+    Args:
+        filepath (str): The file to upload.
+        bucket (str): The destination bucket.
+        key (str): The destination object key.
+        metadata (dict): The S3 object metadata.
+        extra_args (dict): Extra object parameters such as ContentDisposition.
+        part_size (int): The size of each part of a multipart upload in bytes.
+        max_concurrency (int): The number of parts uploaded at the same time.
+        client: The S3 client to use; defaults to the shared client.
+
+    Raises:
+        Exception: If the upload fails. Parts already uploaded are kept for the next attempt.
+    """
+    client = client or get_s3_client()
+    extra_args = extra_args or {}
+    size = os.path.getsize(filepath)
+
+    if size < max(MULTIPART_THRESHOLD, part_size):
+        with open(filepath, 'rb') as file:
+            client.put_object(Bucket=bucket, Key=key, Body=file, Metadata=metadata, **extra_args)
+        return
+
+    # ---------------- Start or Resume the Multipart Upload --------------
+    state_path = upload_state_path(filepath)
+    state = read_upload_state(state_path)
+    completed_parts = {}
+
+    if state and (state['bucket'], state['key'], state['size'], state['part_size']) == (bucket, key, size, part_size):
+        try:
+            completed_parts = list_completed_parts(client, state)
+            print(f"Resuming upload of {filepath}: {len(completed_parts)} parts already uploaded")
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'NoSuchUpload':
+                raise
+            state = None  # The upload expired or was aborted; start again
+    elif state:
+        # The file or destination changed since the last attempt, so the old parts are useless
+        abort_upload(client, state)
+        state = None
+
+    if not state:
+        response = client.create_multipart_upload(Bucket=bucket, Key=key, Metadata=metadata, **extra_args)
+        state = {'bucket': bucket, 'key': key, 'upload_id': response['UploadId'],
+                 'size': size, 'part_size': part_size}
+        write_atomic(state_path, json.dumps(state).encode('utf-8'))
+
+    # ---------------- Upload the Missing Parts ---------------------------
+    part_count = (size + part_size - 1) // part_size
+    missing_parts = []
+    for part_number in range(1, part_count + 1):
+        expected_size = min(part_size, size - (part_number - 1) * part_size)
+        part = completed_parts.get(part_number)
+        if part is None or part['Size'] != expected_size:
+            missing_parts.append(part_number)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [executor.submit(upload_part, client, filepath, state, part_number)
+                   for part_number in missing_parts]
+        for part_number, future in zip(missing_parts, futures):
+            completed_parts[part_number] = {'ETag': future.result(), 'Size': None}
+
+    # ---------------- Complete the Upload --------------------------------
+    parts = [{'PartNumber': part_number, 'ETag': completed_parts[part_number]['ETag']}
+             for part_number in range(1, part_count + 1)]
+    client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=state['upload_id'],
+                                     MultipartUpload={'Parts': parts})
+    os.remove(state_path)
+
+
+def upload_part(client, filepath, state, part_number):
+    """
+    Read one part of a file from disk and upload it.
+
+    Returns:
+        str: The ETag S3 returned for the part.
+    """
+    with open(filepath, 'rb') as file:
+        file.seek((part_number - 1) * state['part_size'])
+        body = file.read(state['part_size'])
+
+    response = client.upload_part(Bucket=state['bucket'], Key=state['key'], UploadId=state['upload_id'],
+                                  PartNumber=part_number, Body=body)
+    return response['ETag']
+
+
+def list_completed_parts(client, state):
+    """
+    Ask S3 which parts of an in-progress multipart upload it already has.
+
+    Returns:
+        dict: Part number -> {'ETag', 'Size'}.
+    """
+    parts = {}
+    paginator = client.get_paginator('list_parts')
+    for page in paginator.paginate(Bucket=state['bucket'], Key=state['key'], UploadId=state['upload_id']):
+        for part in page.get('Parts', []):
+            parts[part['PartNumber']] = {'ETag': part['ETag'], 'Size': part['Size']}
+    return parts
+
+
+def abort_upload(client, state):
+    """
+    Abort a multipart upload so S3 discards its parts, ignoring uploads that are already gone.
+    """
+    try:
+        client.abort_multipart_upload(Bucket=state['bucket'], Key=state['key'], UploadId=state['upload_id'])
+    except ClientError as e:
+        print(f"Could not abort multipart upload {state['upload_id']}: {e}")
+
+
+def read_upload_state(state_path):
+    """
+    Read the sidecar state of an in-progress multipart upload, or None if there is none.
+    """
+    try:
+        with open(state_path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
@@ -1,7 +1,5 @@
-import os
-import cv2
-import numpy as np
 import json
+from media_queue import write_atomic
 
 def save_metadata(metadata, save_metadata_filepath):
     """
@@ -13,7 +11,6 @@ def save_metadata(metadata, save_metadata_filepath):
 
     This function:
     - Writes the metadata dictionary to a JSON file at the specified location.
+    - Writes through a temporary file and a rename, so a crash never leaves a half-written file.
     """
-    # Open the specified file in write mode and dump the metadata dictionary into it as JSON
-    with open(save_metadata_filepath, 'w') as file:
-        json.dump(metadata, file)
+    write_atomic(save_metadata_filepath, json.dumps(metadata).encode('utf-8'))
@@ -0,0 +1,181 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+SEGMENTED_LAYOUT = 'segmented-v2'  # Metadata 'Layout' value for videos signed segment by segment
+SEGMENT_SIZE = 8 * 1024 * 1024     # Same as the multipart part size, so each segment uploads as one part
+CHAIN_SEED = b'photolock-segments-v2'
+
+def chain_segment_hashes(segment_hashes) -> bytes:
+    """
+    Chain segment hashes in order.
+
+    chain_0 = SHA-256("photolock-segments-v2") and chain_i = SHA-256(chain_(i-1) + hash_i), so the
+    chain commits to every segment and to their order.
+
+    Args:
+        segment_hashes (list): The SHA-256 digest (bytes) of each segment, in order.
+
+    Returns:
+        bytes: The chained hash.
+    """
+    root = hashlib.sha256(CHAIN_SEED).digest()
+    for segment_hash in segment_hashes:
+        root = hashlib.sha256(root + segment_hash).digest()
+    return root
+
+
+def manifest_root(segment_hashes, segment_size: int, length: int) -> bytes:
+    """
+    Compute the manifest root that gets signed.
+
+    root = SHA-256(chain + segment_size + length), with both sizes as 8-byte big-endian integers.
+    Signing the sizes along with the chain means the manifest's `length` and `segment_size`
+    cannot be edited, so bytes appended to the video are always detected.
+
+    Args:
+        segment_hashes (list): The SHA-256 digest (bytes) of each segment, in order.
+        segment_size (int): The size of each segment in bytes.
+        length (int): The total size of the video in bytes.
+
+    Returns:
+        bytes: The manifest root.
+    """
+    return hashlib.sha256(chain_segment_hashes(segment_hashes)
+                          + segment_size.to_bytes(8, 'big') + length.to_bytes(8, 'big')).digest()
+
+
+def segment_count(length: int, segment_size: int) -> int:
+    """
+    Return the number of segments a video of `length` bytes is split into.
+    """
+    return -(-length // segment_size)
+
+
+class SegmentedDigest:
+    """
+    Incremental digest of a video split into fixed-size segments.
+
+    The encoded video is fed in as it is written (like CombinedDigest) and cut into segments of
+    `segment_size` bytes, each hashed on its own. The signed digest uses the segmented-v2 layout:
+    fingerprint + camera number + manifest root + date + time + location, where the manifest root
+    chains the segment hashes and covers the segment size and video length. A verifier can then check every segment independently (and in
+    parallel), and a corrupt byte only invalidates the segment it is in.
+
+    Args:
+        fingerprint (str): The fingerprint of the user recording.
+        camera_number (str): The camera number.
+        segment_size (int): The size of each segment in bytes (the last one may be shorter).
+    """
+
+    def __init__(self, fingerprint: str, camera_number: str, segment_size: int = SEGMENT_SIZE):
+        self.fingerprint = fingerprint
+        self.camera_number = camera_number
+        self.segment_size = segment_size
+        self.segment_hashes = []
+        self.segment_hash = hashlib.sha256()
+        self.segment_fill = 0  # Bytes in the current segment
+        self.length = 0
+
+    def update(self, media_chunk) -> None:
+        """
+        Feed a chunk of encoded media, splitting it at segment boundaries.
+        """
+        view = memoryview(media_chunk).cast('B')
+        self.length += len(view)
+
+        while len(view):
+            take = min(len(view), self.segment_size - self.segment_fill)
+            self.segment_hash.update(view[:take])
+            self.segment_fill += take
+            view = view[take:]
+
+            if self.segment_fill == self.segment_size:
+                self._close_segment()
+
+    def manifest(self) -> str:
+        """
+        Return the segment manifest as a JSON string (call after all media has been fed).
+        """
+        if self.segment_fill:
+            self._close_segment()
+
+        return json.dumps({
+            'layout': SEGMENTED_LAYOUT,
+            'segment_size': self.segment_size,
+            'length': self.length,
+            'segments': [segment_hash.hex() for segment_hash in self.segment_hashes],
+        })
+
+    def finalize(self, date: str, time: str, location: str) -> bytes:
+        """
+        Return the digest to sign over the segmented-v2 layout.
+        """
+        if self.segment_fill:
+            self._close_segment()
+
+        hash_object = hashlib.sha256()
+        hash_object.update(self.fingerprint.encode('utf-8'))
+        hash_object.update(self.camera_number.encode('utf-8'))
+        hash_object.update(manifest_root(self.segment_hashes, self.segment_size, self.length))
+        hash_object.update(date.encode('utf-8'))
+        hash_object.update(time.encode('utf-8'))
+        hash_object.update(location.encode('utf-8'))
+        return hash_object.digest()
+
+    def _close_segment(self):
+        self.segment_hashes.append(self.segment_hash.digest())
+        self.segment_hash = hashlib.sha256()
+        self.segment_fill = 0
+
+# --------------------------------------------------------------------
+
+def hash_segment(filepath: str, offset: int, length: int) -> bytes:
+    """
+    Hash one segment of a file, reading it in 1 MB chunks.
+    """
+    hash_object = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        file.seek(offset)
+        while length > 0:
+            chunk = file.read(min(length, 1024 * 1024))
+            if not chunk:
+                break
+            hash_object.update(chunk)
+            length -= len(chunk)
+    return hash_object.digest()
+
+
+def verify_segments(filepath: str, manifest: str, workers: int = 4) -> list:
+    """
+    Check every segment of a video file against its manifest, several segments at a time.
+
+    hashlib releases the GIL while hashing, so the segments are hashed in parallel.
+
+    Args:
+        filepath (str): The video file.
+        manifest (str): The JSON manifest from `SegmentedDigest.manifest`.
+        workers (int): The number of segments hashed at the same time.
+
+    Returns:
+        list: The indexes of segments that do not match (empty if the file is intact).
+
+    Raises:
+        ValueError: If the file size or the number of segments does not match the manifest.
+    """
+    manifest = json.loads(manifest)
+    segment_size = manifest['segment_size']
+
+    if os.path.getsize(filepath) != manifest['length']:
+        raise ValueError(f"Video is {os.path.getsize(filepath)} bytes, manifest expects {manifest['length']}")
+    if len(manifest['segments']) != segment_count(manifest['length'], segment_size):
+        raise ValueError(f"Manifest has {len(manifest['segments'])} segments for {manifest['length']} bytes")
+
+    def check(index):
+        return hash_segment(filepath, index * segment_size, segment_size).hex() == manifest['segments'][index]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(check, range(len(manifest['segments']))))
+
+    return [index for index, matches in enumerate(results) if not matches]
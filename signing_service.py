@@ -0,0 +1,330 @@
+import base64
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from create_signature import create_signature
+from merkle import build_merkle_tree, encode_proof
+
+# tpm2-pytss is only needed on the camera itself; the software signer works without it
+try:
+    from tpm2_pytss import ESAPI, TPM2B_DIGEST, TPMT_SIG_SCHEME, TPMT_TK_HASHCHECK
+    from tpm2_pytss.constants import TPM2_ALG, TPM2_ST, TPM2_RH
+except ImportError:
+    ESAPI = None
+
+TPM_KEY_HANDLE = 0x81010001  # Persistent handle of the camera's signing key
+
+# --------------------------------------------------------------------
+
+class TPMSigner:
+    """
+    Signs digests with the TPM's persistent key through a single ESAPI context that stays open.
+
+    This replaces one `sudo tpm2 sign` process per capture: the TPM connection, the key
+    handle and the signing scheme are set up once, and each signature is a single TPM command.
+    The user running the camera must be able to open /dev/tpmrm0 (e.g. be in the `tss` group).
+    """
+
+    def __init__(self, key_handle: int = TPM_KEY_HANDLE, tcti: str = None):
+        if ESAPI is None:
+            raise ImportError("tpm2-pytss is required to sign with the TPM")
+
+        # Open the TPM context and load the persistent key handle once
+        self.ectx = ESAPI(tcti)
+        self.key = self.ectx.tr_from_tpmpublic(key_handle)
+
+        # RSASSA (PKCS#1 v1.5) over SHA-256, the same scheme as `tpm2 sign -s rsassa -g sha256`
+        self.scheme = TPMT_SIG_SCHEME(scheme=TPM2_ALG.RSASSA)
+        self.scheme.details.any.hashAlg = TPM2_ALG.SHA256
+
+        # A NULL hash check ticket is enough because we sign an externally computed digest
+        self.validation = TPMT_TK_HASHCHECK(tag=TPM2_ST.HASHCHECK, hierarchy=TPM2_RH.NULL)
+
+    def sign(self, digest: bytes) -> bytes:
+        """
+        Sign a SHA-256 digest and return the raw RSA signature bytes.
+        """
+        signature = self.ectx.sign(self.key, TPM2B_DIGEST(digest), self.scheme, self.validation)
+        return bytes(signature.signature.rsassa.sig)
+
+    def close(self):
+        """
+        Close the TPM context.
+        """
+        self.ectx.close()
+
+# --------------------------------------------------------------------
+
+class SoftwareSigner:
+    """
+    Stand-in for the TPM that signs with an RSA key held in memory.
+
+    Used for tests and benchmarks on machines without a TPM. Signatures have the same
+    format as the TPM's, so they verify with the Lambdas' `verify_signature`.
+    """
+
+    def __init__(self, private_key=None):
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        # Generate a throwaway 2048-bit key if none is provided
+        self.private_key = private_key or rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    def sign(self, digest: bytes) -> bytes:
+        """
+        Sign a SHA-256 digest and return the raw RSA signature bytes.
+        """
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding, utils
+
+        return self.private_key.sign(digest, padding.PKCS1v15(), utils.Prehashed(hashes.SHA256()))
+
+    def public_key_pem(self) -> bytes:
+        """
+        Return the public key in PEM format, as stored in the Cameras table.
+        """
+        from cryptography.hazmat.primitives import serialization
+
+        return self.private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+
+    def close(self):
+        pass
+
+# --------------------------------------------------------------------
+
+class SubprocessSigner:
+    """
+    Fallback signer that runs `sudo tpm2 sign` once per digest through `create_signature`.
+    """
+
+    def __init__(self):
+        self.signature_lock = threading.Lock()
+
+    def sign(self, digest: bytes) -> bytes:
+        """
+        Sign a SHA-256 digest and return the raw RSA signature bytes.
+        """
+        return base64.b64decode(create_signature(digest, self.signature_lock))
+
+    def close(self):
+        pass
+
+# --------------------------------------------------------------------
+
+class SigningService:
+    """
+    Long-lived signing service that owns a signer and processes digests from an in-process queue.
+
+    Capture threads call `sign` (or `submit` for a future) and the single worker thread
+    feeds the digests to the signer one at a time, so the TPM is never used concurrently.
+    """
+
+    def __init__(self, signer):
+        self.signer = signer
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, digest: bytes) -> Future:
+        """
+        Queue a digest for signing.
+
+        Args:
+            digest (bytes): The SHA-256 digest that needs to be signed.
+
+        Returns:
+            Future: Resolves to the signature encoded as a base64 string.
+        """
+        future = Future()
+        self.requests.put((digest, future))
+        return future
+
+    def sign(self, digest: bytes, timeout: float = None) -> str:
+        """
+        Sign a digest and wait for the result.
+
+        Args:
+            digest (bytes): The SHA-256 digest that needs to be signed.
+            timeout (float): Seconds to wait for the signature, or None to wait indefinitely.
+
+        Returns:
+            str: The generated signature encoded as a base64 string.
+        """
+        return self.submit(digest).result(timeout)
+
+    def stop(self):
+        """
+        Stop the worker thread once queued digests are signed and close the signer.
+        """
+        self.requests.put(None)
+        self.worker.join()
+        self.signer.close()
+
+    def _run(self):
+        """
+        Worker loop: sign each queued digest and resolve its future.
+        """
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+
+            digest, future = request
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                signature = self.signer.sign(digest)
+                future.set_result(base64.b64encode(signature).decode('utf-8'))
+            except Exception as e:
+                future.set_exception(e)
+
+# --------------------------------------------------------------------
+
+class BatchSigningService:
+    """
+    Signs bursts of captures with a single signature over the Merkle root of their digests.
+
+    The first digest to arrive opens a collection window; every digest submitted before the
+    window closes (or until `max_batch` digests are queued) joins the same batch. The batch's
+    Merkle root is signed once by the underlying signing service and each capture receives the
+    root signature together with its own inclusion proof. A batch of one is signed directly,
+    without a proof, so it stays compatible with verifiers that predate batch mode.
+    """
+
+    def __init__(self, signing_service, window: float = 0.25, max_batch: int = 16):
+        self.signing_service = signing_service
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, digest: bytes) -> Future:
+        """
+        Queue a digest for the next batch.
+
+        Args:
+            digest (bytes): The SHA-256 digest that needs to be signed.
+
+        Returns:
+            Future: Resolves to a (signature_string, merkle_proof) tuple, where merkle_proof is
+                    the encoded inclusion proof or None if the digest was signed on its own.
+        """
+        future = Future()
+        self.requests.put((digest, future))
+        return future
+
+    def sign(self, digest: bytes, timeout: float = None) -> tuple:
+        """
+        Sign a digest as part of a batch and wait for the result.
+
+        Returns:
+            tuple: The base64 signature string and the encoded Merkle proof (or None).
+        """
+        return self.submit(digest).result(timeout)
+
+    def _run(self):
+        """
+        Worker loop: collect a batch of digests, then sign it.
+        """
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.window
+
+            # Keep collecting until the window closes or the batch is full
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._sign_batch(batch)
+
+    def _sign_batch(self, batch: list):
+        """
+        Sign one batch and resolve the futures of its captures.
+        """
+        digests = [digest for digest, _ in batch]
+
+        try:
+            if len(batch) == 1:
+                results = [(self.signing_service.sign(digests[0]), None)]
+            else:
+                root, proofs = build_merkle_tree(digests)
+                signature_string = self.signing_service.sign(root)
+                results = [(signature_string, encode_proof(proof)) for proof in proofs]
+                print(f"Signed a batch of {len(batch)} captures with one Merkle-root signature.")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+# --------------------------------------------------------------------
+
+signing_service = None
+batch_signing_service = None
+signing_service_lock = threading.Lock()
+
+def get_signing_service() -> SigningService:
+    """
+    Return the process-wide signing service, starting it on first use.
+
+    The service uses the TPM through a persistent ESAPI context when tpm2-pytss is
+    available, and falls back to one `tpm2 sign` subprocess per digest otherwise.
+    """
+    global signing_service
+
+    with signing_service_lock:
+        if signing_service is None:
+            try:
+                signer = TPMSigner()
+            except Exception as e:
+                print(f"Persistent TPM context unavailable ({e}); signing with tpm2 subprocesses.")
+                signer = SubprocessSigner()
+            signing_service = SigningService(signer)
+
+    return signing_service
+
+
+def enable_batch_signing(window: float = 0.25, max_batch: int = 16):
+    """
+    Turn on batch mode: captures made within `window` seconds of each other share one
+    Merkle-root signature instead of each calling the TPM.
+
+    Args:
+        window (float): How long (in seconds) the first capture of a batch waits for others.
+        max_batch (int): The largest number of captures signed with one signature.
+    """
+    global batch_signing_service
+
+    service = get_signing_service()
+    with signing_service_lock:
+        if batch_signing_service is None:
+            batch_signing_service = BatchSigningService(service, window, max_batch)
+
+
+def sign_digest(digest: bytes) -> tuple:
+    """
+    Sign a capture digest, in batch mode if it has been enabled.
+
+    Args:
+        digest (bytes): The SHA-256 digest of the capture's combined data.
+
+    Returns:
+        tuple: The base64 signature string and the encoded Merkle inclusion proof, which is
+               None when the digest was signed on its own.
+    """
+    if batch_signing_service is not None:
+        return batch_signing_service.sign(digest)
+
+    return get_signing_service().sign(digest), None
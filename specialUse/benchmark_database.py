@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docker'))
+
+import mysql.connector
+from lambda_function import DatabasePool
+
+'''
+Per-query latency of the Lambdas' database access: a new connection per query vs the warm pool.
+
+Usage: MYSQL_HOST=127.0.0.1 MYSQL_USER=root MYSQL_PASSWORD=... MYSQL_DATABASE=test python benchmark_database.py [queries]
+
+Needs the Lambda's requirements and a MySQL-compatible server as the stand-in for RDS, e.g.
+    docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=test -e MYSQL_DATABASE=test mysql:8
+A small Cameras table is created and the public key lookup is run `queries` times both ways.
+With the server on another host (as RDS is), or with TLS enabled, the handshake saved per query grows.
+'''
+
+queries = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+config = {
+    'host': os.environ.get('MYSQL_HOST', '127.0.0.1'),
+    'user': os.environ.get('MYSQL_USER', 'root'),
+    'password': os.environ.get('MYSQL_PASSWORD', ''),
+    'database': os.environ.get('MYSQL_DATABASE', 'test'),
+}
+
+QUERY = "SELECT PublicKey FROM Cameras WHERE CameraNumber = %s"
+
+# A few cameras to look up
+connection = mysql.connector.connect(**config)
+cursor = connection.cursor()
+cursor.execute("CREATE TABLE IF NOT EXISTS Cameras (CameraNumber INT PRIMARY KEY, PublicKey TEXT)")
+for camera_number in range(1, 5):
+    cursor.execute("REPLACE INTO Cameras VALUES (%s, %s)", (camera_number, 'key' * 150))
+connection.commit()
+connection.close()
+
+def connect_per_query(camera_number):
+    # What every lookup used to do
+    connection = mysql.connector.connect(**config)
+    cursor = connection.cursor()
+    cursor.execute(QUERY, (camera_number,))
+    result = cursor.fetchone()
+    cursor.close()
+    connection.close()
+    return result
+
+pool = DatabasePool(config)
+
+def pooled(camera_number):
+    return pool.query(QUERY, (camera_number,))
+
+def measure(name, lookup):
+    times = []
+    for index in range(queries):
+        start = time.perf_counter()
+        lookup(index % 4 + 1)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    mean_ms = 1000 * sum(times) / len(times)
+    p99_ms = 1000 * times[int(len(times) * 0.99) - 1]
+    print(f"{name:<18} mean {mean_ms:7.3f} ms  p99 {p99_ms:7.3f} ms")
+    return mean_ms
+
+print(f"{queries} public key lookups against {config['host']}")
+fresh_ms = measure("connect per query", connect_per_query)
+pooled_ms = measure("DatabasePool", pooled)
+print(f"Speed-up: {fresh_ms / pooled_ms:.1f}x")
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_encoder import ENCODE_PRESETS, available_presets, encode_image
+
+'''
+Encode time and size of every still encoder preset.
+
+Usage: python benchmark_encoders.py [image ...] [--repeat N]
+
+Each sample image (e.g. saved captures from tmpImages) is encoded with every preset the installed
+OpenCV supports. Without images, a synthetic 1920x1080 frame is used: smooth gradients with
+sensor-like noise, which compresses roughly like a real photo (pure noise or flat colour would not).
+Run it on the camera itself; encode times on a desktop are several times lower.
+'''
+
+arguments = sys.argv[1:]
+repeat = 5
+if '--repeat' in arguments:
+    index = arguments.index('--repeat')
+    repeat = int(arguments[index + 1])
+    del arguments[index:index + 2]
+
+def synthetic_frame(width=1920, height=1080):
+    # Smooth colour gradients plus mild noise, standing in for a real 1080p capture
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    frame = np.stack([255 * x * y, 255 * (1 - x) * y, 255 * x * (1 - y)], axis=2)
+    frame += rng.normal(0, 4, frame.shape).astype(np.float32)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+samples = [(path, cv2.imread(path)) for path in arguments] or [('synthetic 1920x1080', synthetic_frame())]
+
+presets = available_presets()
+unsupported = [preset for preset in ENCODE_PRESETS if preset not in presets]
+
+for name, frame in samples:
+    if frame is None:
+        print(f"Could not read {name}")
+        continue
+
+    raw_size = frame.nbytes
+    print(f"\n{name}: {frame.shape[1]}x{frame.shape[0]}, {repeat} encodes per preset")
+    print(f"{'preset':<15} {'mean ms':>9} {'min ms':>9} {'size KB':>9} {'ratio':>7}")
+
+    for preset in presets:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _, encoded_image = encode_image(frame, preset)
+            times.append(time.perf_counter() - start)
+
+        size = encoded_image.nbytes
+        print(f"{preset:<15} {1000 * sum(times) / len(times):9.1f} {1000 * min(times):9.1f} "
+              f"{size / 1024:9.0f} {raw_size / size:6.1f}x")
+
+if unsupported:
+    print(f"\nNot supported by OpenCV {cv2.__version__}: {', '.join(unsupported)}")
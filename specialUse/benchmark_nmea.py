@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GPS_uart import parse_nmea, fix_is_complete
+
+'''
+Throughput benchmark for the NMEA parser over a recorded corpus.
+
+Usage: python benchmark_nmea.py [recorded_log.nmea]
+
+Without a log file, a synthetic 10 Hz corpus (GGA + RMC + GSA + VTG per fix) is generated.
+The result is compared against what a 10 Hz receiver produces.
+'''
+
+def with_checksum(body):
+    # Append the XOR checksum to a sentence body (without the leading '$')
+    checksum = 0
+    for byte in body.encode('ascii'):
+        checksum ^= byte
+    return f"${body}*{checksum:02X}"
+
+def synthetic_corpus(fixes):
+    # One burst of four sentences per fix, walking the position and time forward at 10 Hz
+    sentences = []
+    for i in range(fixes):
+        seconds = i / 10
+        hhmmss = time.strftime("%H%M%S", time.gmtime(seconds)) + f".{i % 10}0"
+        latitude = f"{4807.038 + i * 0.0001:.4f}"
+        sentences.append(with_checksum(f"GNGGA,{hhmmss},{latitude},N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,"))
+        sentences.append(with_checksum(f"GNRMC,{hhmmss},A,{latitude},N,01131.000,E,022.4,084.4,181026,003.1,W"))
+        sentences.append(with_checksum("GNGSA,A,3,04,05,,09,12,,,24,,,,,2.5,1.3,2.1"))
+        sentences.append(with_checksum("GNVTG,054.7,T,034.4,M,005.5,N,010.2,K"))
+    return sentences
+
+if len(sys.argv) > 1:
+    with open(sys.argv[1], 'r', errors='ignore') as log:
+        corpus = [line.strip() for line in log if line.strip()]
+    print(f"Loaded {len(corpus)} sentences from {sys.argv[1]}")
+else:
+    corpus = synthetic_corpus(10000)
+    print(f"Generated {len(corpus)} synthetic sentences (10000 fixes)")
+
+# Parse the whole corpus into one merged fix record, counting completed fixes
+fix = {}
+completed = 0
+start = time.perf_counter()
+for sentence in corpus:
+    if parse_nmea(sentence, fix) and fix_is_complete(fix):
+        completed += 1
+elapsed = time.perf_counter() - start
+
+sentences_per_second = len(corpus) / elapsed
+print(f"Parsed in {elapsed * 1000:.1f} ms: {sentences_per_second:,.0f} sentences/s, {completed} position updates")
+
+# A 10 Hz receiver sending GGA + RMC + GSA + VTG produces 40 sentences per second
+print(f"Headroom over a 10 Hz receiver: {sentences_per_second / 40:,.0f}x")
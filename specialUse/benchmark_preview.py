@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preview_renderer import PreviewRenderer
+
+'''
+Headless frame-time benchmark for the preview path.
+
+Usage: python benchmark_preview.py [width height frames]
+
+Synthetic BGR frames stand in for the camera and a HeadlessTexture stands in for the Kivy
+texture (its blit copies the frame into GPU-sized memory, like the real upload does). The old
+path (flip + tobytes + new texture every frame) is compared against PreviewRenderer.
+'''
+
+width, height, frames = (int(value) for value in sys.argv[1:4]) if len(sys.argv) > 3 else (640, 480, 1000)
+
+class HeadlessTexture:
+    # Stand-in for a Kivy texture: the pixel storage is allocated when the texture is created
+    def __init__(self, width, height):
+        self.pixels = bytearray(width * height * 3)
+
+    def blit_buffer(self, buffer, colorfmt='bgr', bufferfmt='ubyte'):
+        memoryview(self.pixels)[:] = memoryview(buffer).cast('B')
+
+class SyntheticFrames:
+    # A few pre-made frames cycled like a camera feed, so frame generation is not measured
+    def __init__(self, width, height, count=8):
+        rng = np.random.default_rng(0)
+        self.frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+        self.index = 0
+
+    def read(self):
+        self.index = (self.index + 1) % len(self.frames)
+        return True, self.frames[self.index]
+
+try:
+    import cv2
+    flip = lambda frame: cv2.flip(frame, 0)
+except ImportError:
+    flip = lambda frame: np.flipud(frame).copy()  # Same full-frame copy cv2.flip makes
+
+def old_path(frame):
+    buffer = flip(frame).tobytes()
+    texture = HeadlessTexture(frame.shape[1], frame.shape[0])
+    texture.blit_buffer(buffer)
+    return texture
+
+renderer = PreviewRenderer(texture_factory=HeadlessTexture)
+
+def new_path(frame):
+    renderer.render(frame)
+    return renderer.texture
+
+def measure(name, render):
+    source = SyntheticFrames(width, height)
+    times = []
+    for _ in range(frames):
+        _, frame = source.read()
+        start = time.perf_counter()
+        render(frame)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    mean_ms = 1000 * sum(times) / len(times)
+    p99_ms = 1000 * times[int(len(times) * 0.99) - 1]
+    print(f"{name:<16} mean {mean_ms:6.3f} ms  p99 {p99_ms:6.3f} ms  ({1000 / mean_ms:,.0f} frames/s)")
+    return mean_ms
+
+print(f"{frames} frames of {width}x{height} BGR")
+old_ms = measure("flip+tobytes+new", old_path)
+new_ms = measure("PreviewRenderer", new_path)
+print(f"Speed-up: {old_ms / new_ms:.1f}x; the GUI ticks every {1000 / 33:.1f} ms")
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from camera_stream import CameraStream, SyntheticCapture
+
+'''
+Shutter-lag benchmark for still capture, run against a synthetic 30 fps camera.
+
+Usage: python benchmark_shutter_lag.py [shots]
+
+Compares the old approach (read 35 frames to flush stale driver buffers, then keep the last)
+with CameraStream.capture_frame, which takes the first frame published after the press, and
+with the zero-shutter-lag modes of CameraStream.select_frame, which pick from frames already
+captured.
+'''
+
+shots = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+fps = 30.0
+
+def report(name, lags):
+    lags = sorted(lags)
+    print(f"{name:<22} mean {1000 * sum(lags) / len(lags):7.1f} ms  max {1000 * lags[-1]:7.1f} ms")
+
+# ---------------- Old: flush 35 frames per still ------------------------
+capture = SyntheticCapture(1920, 1080, fps, buffered_frames=4)
+lags = []
+for _ in range(min(shots, 3)):  # Each shot takes over a second, so only a few are timed
+    pressed = time.monotonic()
+    for i in range(35):
+        ret, frame = capture.read()
+    lags.append(time.monotonic() - pressed)
+report("35-read flush", lags)
+
+# ---------------- New: capture thread + ring buffer ---------------------
+capture = SyntheticCapture(1920, 1080, fps, buffered_frames=4)
+stream = CameraStream(capture, ring_size=10, name='still').start()
+time.sleep(0.5)  # Let the stream drain the stale frames, as it does while the camera sits idle
+
+lags = []
+for _ in range(shots):
+    pressed = time.monotonic()
+    frame = stream.capture_frame(after=pressed)
+    lags.append(time.monotonic() - pressed)
+    time.sleep(0.2)  # Time between presses
+report("CameraStream", lags)
+
+# ---------------- ZSL: pick from the rolling window ---------------------
+for mode in ('closest', 'sharpest'):
+    lags = []
+    offsets = []
+    for _ in range(shots):
+        pressed = time.monotonic()
+        frame, captured = stream.select_frame(at=pressed, mode=mode, window=8)
+        lags.append(time.monotonic() - pressed)
+        offsets.append(abs(captured - pressed))
+        time.sleep(0.2)
+    report(f"ZSL {mode}", lags)
+    print(f"{'':<22} frame taken {1000 * sum(offsets) / len(offsets):.1f} ms from the press on average")
+
+stream.stop()
+print(f"One frame period at {fps:.0f} fps: {1000 / fps:.1f} ms")
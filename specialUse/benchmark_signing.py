@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+import hashlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from signing_service import SigningService, SoftwareSigner, SubprocessSigner, TPMSigner
+
+'''
+Benchmark for signing latency: one `sudo tpm2 sign` subprocess per digest versus the
+persistent signing service. Run on the camera to include the TPM paths; on other machines
+only the software-key stand-in is measured.
+
+Usage: python benchmark_signing.py [number_of_signatures]
+'''
+
+# Number of signatures to time for each signer
+count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+# Use a different digest for every signature, like real captures
+digests = [hashlib.sha256(str(i).encode('utf-8')).digest() for i in range(count)]
+
+def time_signer(name, make_signer):
+    # Build the signer; skip it if the hardware or library is missing
+    try:
+        service = SigningService(make_signer())
+    except Exception as e:
+        print(f"{name:<22} skipped ({e})")
+        return
+
+    # Warm up once so the first-call setup is not counted
+    try:
+        service.sign(digests[0])
+    except Exception as e:
+        print(f"{name:<22} skipped ({e})")
+        service.stop()
+        return
+
+    latencies = []
+    for digest in digests:
+        start = time.perf_counter()
+        service.sign(digest)
+        latencies.append(time.perf_counter() - start)
+    service.stop()
+
+    latencies.sort()
+    mean_ms = 1000 * sum(latencies) / len(latencies)
+    p50_ms = 1000 * latencies[len(latencies) // 2]
+    p95_ms = 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{name:<22} mean {mean_ms:8.2f} ms   p50 {p50_ms:8.2f} ms   p95 {p95_ms:8.2f} ms")
+
+print(f"Signing {count} digests per signer")
+time_signer("tpm2 subprocess", SubprocessSigner)
+time_signer("persistent TPM", TPMSigner)
+time_signer("software key", SoftwareSigner)
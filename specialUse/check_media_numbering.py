@@ -0,0 +1,67 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'docker'))
+
+import boto3
+import mysql.connector
+from moto import mock_aws
+from lambda_function_from_pi import allocate_media_number
+
+'''
+Check that the verifier's media numbering hands out unique numbers under concurrency.
+
+Usage: MYSQL_HOST=127.0.0.1 MYSQL_USER=root MYSQL_PASSWORD=... MYSQL_DATABASE=test python check_media_numbering.py
+
+Needs the Lambda's requirements and a local MySQL server as the stand-in for RDS, e.g.
+    docker run -d -p 3306:3306 -e MYSQL_ROOT_PASSWORD=test -e MYSQL_DATABASE=test mysql:8
+S3 is moto's local stand-in. The bucket already holds files 1-5 from the old listing-based
+numbering, so the counter must be seeded to continue at 6. Then 1,000 allocations run on 32
+threads, each with its own connection like concurrent Lambda invocations; they must get
+exactly the numbers 6-1005, with no duplicates or gaps.
+'''
+
+BUCKET = 'numberingcheck'
+ALLOCATIONS = 1000
+
+def connect():
+    return mysql.connector.connect(
+        host=os.environ.get('MYSQL_HOST', '127.0.0.1'),
+        user=os.environ.get('MYSQL_USER', 'root'),
+        password=os.environ.get('MYSQL_PASSWORD', ''),
+        database=os.environ.get('MYSQL_DATABASE', 'test'),
+    )
+
+def allocate(_):
+    connection = connect()
+    try:
+        return allocate_media_number(connection, BUCKET)
+    finally:
+        connection.close()
+
+with mock_aws():
+    s3 = boto3.client('s3', region_name='us-east-1')
+    s3.create_bucket(Bucket=BUCKET)
+    for number in range(1, 6):
+        s3.put_object(Bucket=BUCKET, Key=f"{number}.png", Body=b'legacy')
+
+    # Start from a clean counter for the check bucket
+    connection = connect()
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE IF NOT EXISTS media_counters (bucket_name VARCHAR(255) PRIMARY KEY, last_number BIGINT NOT NULL)")
+    cursor.execute("DELETE FROM media_counters WHERE bucket_name = %s", (BUCKET,))
+    connection.commit()
+    connection.close()
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        numbers = list(executor.map(allocate, range(ALLOCATIONS)))
+
+duplicates = len(numbers) - len(set(numbers))
+expected = set(range(6, 6 + ALLOCATIONS))
+
+print(f"{ALLOCATIONS} allocations: {len(set(numbers))} unique, {duplicates} duplicates, "
+      f"range {min(numbers)}-{max(numbers)}")
+assert duplicates == 0, "Two invocations got the same number"
+assert set(numbers) == expected, "Numbers are not contiguous from the seeded value"
+print("OK")
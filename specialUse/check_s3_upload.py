@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import boto3
+from moto import mock_aws
+import s3_client
+from s3_client import S3_CONFIG, upload_file, upload_state_path
+
+'''
+Check streaming multipart uploads and resume against moto's local S3 stand-in.
+
+Usage: python check_s3_upload.py
+
+A 20 MB file is uploaded in 5 MB parts. The first attempt fails on part 3; the second
+attempt must resume, send only the missing part and produce an identical object.
+'''
+
+PART_SIZE = 5 * 1024 * 1024
+
+with mock_aws():
+    client = boto3.client('s3', region_name='us-east-1', config=S3_CONFIG)
+    client.create_bucket(Bucket='unverifiedimages')
+
+    directory = tempfile.mkdtemp()
+    filepath = os.path.join(directory, '1.avi')
+    data = os.urandom(4 * PART_SIZE + 1234)
+    with open(filepath, 'wb') as file:
+        file.write(data)
+
+    # ---------------- First attempt fails partway ------------------------
+    real_upload_part = s3_client.upload_part
+    sent_parts = []
+
+    def failing_upload_part(client, filepath, state, part_number):
+        if part_number == 3:
+            raise ConnectionError("simulated network drop")
+        return real_upload_part(client, filepath, state, part_number)
+
+    s3_client.upload_part = failing_upload_part
+    try:
+        upload_file(filepath, 'unverifiedimages', 'NewVideo.avi', {'camera': '1'}, part_size=PART_SIZE, client=client)
+        raise SystemExit("FAIL: the first attempt should have failed")
+    except ConnectionError:
+        assert os.path.exists(upload_state_path(filepath)), "upload state was not kept"
+        print("First attempt failed on part 3 as expected; upload state kept")
+
+    # ---------------- Second attempt resumes -----------------------------
+    def counting_upload_part(client, filepath, state, part_number):
+        sent_parts.append(part_number)
+        return real_upload_part(client, filepath, state, part_number)
+
+    s3_client.upload_part = counting_upload_part
+    upload_file(filepath, 'unverifiedimages', 'NewVideo.avi', {'camera': '1'}, part_size=PART_SIZE, client=client)
+
+    uploaded = client.get_object(Bucket='unverifiedimages', Key='NewVideo.avi')
+    assert uploaded['Body'].read() == data, "uploaded object does not match the file"
+    assert uploaded['Metadata'] == {'camera': '1'}, "metadata was not kept"
+    assert sent_parts == [3], f"expected only part 3 to be resent, got {sent_parts}"
+    assert not os.path.exists(upload_state_path(filepath)), "upload state was not removed"
+    print(f"Resumed upload sent parts {sent_parts}; object matches the file")
+    print("PASS")
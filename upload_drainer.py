@@ -0,0 +1,191 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class UploadDrainer:
+    """
+    Event-driven uploader that drains the durable upload queues.
+
+    The drainer keeps an in-memory index of pending entries, seeded from the queues at start and
+    updated whenever a queue commits a new capture. Captures committed by another process (or
+    through another MediaQueue object for the same directory) do not reach the listener, so the
+    index is also re-read from the queues on every online transition and every `rescan_interval`
+    seconds. It sleeps on a condition variable and only wakes for new captures, connectivity
+    changes, a scheduled retry or a rescan, so it uses almost no CPU while idle. While online, pending entries are uploaded concurrently by a pool of `parallelism`
+    workers; an entry is removed from its queue only after its upload succeeds.
+
+    Args:
+        media_queues (list): The MediaQueue objects to drain.
+        upload_function: Called as upload_function(media_path, metadata_path) to upload one
+                         entry; it must raise an exception if the upload fails.
+        parallelism (int): The number of uploads that may run at the same time.
+        retry_delay (float): Seconds to wait before retrying an entry whose upload failed.
+        upload_lock (threading.Lock): Optional lock held around each upload.
+        rescan_interval (float): Seconds between re-reads of the queues for entries committed elsewhere.
+    """
+
+    def __init__(self, media_queues, upload_function, parallelism=1, retry_delay=30.0, upload_lock=None,
+                 rescan_interval=60.0):
+        self.media_queues = media_queues
+        self.upload_function = upload_function
+        self.parallelism = parallelism
+        self.retry_delay = retry_delay
+        self.upload_lock = upload_lock
+        self.rescan_interval = rescan_interval
+        self.rescan_at = 0.0
+
+        self.condition = threading.Condition()
+        self.index = {}         # (queue directory, id) -> (queue, id, media path, metadata path)
+        self.in_flight = set()  # Keys currently being uploaded
+        self.retry_at = {}      # Key -> monotonic time before which a failed entry is not retried
+        self.online = False
+        self.executor = ThreadPoolExecutor(max_workers=parallelism)
+
+    def start(self):
+        """
+        Index the entries already queued, subscribe to new captures and start dispatching.
+        """
+        for media_queue in self.media_queues:
+            media_queue.add_listener(self.notify_new_capture)
+
+        with self.condition:
+            self._rescan()
+
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def notify_new_capture(self, media_queue, media_id, media_path, metadata_path):
+        """
+        Add a newly queued capture to the index and wake the dispatcher.
+        """
+        with self.condition:
+            self._add(media_queue, media_id, media_path, metadata_path)
+            self.condition.notify()
+
+    def set_online(self, online):
+        """
+        Record a connectivity change; going online wakes the dispatcher and retries failed entries now.
+        """
+        with self.condition:
+            if online and not self.online:
+                self.retry_at.clear()
+                self._rescan()
+            self.online = online
+            self.condition.notify()
+
+    def pending_count(self):
+        """
+        Return the number of entries waiting to be uploaded (including those in flight).
+        """
+        with self.condition:
+            return len(self.index)
+
+    def _add(self, media_queue, media_id, media_path, metadata_path):
+        self.index[(media_queue.directory, media_id)] = (media_queue, media_id, media_path, metadata_path)
+
+    def _rescan(self):
+        """
+        Re-read the pending entries from every queue (condition must be held).
+
+        Entries committed elsewhere are added, and entries that are no longer pending (e.g.
+        uploaded by another process) are dropped unless an upload of them is in flight. Holding
+        the condition keeps this consistent with `_upload`, which removes an entry from its queue
+        before dropping it from the index under the same condition.
+        """
+        pending = set()
+        for media_queue in self.media_queues:
+            try:
+                entries = media_queue.pending()
+            except Exception as e:
+                print(f"Error reading upload queue {media_queue.directory}: {e}")
+                pending.update(key for key in self.index if key[0] == media_queue.directory)  # Keep what we have
+                continue
+
+            for media_id, media_path, metadata_path in entries:
+                self._add(media_queue, media_id, media_path, metadata_path)
+                pending.add((media_queue.directory, media_id))
+
+        for key in list(self.index):
+            if key not in pending and key not in self.in_flight:
+                self.index.pop(key)
+                self.retry_at.pop(key, None)
+
+        self.rescan_at = time.monotonic() + self.rescan_interval
+
+    def _run(self):
+        """
+        Dispatcher loop: wait for work, then hand ready entries to the upload workers.
+        """
+        while True:
+            with self.condition:
+                ready, wait_time = self._ready_entries()
+                while not ready:
+                    # Wake for the next periodic rescan at the latest
+                    rescan_wait = max(0.0, self.rescan_at - time.monotonic())
+                    self.condition.wait(rescan_wait if wait_time is None else min(wait_time, rescan_wait))
+                    if time.monotonic() >= self.rescan_at:
+                        self._rescan()
+                    ready, wait_time = self._ready_entries()
+
+                for key in ready:
+                    self.in_flight.add(key)
+
+            for key in ready:
+                self.executor.submit(self._upload, key)
+
+    def _ready_entries(self):
+        """
+        Pick the entries that can start uploading now, oldest first (condition must be held).
+
+        Returns:
+            tuple: The keys to upload, and how long to wait before checking again if there are
+                   none (None means wait until notified).
+        """
+        if not self.online:
+            return [], None
+
+        now = time.monotonic()
+        slots = self.parallelism - len(self.in_flight)
+        ready = []
+        next_retry = None
+
+        for key in sorted(self.index, key=lambda key: (key[1], key[0])):
+            if len(ready) >= slots:
+                break
+            if key in self.in_flight:
+                continue
+            retry_at = self.retry_at.get(key, 0)
+            if retry_at > now:
+                next_retry = retry_at if next_retry is None else min(next_retry, retry_at)
+                continue
+            ready.append(key)
+
+        wait_time = None if next_retry is None else next_retry - now
+        return ready, wait_time
+
+    def _upload(self, key):
+        """
+        Upload one entry and remove it from its queue on success.
+        """
+        with self.condition:
+            media_queue, media_id, media_path, metadata_path = self.index[key]
+
+        try:
+            if self.upload_lock is not None:
+                with self.upload_lock:
+                    self.upload_function(media_path, metadata_path)
+            else:
+                self.upload_function(media_path, metadata_path)
+            media_queue.remove(media_id)
+            succeeded = True
+        except Exception as e:
+            print(f"Error uploading queued media {media_id}: {e}")
+            succeeded = False
+
+        with self.condition:
+            self.in_flight.discard(key)
+            if succeeded:
+                self.index.pop(key, None)
+                self.retry_at.pop(key, None)
+            else:
+                self.retry_at[key] = time.monotonic() + self.retry_delay
+            self.condition.notify()
@@ -1,32 +1,39 @@
-import boto3
+from s3_client import get_s3_client, upload_file, create_object_key
+from image_encoder import IMAGE_FORMATS, image_extension
 
 def upload_image(image, metadata):
     """
     Upload an image to an S3 bucket with associated metadata.
 
     Parameters:
-        image (bytes): The image data to be uploaded, typically from a cv2.imread() call.
+        image (bytes or str): The encoded image data to be uploaded, or the path of an image file on disk.
         metadata (dict): A dictionary of metadata to be associated with the image in S3.
 
     This function:
-    - Creates an S3 client using the boto3 library.
-    - Specifies the S3 bucket name and file key (filename) for the upload.
-    - Attempts to upload the image to the specified S3 bucket with the associated metadata.
-    - Handles any exceptions that occur during the upload process and prints an error message if an exception occurs.
+    - Uses the shared, connection-pooled S3 client instead of creating a new client per upload.
+    - Uploads to a unique key per capture (camera number + capture hash), so concurrent uploads never overwrite each other.
+    - Names the object after the image's format (metadata 'Format', PNG if absent) and sets its content type.
+    - Uploads the image to the specified S3 bucket with the associated metadata, streaming it from disk when given a path.
+      The bytes are sent exactly as they were signed and saved; a saved image is never decoded and re-encoded.
+    - Prints an error message and re-raises the exception if the upload fails, so callers can keep the image for a retry.
     """
-    # Create an S3 client using boto3
-    s3_client = boto3.client('s3')
-
     # Bucket name and file key (filename) details
     bucket_name = 'unverifiedimages'
-    file_key = 'NewImage.png'  # This can be dynamically generated if needed
+    extension = image_extension(metadata)
+    content_type = IMAGE_FORMATS[metadata.get('Format', 'png')][1]
+    file_key = create_object_key(metadata, extension)
 
     try:
-        # Attempt to upload the image to the S3 bucket with associated metadata
-        response = s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=image, Metadata=metadata)
-        # If needed, you can print the response for debugging
-        # print(f"Response: {response}")
+        if isinstance(image, str):
+            # Stream the image file from disk
+            upload_file(image, bucket_name, file_key, metadata, extra_args={'ContentType': content_type})
+        else:
+            # Upload the encoded image buffer to the S3 bucket with associated metadata
+            response = get_s3_client().put_object(Bucket=bucket_name, Key=file_key, Body=image, Metadata=metadata, ContentType=content_type)
+            # If needed, you can print the response for debugging
+            # print(f"Response: {response}")
 
     except Exception as e:
-        # Print an error message if the upload fails
+        # Print an error message and let the caller know the upload failed
         print(f'Exception occurred during upload: {e}')
+        raise
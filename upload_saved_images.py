@@ -1,18 +1,22 @@
 import os
 from upload_image import upload_image
-import cv2
 import json
-from check_wifi import is_internet_availableTwo
+import time
+from connectivity_monitor import get_connectivity_monitor
+from media_queue import MediaQueue
+from upload_drainer import UploadDrainer
 
 def upload_saved_images():
     """
     Check if there are saved images in the 'tmpImages' directory and upload them when the internet is available.
 
     This function:
-    - Continuously checks if there is internet connectivity.
-    - If internet is available, it iterates through the 'tmpImages' directory to find saved images and their associated metadata.
-    - For each image found, it uploads the image along with its metadata to the cloud using the `upload_image` function.
-    - After a successful upload, it deletes the image and metadata files from the local directory.
+    - Opens the durable upload queue in the 'tmpImages' directory.
+    - Starts an upload drainer that uploads each queued image along with its metadata using the `upload_image` function.
+    - After a successful upload, the drainer deletes the image and metadata files from the local directory.
+    - Picks up captures queued later by the camera application, which runs in its own process, by re-reading
+      the queue whenever the camera comes online and periodically while it is idle.
+    - Subscribes the drainer to the shared connectivity monitor so it starts uploading as soon as the camera is online.
     """
 
     # Check if the 'tmpImages' directory exists in the current working directory
@@ -22,32 +26,29 @@ def upload_saved_images():
         print("The 'tmpImages' directory does not exist.")
         return  # Exit the function if the directory does not exist
 
+    image_queue = MediaQueue(save_image_filepath, recover_on_open=False)
+    drainer = UploadDrainer([image_queue], upload_image_file)
+    drainer.start()
+
+    get_connectivity_monitor().subscribe(drainer.set_online)  # Wake the drainer on connectivity changes
+
     while True:
-        if is_internet_availableTwo():
-            count = 0
-            for file_name in os.listdir(save_image_filepath):
-                count += 1
-                # Check if the file is a PNG image
-                if file_name.lower().endswith('.png'):
-                    file_path = os.path.join(save_image_filepath, file_name)
-                    # Read the image from the file
-                    image = cv2.imread(file_path)
-                    _, encoded_image = cv2.imencode(".png", image)
-                    
-                    # Get the matching JSON metadata file
-                    file_path_metadata = os.path.join(save_image_filepath, file_name[:-3] + 'json')
-                    metadata = read_metadata(file_path_metadata)
+        time.sleep(60)  # The drainer and connectivity monitor do the work in their own threads
+
+def upload_image_file(file_path, file_path_metadata):
+    """
+    Upload one saved image with its metadata.
+
+    Parameters:
+        file_path (str): The path of the image file.
+        file_path_metadata (str): The path of the matching JSON metadata file.
+    """
+    metadata = read_metadata(file_path_metadata)
 
-                    try:
-                        # Upload the image and metadata
-                        upload_image(encoded_image.tobytes(), metadata)
-                        print("------------------------------------------------------")
-                        print("Uploaded Saved Image")
-                        # Remove the image and metadata files after a successful upload
-                        os.remove(file_path)
-                        os.remove(file_path_metadata)
-                    except Exception as e:
-                        print(f"Error uploading saved image: {str(e)}")
+    # Upload the saved image verbatim, whatever its format: these are the exact bytes that were signed, so it is not decoded and re-encoded
+    upload_image(file_path, metadata)
+    print("------------------------------------------------------")
+    print("Uploaded Saved Image")
 
 def read_metadata(file_path_metadata):
     """
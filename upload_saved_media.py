@@ -1,80 +1,62 @@
 import os
-import cv2
 import json
+import time
 from upload_image import upload_image
 from upload_video import upload_video
+from connectivity_monitor import get_connectivity_monitor
+from media_queue import MediaQueue
+from upload_drainer import UploadDrainer
+from image_encoder import IMAGE_EXTENSIONS
 
-def upload_saved_media(upload_lock):
+def upload_saved_media(parallelism=4):
     """
     Thread function for uploading saved media (images and videos) in the background when WiFi is available.
 
     Parameters:
-        upload_lock (threading.Lock): A lock to ensure that only one upload operation occurs at a time.
+        parallelism (int): The number of uploads that run at the same time; each capture has its own object key.
 
     This function:
-    - Continuously checks for WiFi connectivity (via the `wifi_status` global variable).
-    - If WiFi is available, it iterates through the `tmpImages` and `tmpVideos` directories to find saved images and videos.
-    - Uploads each image or video found along with its associated metadata.
+    - Opens the durable upload queues in the `tmpImages` and `tmpVideos` directories.
+    - Starts an upload drainer that uploads each queued image or video along with its associated metadata.
     - Deletes the media and metadata files from the local storage after successful upload.
+    - Picks up captures queued later by the camera application, which runs in its own process, by re-reading
+      the queue whenever the camera comes online and periodically while it is idle.
+    - Subscribes the drainer to the shared connectivity monitor so it starts uploading as soon as the camera is online.
     """
-    global wifi_status
+    media_queues = []
+    for directory_name in ["tmpImages", "tmpVideos"]:
+        # Check if the directory exists
+        if os.path.exists(os.path.join(os.getcwd(), directory_name)):
+            media_queues.append(MediaQueue(os.path.join(os.getcwd(), directory_name), recover_on_open=False))
+        else:
+            print(f"There is no '{directory_name}' directory")
 
-    while True:
-        if wifi_status:
-            with upload_lock:
-                # Check if the 'tmpImages' directory exists
-                if os.path.exists(os.path.join(os.getcwd(), "tmpImages")):
-                    save_image_filepath = os.path.join(os.getcwd(), "tmpImages")
-                else:
-                    print("There is no 'tmpImages' directory")
-
-                # Check if the 'tmpVideos' directory exists
-                if os.path.exists(os.path.join(os.getcwd(), "tmpVideos")):
-                    save_video_filepath = os.path.join(os.getcwd(), "tmpVideos")
-                else:
-                    print("There is no 'tmpVideos' directory")
+    drainer = UploadDrainer(media_queues, upload_media_file, parallelism=parallelism)
+    drainer.start()
 
-                # Upload saved images
-                for file_name in os.listdir(save_image_filepath):
-                    if file_name.lower().endswith('.png'):
-                        file_path = os.path.join(save_image_filepath, file_name)  # Get the full path to the image
-                        image = cv2.imread(file_path)  # Read the image
-                        _, encoded_image = cv2.imencode(".png", image)  # Encode the image
+    get_connectivity_monitor().subscribe(drainer.set_online)  # Wake the drainer on connectivity changes
 
-                        # Get the matching JSON metadata file
-                        file_path_metadata = os.path.join(save_image_filepath, file_name[:-3] + 'json')
-                        metadata = read_metadata(file_path_metadata)
-
-                        try:
-                            upload_image(encoded_image.tobytes(), metadata)  # Upload the image with its metadata
-                            print("------------------------------------------------------")
-                            print("Uploaded Saved Image")
-                            # Remove the image and metadata files after a successful upload
-                            os.remove(file_path)
-                            os.remove(file_path_metadata)
-                        except Exception as e:
-                            print(f"Error uploading saved image: {str(e)}")
+    while True:
+        time.sleep(60)  # The drainer and connectivity monitor do the work in their own threads
 
-                # Upload saved videos
-                for file_name in os.listdir(save_video_filepath):
-                    if file_name.lower().endswith('.avi'):
-                        file_path = os.path.join(save_video_filepath, file_name)  # Get the full path to the video
-                        with open(file_path, 'rb') as video:
-                            video_bytes = video.read()
+def upload_media_file(file_path, file_path_metadata):
+    """
+    Upload one saved image or video with its metadata.
 
-                        # Get the matching JSON metadata file
-                        file_path_metadata = os.path.join(save_video_filepath, file_name[:-3] + 'json')
-                        metadata = read_metadata(file_path_metadata)
+    Parameters:
+        file_path (str): The path of the image or video file.
+        file_path_metadata (str): The path of the matching JSON metadata file.
+    """
+    metadata = read_metadata(file_path_metadata)
 
-                        try:
-                            upload_video(video_bytes, metadata)  # Upload the video with its metadata
-                            print("------------------------------------------------------")
-                            print("Uploaded Saved Video")
-                            # Remove the video and metadata files after a successful upload
-                            os.remove(file_path)
-                            os.remove(file_path_metadata)
-                        except Exception as e:
-                            print(f"Error uploading saved video: {str(e)}")
+    if file_path.lower().endswith(IMAGE_EXTENSIONS):
+        upload_image(file_path, metadata)  # Stream the signed image bytes from disk, unchanged, with its metadata
+        print("------------------------------------------------------")
+        print("Uploaded Saved Image")
+    else:
+        upload_video(file_path, metadata)  # Stream the video from disk with its metadata
+        print("------------------------------------------------------")
+        print("Uploaded Saved Video")
 
 def read_metadata(file_path_metadata):
     """
@@ -1,33 +1,51 @@
-import boto3
+import os
+import json
+from s3_client import get_s3_client, upload_file, create_object_key, PART_SIZE
 
-def upload_video(video_bytes, metadata):
+def upload_video(video, metadata):
     """
     Upload a video to an S3 bucket with associated metadata.
 
     Parameters:
-        video_bytes (bytes): The video data to be uploaded in binary format.
+        video (str or bytes): The path of the video file on disk, or the video data in binary format.
         metadata (dict): A dictionary of metadata to be associated with the video in S3.
 
     This function:
-    - Creates an S3 client using the boto3 library.
-    - Specifies the S3 bucket name and file key (filename) for the upload.
-    - Attempts to upload the video to the specified S3 bucket with the associated metadata.
+    - Uses the shared, connection-pooled S3 client instead of creating a new client per upload.
+    - Uploads to a unique key per capture (camera number + capture hash), so concurrent uploads never overwrite each other.
+    - Streams a video file from disk as a multipart upload with concurrent parts, resuming from the last
+      completed parts if an earlier attempt failed partway.
+    - For a video signed in segments, uploads the segment manifest first as `<key>.manifest` (it can be larger than
+      S3 allows for metadata), so it is in place when the verifier is triggered by the video, and uploads the video
+      in parts that line up with the segments.
     - Sets the ContentDisposition to 'attachment' to suggest downloading the file when accessed via a web browser.
-    - Handles any exceptions that occur during the upload process and prints an error message if an exception occurs.
+    - Prints an error message and re-raises the exception if the upload fails, so callers can keep the video for a retry.
     """
-    # Create an S3 client using boto3
-    s3_client = boto3.client('s3')
-
     # Bucket name and file key (filename) details
     bucket_name = 'unverifiedimages'
-    file_key = 'NewVideo.avi'  # This can be dynamically generated if needed
+    extension = os.path.splitext(video)[1] if isinstance(video, str) else '.avi'  # e.g. '.mkv' for recordings
+    file_key = create_object_key(metadata, extension)
+
+    # The manifest is stored next to the video rather than in its metadata
+    metadata = dict(metadata)
+    segment_manifest = metadata.pop('SegmentManifest', None)
+    part_size = json.loads(segment_manifest)['segment_size'] if segment_manifest else PART_SIZE
 
     try:
-        # Attempt to upload the video to the S3 bucket with associated metadata
-        response = s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=video_bytes, Metadata=metadata, ContentDisposition='attachment')
-        # If needed, you can print the response for debugging
-        # print(f"Upload successful. Response: {response}")
+        if segment_manifest:
+            get_s3_client().put_object(Bucket=bucket_name, Key=file_key + '.manifest', Body=segment_manifest.encode('utf-8'),
+                                       ContentType='application/json')
+
+        if isinstance(video, str):
+            # Stream the video file from disk without reading it into memory
+            upload_file(video, bucket_name, file_key, metadata, extra_args={'ContentDisposition': 'attachment'}, part_size=part_size)
+        else:
+            # Upload the video bytes to the S3 bucket with associated metadata
+            response = get_s3_client().put_object(Bucket=bucket_name, Key=file_key, Body=video, Metadata=metadata, ContentDisposition='attachment')
+            # If needed, you can print the response for debugging
+            # print(f"Upload successful. Response: {response}")
 
     except Exception as e:
-        # Print an error message if the upload fails
+        # Print an error message and let the caller know the upload failed
         print(f'We had an exception: {e}')
+        raise
@@ -0,0 +1,327 @@
+import os
+import queue
+import subprocess
+import threading
+from create_digest import CombinedDigest
+from segments import SegmentedDigest, SEGMENT_SIZE
+
+class VideoRecorder:
+    """
+    Records video from a CameraStream by piping its frames into FFmpeg.
+
+    The camera is shared with the preview and stills, so FFmpeg no longer opens /dev/video0
+    itself; instead every frame the capture thread publishes is written to FFmpeg's stdin as raw
+    BGR. The capture thread only queues the ring slot; a writer thread copies the slot into one
+    reused buffer and checks its sequence again afterwards (as CameraStream.select_frame does), so a
+    slot the ring lapped during the copy is skipped instead of reaching the signed video torn.
+    If FFmpeg falls behind, frames are dropped (and counted) rather than stalling the camera.
+    FFmpeg timestamps each frame with the wall clock as it arrives and writes a constant frame
+    rate, repeating frames over any gap, so drops do not make the clip play faster than real
+    time or drift from the audio.
+
+    FFmpeg writes the encoded video to its stdout as Matroska (which, unlike AVI, can be written
+    to a pipe). A reader thread writes those bytes to the file and tees them into a
+    CombinedDigest as they arrive, so the video is already hashed when the recording stops.
+
+    Args:
+        camera_stream (CameraStream): The running camera stream to record from.
+        filepath (str): The output video file.
+        fps (float): The camera frame rate, the constant rate the clip is written at.
+        audio (bool): Whether to record audio from the default ALSA device as well.
+        queue_size (int): Frames that may wait for FFmpeg before new ones are dropped; keep it below
+                          the stream's ring size so queued slots are not overwritten.
+    """
+
+    def __init__(self, camera_stream, filepath, fps=30.0, audio=True, queue_size=6):
+        self.camera_stream = camera_stream
+        self.filepath = filepath
+        self.fps = fps
+        self.audio = audio
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.ffmpeg_process = None
+        self.writer_thread = None
+        self.reader_thread = None
+        self.digest = None
+
+    def command(self, width, height):
+        """
+        Build the FFmpeg command that encodes raw BGR frames from stdin.
+        """
+        command = [
+            'ffmpeg',
+            '-f', 'rawvideo',
+            '-pix_fmt', 'bgr24',
+            '-video_size', f'{width}x{height}',
+            '-framerate', f'{self.fps:g}',
+            '-use_wallclock_as_timestamps', '1',  # Dropped frames leave gaps instead of shortening the clip
+            '-i', '-',
+        ]
+        if self.audio:
+            command += ['-f', 'alsa', '-i', 'default']
+        command += [
+            '-c:v', 'h264_v4l2m2m',
+            '-pix_fmt', 'yuv420p',
+            '-b:v', '4M',
+            '-bufsize', '4M',
+            '-fps_mode', 'cfr',  # Fill the gaps by repeating frames, so the clip keeps real time
+            '-r', f'{self.fps:g}',
+        ]
+        if self.audio:
+            command += ['-c:a', 'aac', '-b:a', '128k']
+        command += ['-threads', '4', '-f', 'matroska', 'pipe:1']
+        return command
+
+    def spawn(self):
+        """
+        Start FFmpeg without feeding it yet.
+
+        FFmpeg then waits on its empty stdin with its libraries loaded, so a later `start` only
+        has to attach to the camera stream. Nothing is written until the first frame arrives.
+
+        Returns:
+            VideoRecorder: self.
+        """
+        _, frame = self.camera_stream.newest()
+        if frame is None:
+            raise RuntimeError("The camera has not produced a frame yet")
+
+        height, width = frame.shape[:2]
+        self.ffmpeg_process = subprocess.Popen(self.command(width, height), stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return self
+
+    def start(self, digest=None):
+        """
+        Begin feeding frames to FFmpeg (spawning it first if `spawn` was not called).
+
+        Args:
+            digest (CombinedDigest or SegmentedDigest): Optional digest that every encoded byte is fed into as it is written.
+
+        Returns:
+            VideoRecorder: self.
+        """
+        if self.ffmpeg_process is None:
+            self.spawn()
+
+        self.digest = digest
+        self.reader_thread = threading.Thread(target=self._read_output, daemon=True)
+        self.reader_thread.start()
+
+        self.writer_thread = threading.Thread(target=self._write_frames, daemon=True)
+        self.writer_thread.start()
+        self.camera_stream.add_frame_listener(self._on_frame)
+        return self
+
+    def cancel(self):
+        """
+        Kill a spawned FFmpeg that was never started, e.g. a warm encoder at shutdown.
+        """
+        if self.ffmpeg_process is not None and self.writer_thread is None:
+            self.ffmpeg_process.kill()
+            self.ffmpeg_process.wait()
+
+    def stop(self):
+        """
+        Stop feeding frames, let FFmpeg finish the file and wait for it to exit.
+        """
+        self.camera_stream.remove_frame_listener(self._on_frame)
+        self.frames.put(None)  # Tell the writer to finish
+        self.writer_thread.join()
+
+        self.ffmpeg_process.stdin.close()  # End of input makes FFmpeg finalize the file
+        self.reader_thread.join()  # The file and digest are complete once FFmpeg's output is drained
+        self.ffmpeg_process.wait()
+        print(f"Recorded {self.written} frames to {self.filepath} ({self.dropped} dropped)")
+
+    def _on_frame(self, sequence, slot):
+        """
+        Frame listener, called on the capture thread: queue the slot without copying or blocking.
+        """
+        try:
+            self.frames.put_nowait((sequence, slot))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_frames(self):
+        """
+        Writer loop: write queued ring slots to FFmpeg's stdin.
+        """
+        failed = False
+        frame = None  # Reused copy of the frame being written
+
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+
+            sequence, slot = item
+            if failed or self.camera_stream.slot_sequence[slot] != sequence:
+                self.dropped += 1  # FFmpeg is gone, or the ring lapped this slot before it was written
+                continue
+
+            # Copy the slot out of the ring, then make sure the capture thread did not start
+            # rewriting it meanwhile; a frame torn that way must not go into the signed video
+            source = self.camera_stream.ring[slot]
+            if frame is None or frame.shape != source.shape:
+                frame = source.copy()
+            else:
+                frame[...] = source
+            if self.camera_stream.slot_sequence[slot] != sequence:
+                self.dropped += 1
+                continue
+
+            try:
+                self.ffmpeg_process.stdin.write(memoryview(frame).cast('B'))
+                self.written += 1
+            except (BrokenPipeError, ValueError) as e:
+                print(f"Error writing frame to FFmpeg: {e}")
+                failed = True  # Keep draining the queue so stop() is not blocked
+
+    def _read_output(self):
+        """
+        Reader loop: write FFmpeg's encoded output to the file and feed it to the digest.
+        """
+        buffer = bytearray(1024 * 1024)
+        view = memoryview(buffer)
+
+        with open(self.filepath, 'wb') as file:
+            while True:
+                bytes_read = self.ffmpeg_process.stdout.readinto(buffer)
+                if not bytes_read:
+                    break
+                file.write(view[:bytes_read])
+                if self.digest is not None:
+                    self.digest.update(view[:bytes_read])
+            file.flush()
+            os.fsync(file.fileno())
+
+# --------------------------------------------------------------------
+
+class RecordingEngine:
+    """
+    Records videos into the video upload queue, starting each clip exactly at the press.
+
+    For silent recordings (`audio=False`), the engine keeps one FFmpeg process spawned and
+    waiting on its stdin between recordings, with the queue entry (and so the output path)
+    already reserved. Pressing record only attaches it to the camera stream, so the file starts
+    exactly at the press: there is no pre-roll to trim afterwards, and each clip is written to
+    flash once. After a recording stops, the next encoder is warmed up in the background.
+
+    Each recording is hashed while it is encoded (see VideoRecorder), so signing only has to add
+    the date, time and location to the digest once the recording stops, however long it is.
+    With `segment_size` set, the clip is hashed in fixed-size segments (see SegmentedDigest) and
+    the signature covers a manifest chaining the segment hashes, so a verifier can check the
+    segments independently and a corrupt byte only invalidates one segment.
+
+    Audio cannot be kept warm the same way (an idle ALSA capture would record everything before
+    the press), so with `audio=True` (the default, as clips have always had sound) FFmpeg is
+    spawned at the press instead and pays its start-up time then; the clip still starts at the
+    press and needs no trim, but the warm encoder is not used.
+
+    Args:
+        camera_stream (CameraStream): The running camera stream to record from.
+        media_queue (MediaQueue): The video upload queue the clips are reserved in.
+        extension (str): The video file extension; the recorder writes Matroska.
+        fps (float): The camera frame rate.
+        audio (bool): Whether to record audio from the default ALSA device as well.
+        segment_size (int): The size in bytes of the separately hashed segments, or None to hash
+                            each clip as a single blob.
+    """
+
+    def __init__(self, camera_stream, media_queue, extension='.mkv', fps=30.0, audio=True, segment_size=SEGMENT_SIZE):
+        self.camera_stream = camera_stream
+        self.media_queue = media_queue
+        self.extension = extension
+        self.fps = fps
+        self.audio = audio
+        self.segment_size = segment_size
+        self.lock = threading.Lock()
+        self.warm = None       # (media id, path, spawned recorder) waiting for the next press
+        self.recording = None  # (media id, path, recorder) currently recording
+
+    def prepare(self):
+        """
+        Reserve the next queue entry and spawn its encoder, unless one is already waiting.
+        """
+        if self.audio:
+            return
+
+        # The encoder needs the frame size, so wait for the camera's first frame
+        if not self.camera_stream.wait_for_frame(timeout=10):
+            print("Could not warm up the video encoder: the camera has not produced a frame")
+            return
+
+        with self.lock:
+            if self.warm is not None or self.recording is not None:
+                return  # Already warm, or a recording started meanwhile (it warms the next one when it stops)
+
+            media_id, filepath = self.media_queue.reserve(self.extension)
+            self.warm = (media_id, filepath, VideoRecorder(self.camera_stream, filepath, self.fps, audio=False).spawn())
+
+    def start(self, fingerprint, camera_number):
+        """
+        Start recording now.
+
+        Args:
+            fingerprint (str): The fingerprint of the user recording, the first field of the signed layout.
+            camera_number (str): The camera number, the second field of the signed layout.
+
+        Returns:
+            int: The queue ID of the new video.
+
+        Raises:
+            RuntimeError: If FFmpeg could not be started, e.g. because the camera has not produced
+                          a frame yet. The engine is then left ready for the next attempt.
+        """
+        with self.lock:
+            warm, self.warm = self.warm, None
+
+            if warm is None:
+                media_id, filepath = self.media_queue.reserve(self.extension)
+                warm = (media_id, filepath, VideoRecorder(self.camera_stream, filepath, self.fps, audio=self.audio))
+
+        if self.segment_size:
+            digest = SegmentedDigest(fingerprint, camera_number, self.segment_size)
+        else:
+            digest = CombinedDigest(fingerprint, camera_number)
+
+        media_id, filepath, recorder = warm
+        try:
+            recorder.start(digest=digest)
+        except Exception:
+            # E.g. the camera has no frame yet: release the entry and stay ready for the next press
+            recorder.cancel()
+            self.media_queue.remove(media_id)
+            threading.Thread(target=self.prepare, daemon=True).start()
+            raise
+
+        with self.lock:
+            self.recording = warm
+        return media_id
+
+    def stop(self):
+        """
+        Stop recording, wait for the file to be finished and warm up the next encoder.
+
+        Returns:
+            tuple: The queue ID and path of the finished video, and its SegmentedDigest (or
+                   CombinedDigest) with the whole video already fed in (only `finalize` is left).
+        """
+        media_id, filepath, recorder = self.recording
+        recorder.stop()
+
+        with self.lock:
+            self.recording = None
+
+        threading.Thread(target=self.prepare, daemon=True).start()
+        return media_id, filepath, recorder.digest
+
+    def close(self):
+        """
+        Kill the waiting encoder, e.g. when the application stops.
+        """
+        with self.lock:
+            warm, self.warm = self.warm, None
+        if warm is not None:
+            warm[2].cancel()